@@ -6,6 +6,8 @@ import logging
 import re
 from typing import Optional
 
+from .services.result_cache import FALLBACK_KEY
+
 logger = logging.getLogger(__name__)
 
 GEMINI_KEY_DOCS = os.getenv("GEMINI_KEY_DOCS")
@@ -134,7 +136,13 @@ def _heuristic_expense_type(text: str) -> str:
 
 
 def classify_document(text: str) -> dict:
-    """LangGraph-style: first classify doc type, then expense type if needed. Returns dict."""
+    """LangGraph-style: first classify doc type, then expense type if needed. Returns dict.
+
+    When a configured Gemini call fails and the heuristics answer instead, the dict
+    also carries FALLBACK_KEY so the extraction result is not cached.
+    """
+    failures = []
+
     def gemini_doc_type_agent(text: str) -> str:
         if not GEMINI_KEY_DOCS:
             logger.warning("GEMINI_KEY_DOCS is not set, using local heuristic classifier")
@@ -164,6 +172,7 @@ Return only one word: receipt, invoice, or unknown.
                     return "unknown"
         except Exception as e:
             logger.error("Gemini doc_type agent failed: %s", e)
+            failures.append("document type")
             return _heuristic_classify(text)
         return _heuristic_classify(text)
 
@@ -196,6 +205,7 @@ Return only one word: Food, Transport, Utilities, Entertainment, Shopping, Healt
                     return "unknown"
         except Exception as e:
             logger.error("Gemini expense_type agent failed: %s", e)
+            failures.append("expense type")
             return _heuristic_expense_type(text)
         # fallback to heuristic expense classifier (not the document-type classifier)
         return _heuristic_expense_type(text)
@@ -210,4 +220,7 @@ Return only one word: Food, Transport, Utilities, Entertainment, Shopping, Healt
         expense_type = (expense_type or "").capitalize()
     except Exception:
         expense_type = "Unknown"
-    return {"document_type": doc_type, "expense_type": expense_type}
+    result = {"document_type": doc_type, "expense_type": expense_type}
+    if failures:
+        result[FALLBACK_KEY] = "Gemini failed, heuristic " + " and ".join(failures)
+    return result
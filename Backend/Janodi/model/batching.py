@@ -0,0 +1,210 @@
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict
+
+# torch is imported inside the functions that need it: the /metrics route imports
+# this module and should not pull torch into API-only processes.
+
+logger = logging.getLogger(__name__)
+
+# Largest batch a LayoutLMv3 forward pass may combine, and how long the first
+# request of a batch waits for others to join. A batch size of 1 disables batching.
+LAYOUTLM_MAX_BATCH_SIZE = int(os.getenv("LAYOUTLM_MAX_BATCH_SIZE", "8"))
+LAYOUTLM_MAX_BATCH_WAIT_MS = float(os.getenv("LAYOUTLM_MAX_BATCH_WAIT_MS", "10"))
+
+# Encoding keys that are not per-token and are stacked as-is
+_NON_SEQUENCE_KEYS = {"pixel_values"}
+
+
+def collate_encodings(encodings, pad_token_id: int) -> Dict[str, "torch.Tensor"]:
+    """Right-pad encodings to the longest one and stack their rows into one batch."""
+    import torch
+    max_len = max(int(e["input_ids"].shape[1]) for e in encodings)
+    batch = {}
+    for key in encodings[0].keys():
+        tensors = [e[key] for e in encodings]
+        if key in _NON_SEQUENCE_KEYS:
+            batch[key] = torch.cat(tensors, dim=0)
+            continue
+        fill = pad_token_id if key == "input_ids" else 0
+        padded = []
+        for t in tensors:
+            pad = max_len - t.shape[1]
+            if pad:
+                filler = torch.full((t.shape[0], pad) + tuple(t.shape[2:]), fill, dtype=t.dtype)
+                t = torch.cat([t, filler], dim=1)
+            padded.append(t)
+        batch[key] = torch.cat(padded, dim=0)
+    return batch
+
+
+class _Request:
+    __slots__ = ("encoding", "rows", "length", "logits", "error", "done", "queued_at")
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.rows = int(encoding["input_ids"].shape[0])
+        self.length = int(encoding["input_ids"].shape[1])
+        self.logits = None
+        self.error = None
+        self.done = threading.Event()
+        self.queued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """Collects single-document encodings from concurrent callers and runs them as one forward pass.
+
+    Callers block in ``infer`` until their own slice of the batched logits is ready.
+    """
+
+    def __init__(self, name: str, model, pad_token_id: int = 1,
+                 max_batch_size: int = None, max_wait_ms: float = None):
+        self.name = name
+        self.model = model
+        self.pad_token_id = pad_token_id
+        self.max_batch_size = max(1, max_batch_size if max_batch_size is not None else LAYOUTLM_MAX_BATCH_SIZE)
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else LAYOUTLM_MAX_BATCH_WAIT_MS) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = {}
+        self.queue_wait_ms = 0.0
+
+    def infer(self, encoding) -> "torch.Tensor":
+        """Return logits of shape (rows, seq_len, num_labels) for one encoding.
+
+        An encoding may hold several rows (sliding windows of one page); they stay together in one batch.
+        """
+        if self.max_batch_size == 1:
+            import torch
+            with torch.no_grad():
+                logits = self.model(**encoding).logits
+            self._record(int(encoding["input_ids"].shape[0]), 0.0)
+            return logits
+        self._ensure_thread()
+        req = _Request(encoding)
+        self._queue.put(req)
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.logits
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": round(self.items / self.batches, 3) if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "mean_queue_wait_ms": round(self.queue_wait_ms / self.items, 3) if self.items else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name=f"batcher-{self.name}", daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        carried = None
+        while True:
+            if carried is not None:
+                first, carried = carried, None
+            else:
+                first = self._queue.get()
+            if first is None:
+                return
+            # A request with more windows than max_batch_size still runs, alone
+            batch = [first]
+            rows = first.rows
+            deadline = time.perf_counter() + self.max_wait
+            stop = False
+            while rows < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    req = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if req is None:
+                    stop = True
+                    break
+                if rows + req.rows > self.max_batch_size:
+                    # Its windows stay together; it opens the next batch instead
+                    carried = req
+                    break
+                batch.append(req)
+                rows += req.rows
+            self._run(batch)
+            if stop:
+                return
+
+    def _run(self, batch):
+        import torch
+        started = time.perf_counter()
+        try:
+            inputs = collate_encodings([r.encoding for r in batch], self.pad_token_id)
+            with torch.no_grad():
+                logits = self.model(**inputs).logits
+            offset = 0
+            for r in batch:
+                r.logits = logits[offset:offset + r.rows, :r.length]
+                offset += r.rows
+        except Exception as e:
+            logger.exception("Batched %s inference failed for %d item(s)", self.name, len(batch))
+            for r in batch:
+                r.error = e
+        finally:
+            self._record(sum(r.rows for r in batch), sum((started - r.queued_at) * 1000.0 * r.rows for r in batch))
+            for r in batch:
+                r.done.set()
+
+    def _record(self, size: int, wait_ms: float):
+        with self._stats_lock:
+            self.batches += 1
+            self.items += size
+            self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+            self.queue_wait_ms += wait_ms
+
+
+_batchers: Dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(name: str, model, pad_token_id: int = 1) -> MicroBatcher:
+    """Return the batcher for ``name``, replacing it if the underlying model object changed."""
+    with _batchers_lock:
+        batcher = _batchers.get(name)
+        if batcher is None or batcher.model is not model:
+            if batcher is not None:
+                batcher.close()
+            batcher = MicroBatcher(name, model, pad_token_id=pad_token_id)
+            _batchers[name] = batcher
+        return batcher
+
+
+def drop_batcher(name: str):
+    """Stop and forget the batcher for ``name`` (its model was unloaded)."""
+    with _batchers_lock:
+        batcher = _batchers.pop(name, None)
+    if batcher is not None:
+        batcher.close()
+
+
+def batching_stats() -> dict:
+    with _batchers_lock:
+        return {name: b.stats() for name, b in _batchers.items()}
@@ -1,31 +1,46 @@
 import logging
-from typing import Dict
+from typing import Dict, Optional
 import os
-import easyocr
-from PIL import Image
 import torch
 from transformers import AutoProcessor, AutoModelForTokenClassification
 import re
 
+from ..services.image_io import as_bgr, as_rgb, describe
+from ..services.ocr_service import OcrResult, normalize_boxes, ocr_engine_for, run_ocr
+from ..services.result_cache import FALLBACK_KEY
+from .batching import drop_batcher, get_batcher
+from .layoutlm_encoding import encode_document, word_predictions
+from .model_ids import INVOICE_MODEL_ID
+from .onnx_backend import drop_runners, inference_model
+from .quantization import maybe_quantize
+from .reading_order import reading_order_indices
+from .registry import model_registry
+
 logger = logging.getLogger(__name__)
 
-# Lazy-loaded globals
-_MODEL_ID = "Mickeymarsh02/layoutlmv3-multimodel-finetuned-invoices03"
-_processor = None
-_model = None
-_reader = None
+# Loaded lazily through the model registry, which may unload it again when idle
+_MODEL_ID = INVOICE_MODEL_ID
+
+
+def _load_invoice_model():
+    logger.info("Loading invoice processor/model: %s (anonymous access)", _MODEL_ID)
+    # New model does not require an HF token; load processor and model directly
+    processor = AutoProcessor.from_pretrained(_MODEL_ID)
+    model = maybe_quantize(_MODEL_ID, AutoModelForTokenClassification.from_pretrained(_MODEL_ID))
+    return processor, model
+
+
+def _unload_invoice_model(_value):
+    drop_batcher("invoice")
+    drop_runners(_MODEL_ID)
+
+
+model_registry.register("invoice", _load_invoice_model, on_evict=_unload_invoice_model)
 
 
 def _init_invoice_model():
-    global _processor, _model, _reader
-    if _processor is None or _model is None:
-        logger.info("Loading invoice processor/model: %s (anonymous access)", _MODEL_ID)
-        # New model does not require an HF token; load processor and model directly
-        _processor = AutoProcessor.from_pretrained(_MODEL_ID)
-        _model = AutoModelForTokenClassification.from_pretrained(_MODEL_ID)
-        # easyocr reader for text/box extraction (used to build text+boxes input)
-        _reader = easyocr.Reader(['en'])
-    return _processor, _model, _reader
+    """Return (processor, model), loading them if needed."""
+    return model_registry.get("invoice")
 
 
 _FIELD_MAP = {
@@ -51,102 +66,65 @@ _FIELD_MAP = {
 }
 
 
-def _reading_order(entries, H, y_tol=0.015):
-    lines = {}
-    for t, (x1, y1, x2, y2) in entries:
-        yc = (y1 + y2) / 2
-        placed = False
-        for k in list(lines.keys()):
-            if abs(k - yc) <= y_tol * H:
-                lines[k].append((t, [x1, y1, x2, y2]))
-                placed = True
-                break
-        if not placed:
-            lines[yc] = [(t, [x1, y1, x2, y2])]
-    ordered = []
-    for k in sorted(lines.keys()):
-        line = sorted(lines[k], key=lambda e: e[1][0])
-        ordered.extend(line)
-    return ordered
-
-
-def extract_invoice_structured_data(image_path: str) -> Dict[str, str]:
+def extract_invoice_structured_data(image, ocr: Optional[OcrResult] = None) -> Dict[str, str]:
     """Run the invoice NER model and return a dict with keys:
     Address, Date, Item, OrderId, Subtotal, Tax, Title, TotalPrice
+
+    ``image`` is a decoded BGR array (as from ``cv2.imdecode``), a PIL image or a path;
+    OCR and the LayoutLMv3 processor see the same pixels. Pass ``ocr`` to reuse
+    detections already computed for this image; otherwise OCR runs here.
     """
     try:
-        processor, model, reader = _init_invoice_model()
+        # Held until the prediction is done so the registry cannot unload it mid-inference
+        processor, model = model_registry.acquire("invoice")
     except Exception as e:
         logger.exception("Failed to initialize invoice model: %s", e)
-        return {k: "" for k in [
+        return {**{k: "" for k in [
             "customer_address", "customer_name", "due_date", "invoice_date", "invoice_number", "invoice_subtotal", "invoice_total",
             "item_description", "item_quantity", "item_total_price", "item_unit_price", "supplier_address", "supplier_name", "tax_amount", "tax_rate"
-        ]}
+        ]}, FALLBACK_KEY: "invoice model unavailable"}
 
     try:
-        raw = reader.readtext(image_path)
-        img = Image.open(image_path).convert("RGB")
-        W, H = img.size
+        bgr = as_bgr(image)
+        if ocr is None:
+            ocr = run_ocr(bgr, ocr_engine_for("invoice"))
+        img = as_rgb(bgr)
+        W, H = ocr.image_size
 
-        tmp = []
         CONF_THRESH = 0.3
-        for poly, text, conf in raw:
-            if not text or conf < CONF_THRESH:
-                continue
-            xs = [p[0] for p in poly]
-            ys = [p[1] for p in poly]
-            x1, y1, x2, y2 = max(0, min(xs)), max(0, min(ys)), min(W, max(xs)), min(H, max(ys))
-            tmp.append((text, [x1, y1, x2, y2]))
-
-        ordered = _reading_order(tmp, H)
-        words = []
-        boxes = []
-        for t, (x1, y1, x2, y2) in ordered:
-            b = [
-                int(1000 * x1 / W),
-                int(1000 * y1 / H),
-                int(1000 * x2 / W),
-                int(1000 * y2 / H),
-            ]
-            b = [min(1000, max(0, v)) for v in b]
-            words.append(t)
-            boxes.append(b)
+        words, pixel_boxes = ocr.select(CONF_THRESH)
+
+        order = reading_order_indices(pixel_boxes, H)
+        words = [words[i] for i in order]
+        boxes = normalize_boxes(pixel_boxes[order], ocr.image_size).tolist()
 
         if len(words) == 0:
-            logger.info("No OCR words after filtering for %s", image_path)
+            logger.info("No OCR words after filtering for %s", describe(image))
             return {k: "" for k in [
                 "customer_address", "customer_name", "due_date", "invoice_date", "invoice_number", "invoice_subtotal", "invoice_total",
                 "item_description", "item_quantity", "item_total_price", "item_unit_price", "supplier_address", "supplier_name", "tax_amount", "tax_rate"
             ]}
 
-        encoding = processor(images=img, text=words, boxes=boxes, return_tensors="pt", padding="max_length", truncation=True, max_length=512)
+        encoding = encode_document(processor, img, words, boxes)
         # ensure bbox type
         if "bbox" in encoding:
             encoding["bbox"] = encoding["bbox"].to(torch.long)
 
-        with torch.no_grad():
-            outputs = model(**encoding)
+        # Concurrent extractions share one batched forward pass
+        runner = inference_model(_MODEL_ID, model)
+        logits = get_batcher("invoice", runner, processor.tokenizer.pad_token_id).infer(encoding)
+        pred_ids = logits.argmax(-1).tolist()
 
-        logits = outputs.logits
-        pred_ids = logits.argmax(-1).squeeze(0).tolist()
-        word_ids = encoding.word_ids(batch_index=0)
-
-        # Map token predictions back to word-level labels (first token wins)
+        # Map token predictions back to word-level labels (first token wins, merged across windows)
         word_level_labels = []
-        used = set()
         id2label = model.config.id2label
-        for tok_idx, widx in enumerate(word_ids):
-            if widx is None or widx in used:
-                continue
-            used.add(widx)
-            lab = id2label.get(pred_ids[tok_idx], "O")
+        for pred in word_predictions(encoding, pred_ids, len(words)):
+            lab = id2label.get(pred, "O") if pred is not None else "O"
             # normalize label prefixes
             if lab.startswith("B-") or lab.startswith("I-") or lab.startswith("S-") or lab.startswith("E-"):
                 lab = lab.split("-", 1)[1]
             word_level_labels.append(lab.upper())
 
-        word_level_labels = word_level_labels[:len(words)]
-
         raw_struct = {}
         for w, lab in zip(words, word_level_labels):
             if not lab or lab == "O":
@@ -204,8 +182,10 @@ def extract_invoice_structured_data(image_path: str) -> Dict[str, str]:
         result.update(model_labels)
         return result
     except Exception as e:
-        logger.exception("Error extracting invoice structured data from %s: %s", image_path, e)
-        return {k: "" for k in [
+        logger.exception("Error extracting invoice structured data from %s: %s", describe(image), e)
+        return {**{k: "" for k in [
             "customer_address", "customer_name", "due_date", "invoice_date", "invoice_number", "invoice_subtotal", "invoice_total",
             "item_description", "item_quantity", "item_total_price", "item_unit_price", "supplier_address", "supplier_name", "tax_amount", "tax_rate"
-        ]}
+        ]}, FALLBACK_KEY: "invoice model error"}
+    finally:
+        model_registry.release("invoice")
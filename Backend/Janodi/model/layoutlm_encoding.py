@@ -0,0 +1,114 @@
+import logging
+import os
+from typing import List, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+MAX_SEQ_LENGTH = 512
+
+# How LayoutLMv3 inputs are padded:
+#   "bucket"     - pad to the smallest of LAYOUTLM_LENGTH_BUCKETS that fits (default)
+#   "longest"    - no padding beyond the document's own token count
+#   "max_length" - always pad to 512 (previous behaviour)
+LAYOUTLM_PADDING = os.getenv("LAYOUTLM_PADDING", "bucket").lower()
+LAYOUTLM_LENGTH_BUCKETS = sorted(
+    int(b) for b in os.getenv("LAYOUTLM_LENGTH_BUCKETS", "128,256,384,512").split(",") if b.strip()
+)
+# Documents longer than 512 tokens are split into overlapping windows instead of
+# being truncated. LAYOUTLM_WINDOW_STRIDE is the number of tokens shared by neighbours.
+LAYOUTLM_SLIDING_WINDOW = os.getenv("LAYOUTLM_SLIDING_WINDOW", "1") == "1"
+LAYOUTLM_WINDOW_STRIDE = int(os.getenv("LAYOUTLM_WINDOW_STRIDE", "128"))
+
+
+def bucket_length(length: int, buckets: List[int] = None) -> int:
+    """Smallest bucket that holds ``length`` tokens, capped at MAX_SEQ_LENGTH."""
+    for b in (buckets or LAYOUTLM_LENGTH_BUCKETS):
+        if b >= length:
+            return min(b, MAX_SEQ_LENGTH)
+    return MAX_SEQ_LENGTH
+
+
+def pad_encoding(encoding, target_length: int, pad_token_id: int):
+    """Right-pad the per-token tensors of a single-item encoding to ``target_length`` in place.
+
+    Padded positions get attention_mask 0, so token predictions are unchanged;
+    ``encoding.word_ids()`` still covers only the real tokens.
+    """
+    length = int(encoding["input_ids"].shape[1])
+    pad = target_length - length
+    if pad <= 0:
+        return encoding
+    for key in list(encoding.keys()):
+        if key == "pixel_values":
+            continue
+        t = encoding[key]
+        fill = pad_token_id if key == "input_ids" else 0
+        filler = torch.full((t.shape[0], pad) + tuple(t.shape[2:]), fill, dtype=t.dtype)
+        encoding[key] = torch.cat([t, filler], dim=1)
+    return encoding
+
+
+def encode_document(processor, img, words, boxes, padding: str = None, windowed: bool = None):
+    """Build LayoutLMv3 inputs for one page, padded according to ``padding`` (default LAYOUTLM_PADDING).
+
+    With sliding windows enabled the result has one row per 512-token window
+    (all sharing the page image); use ``word_predictions`` to map the batched
+    predictions back to words.
+    """
+    mode = (padding or LAYOUTLM_PADDING).lower()
+    windowed = LAYOUTLM_SLIDING_WINDOW if windowed is None else windowed
+
+    kwargs = dict(
+        images=img,
+        text=words,
+        boxes=boxes,
+        return_tensors="pt",
+        truncation=True,
+        max_length=MAX_SEQ_LENGTH,
+    )
+    if windowed:
+        kwargs.update(stride=LAYOUTLM_WINDOW_STRIDE, return_overflowing_tokens=True, return_offsets_mapping=True)
+    if mode == "max_length":
+        kwargs["padding"] = "max_length"
+    else:
+        # Windows of one page must share a length to be stacked
+        kwargs["padding"] = "longest" if windowed else False
+
+    encoding = processor(**kwargs)
+    encoding.pop("offset_mapping", None)
+    encoding.pop("overflow_to_sample_mapping", None)
+    if isinstance(encoding.get("pixel_values"), list):
+        # The processor repeats the page image per window as a list
+        encoding["pixel_values"] = torch.stack([torch.as_tensor(p) for p in encoding["pixel_values"]])
+
+    if mode == "bucket" and encoding["input_ids"].shape[0] == 1:
+        length = int(encoding["input_ids"].shape[1])
+        pad_encoding(encoding, bucket_length(length), processor.tokenizer.pad_token_id)
+    return encoding
+
+
+def word_predictions(encoding, pred_ids: List[List[int]], num_words: int) -> List[Optional[int]]:
+    """Map per-window token predictions to one prediction per word.
+
+    Each word takes the prediction of its first sub-token. When windows overlap,
+    the window where that token is furthest from a window edge wins; ties go to
+    the earlier window. Words that no window covers get None.
+    """
+    best = {}
+    for row, preds in enumerate(pred_ids):
+        word_ids = encoding.word_ids(batch_index=row)
+        real = [i for i, w in enumerate(word_ids) if w is not None]
+        if not real:
+            continue
+        first, last = real[0], real[-1]
+        seen = set()
+        for tok_idx, widx in enumerate(word_ids):
+            if widx is None or widx in seen:
+                continue
+            seen.add(widx)
+            context = min(tok_idx - first, last - tok_idx)
+            if widx not in best or context > best[widx][0]:
+                best[widx] = (context, preds[tok_idx])
+    return [best[w][1] if w in best else None for w in range(num_words)]
@@ -0,0 +1,5 @@
+# Hugging Face ids of the fine-tuned LayoutLMv3 checkpoints. This module imports
+# nothing, so light code (e.g. the result cache key) can name the models without
+# pulling in torch or transformers.
+RECEIPT_MODEL_ID = "janodis/layoutlmv3-refinetuned-receipts"
+INVOICE_MODEL_ID = "Mickeymarsh02/layoutlmv3-multimodel-finetuned-invoices03"
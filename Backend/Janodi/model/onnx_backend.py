@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import torch
+
+from .quantization import quantization_enabled, quantize_onnx_int8
+
+logger = logging.getLogger(__name__)
+
+# "torch" runs the Hugging Face model eagerly; "onnx" exports it once and runs it with
+# onnxruntime's CPU execution provider. onnx/onnxruntime are optional dependencies.
+LAYOUTLM_BACKEND = os.getenv("LAYOUTLM_BACKEND", "torch").lower()
+# Exported graphs are cached here as <model id>/<revision>/model.onnx
+LAYOUTLM_ONNX_CACHE_DIR = os.getenv(
+    "LAYOUTLM_ONNX_CACHE_DIR",
+    str(Path(__file__).resolve().parents[2] / "models" / "onnx"),
+)
+ONNX_OPSET = 17
+
+_INPUT_NAMES = ["input_ids", "bbox", "attention_mask", "pixel_values"]
+
+_runners = {}
+_runners_lock = threading.Lock()
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Positional-argument wrapper so the exported graph has a fixed input order and a single output."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, bbox, attention_mask, pixel_values):
+        return self.model(input_ids=input_ids, bbox=bbox, attention_mask=attention_mask, pixel_values=pixel_values).logits
+
+
+def model_revision(model) -> str:
+    """Hub commit hash the weights were loaded from, or 'local' for unpinned weights."""
+    return getattr(model.config, "_commit_hash", None) or "local"
+
+
+def onnx_path(model_id: str, model) -> Path:
+    return Path(LAYOUTLM_ONNX_CACHE_DIR) / model_id.replace("/", "--") / model_revision(model) / "model.onnx"
+
+
+def export_onnx(model, path: Path, sample_inputs: dict = None) -> Path:
+    """Export a LayoutLMv3 token classifier with dynamic batch and sequence axes."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if sample_inputs is None:
+        image_size = getattr(model.config, "input_size", 224)
+        sample_inputs = {
+            "input_ids": torch.ones(1, 16, dtype=torch.long),
+            "bbox": torch.zeros(1, 16, 4, dtype=torch.long),
+            "attention_mask": torch.ones(1, 16, dtype=torch.long),
+            "pixel_values": torch.zeros(1, 3, image_size, image_size),
+        }
+    args = tuple(sample_inputs[name] for name in _INPUT_NAMES)
+    tmp_path = path.with_suffix(".onnx.tmp")
+    logger.info("Exporting ONNX graph to %s", path)
+    # A fresh Module is in train mode and export restores that mode recursively,
+    # which would switch dropout on in the shared torch model; keep both in eval.
+    wrapper = _LogitsOnly(model).eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            args,
+            str(tmp_path),
+            input_names=_INPUT_NAMES,
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "bbox": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "pixel_values": {0: "batch"},
+                "logits": {0: "batch", 1: "sequence"},
+            },
+            opset_version=ONNX_OPSET,
+            dynamo=False,
+        )
+    # Rename last so a crashed export never leaves a half-written graph in the cache
+    os.replace(tmp_path, path)
+    return path
+
+
+class OnnxTokenClassifier:
+    """onnxruntime session that can stand in for LayoutLMv3ForTokenClassification at inference time.
+
+    Calling it returns an object with a torch ``logits`` tensor, and ``config`` is
+    the original model config, so extractors and the micro-batcher work unchanged.
+    """
+
+    def __init__(self, path: Path, config, intra_op_threads: int = 0):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(str(path), sess_options=options, providers=["CPUExecutionProvider"])
+        self.config = config
+        self.path = path
+
+    def __call__(self, **inputs):
+        feed = {}
+        for name in _INPUT_NAMES:
+            value = inputs[name]
+            if isinstance(value, torch.Tensor):
+                value = value.numpy()
+            feed[name] = value.astype("float32") if name == "pixel_values" else value.astype("int64")
+        logits = self.session.run(["logits"], feed)[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+
+def inference_model(model_id: str, model):
+    """Return what the extractor should run: ``model`` itself, or its cached ONNX session.
+
+    Falls back to the torch model (and logs why) if onnxruntime is missing or export fails.
+    """
+    if LAYOUTLM_BACKEND != "onnx":
+        return model
+    key = (model_id, model_revision(model))
+    runner = _runners.get(key)
+    if runner is not None:
+        return runner
+    with _runners_lock:
+        runner = _runners.get(key)
+        if runner is None:
+            try:
+                path = onnx_path(model_id, model)
+                if not path.exists():
+                    export_onnx(model, path)
+                if quantization_enabled(model_id, model_revision(model), "onnx"):
+                    int8_path = path.with_name("model.int8.onnx")
+                    if not int8_path.exists():
+                        quantize_onnx_int8(path, int8_path)
+                    path = int8_path
+                runner = OnnxTokenClassifier(path, model.config, intra_op_threads=torch.get_num_threads())
+                logger.info("Using ONNX Runtime for %s (%s)", model_id, path)
+            except Exception:
+                logger.exception("ONNX backend unavailable for %s, using PyTorch", model_id)
+                runner = model
+            _runners[key] = runner
+    return runner
+
+
+def drop_runners(model_id: str):
+    """Forget cached ONNX sessions of ``model_id`` (the graph files stay on disk)."""
+    with _runners_lock:
+        for key in [k for k in _runners if k[0] == model_id]:
+            del _runners[key]
@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Opt-in INT8 inference. A model is only quantized if the accuracy gate file
+# (written by benchmarks/eval_quantization.py) approved its id and revision on the
+# backend in use: torch dynamic INT8 and ONNX Runtime INT8 are evaluated separately.
+LAYOUTLM_QUANTIZE = os.getenv("LAYOUTLM_QUANTIZE", "0") == "1"
+QUANTIZATION_GATE_FILE = os.getenv(
+    "QUANTIZATION_GATE_FILE",
+    str(Path(__file__).resolve().parents[2] / "models" / "quantization_gate.json"),
+)
+# Minimum share of (image, field) pairs on which INT8 must match fp32
+QUANTIZATION_MIN_AGREEMENT = float(os.getenv("QUANTIZATION_MIN_AGREEMENT", "0.98"))
+
+_warned = set()
+_gate_lock = threading.Lock()
+
+
+def quantize_dynamic_int8(model, inplace: bool = False):
+    """Dynamic INT8 quantization of the Linear layers (weights int8, activations quantized per batch).
+
+    LayoutLMv3's rel_pos_* layers are only used as lookup tables through ``.weight``
+    and stay fp32.
+    """
+    qconfig = torch.ao.quantization.default_dynamic_qconfig
+    spec = {
+        name: qconfig
+        for name, module in model.named_modules()
+        if isinstance(module, torch.nn.Linear) and not name.rsplit(".", 1)[-1].startswith("rel_pos")
+    }
+    return torch.ao.quantization.quantize_dynamic(model, spec, dtype=torch.qint8, inplace=inplace)
+
+
+def quantize_onnx_int8(src: Path, dst: Path) -> Path:
+    """ONNX Runtime dynamic INT8 quantization of an exported graph."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    tmp = dst.with_suffix(".onnx.tmp")
+    quantize_dynamic(str(src), str(tmp), weight_type=QuantType.QInt8)
+    os.replace(tmp, dst)
+    return dst
+
+
+def read_gate() -> dict:
+    try:
+        with open(QUANTIZATION_GATE_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _gate_entry(gate: dict, model_id: str, backend: str):
+    entry = gate.get(model_id)
+    # Entries are stored per backend; a flat entry from before that split approves nothing
+    entry = entry.get(backend) if isinstance(entry, dict) else None
+    return entry if isinstance(entry, dict) else None
+
+
+def gate_allows(model_id: str, revision: str, backend: str) -> bool:
+    """True if the accuracy gate approved INT8 for exactly this model id, revision and backend."""
+    entry = _gate_entry(read_gate(), model_id, backend)
+    return bool(entry and entry.get("approved") and entry.get("revision") == revision
+                and entry.get("backend") == backend)
+
+
+def record_gate(model_id: str, revision: str, backend: str, agreement: float, images: int,
+                threshold: float = None) -> dict:
+    """Store the evaluation result for ``model_id`` on ``backend`` ("torch" or "onnx");
+    approval requires agreement >= threshold."""
+    threshold = QUANTIZATION_MIN_AGREEMENT if threshold is None else threshold
+    entry = {
+        "backend": backend,
+        "revision": revision,
+        "agreement": round(agreement, 4),
+        "threshold": threshold,
+        "images": images,
+        "approved": images > 0 and agreement >= threshold,
+        "evaluated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    with _gate_lock:
+        gate = read_gate()
+        if not isinstance(gate.get(model_id), dict) or "revision" in gate[model_id]:
+            gate[model_id] = {}
+        gate[model_id][backend] = entry
+        Path(QUANTIZATION_GATE_FILE).parent.mkdir(parents=True, exist_ok=True)
+        with open(QUANTIZATION_GATE_FILE, "w") as f:
+            json.dump(gate, f, indent=2, sort_keys=True)
+    return entry
+
+
+def field_agreement(reference: List[Dict[str, str]], candidate: List[Dict[str, str]]) -> float:
+    """Share of (document, field) pairs where ``candidate`` has the same value as ``reference``.
+
+    Fields that both leave empty are not counted: most fields are empty on most
+    documents, and counting them would let a model that drops values pass the gate.
+    A value only one side found counts as a mismatch.
+    """
+    total = matched = 0
+    for ref, cand in zip(reference, candidate):
+        for key, value in ref.items():
+            other = cand.get(key, "")
+            if not value and not other:
+                continue
+            total += 1
+            matched += int(other == value)
+    return matched / total if total else 0.0
+
+
+def quantization_enabled(model_id: str, revision: str, backend: str) -> bool:
+    """Whether INT8 should be used for this model on ``backend``; logs once when the gate blocks it."""
+    if not LAYOUTLM_QUANTIZE:
+        return False
+    if gate_allows(model_id, revision, backend):
+        return True
+    if (model_id, backend) not in _warned:
+        _warned.add((model_id, backend))
+        logger.warning(
+            "LAYOUTLM_QUANTIZE is set but %s@%s has not passed the accuracy gate for the %s backend in %s; using fp32",
+            model_id, revision, backend, QUANTIZATION_GATE_FILE,
+        )
+    return False
+
+
+def maybe_quantize(model_id: str, model):
+    """Quantize a freshly loaded torch model in place when enabled and approved.
+
+    With the ONNX backend the torch weights stay fp32 (they are needed for export)
+    and the exported graph is quantized instead.
+    """
+    from .onnx_backend import LAYOUTLM_BACKEND, model_revision
+    if LAYOUTLM_BACKEND == "onnx" or not quantization_enabled(model_id, model_revision(model), "torch"):
+        return model
+    logger.info("Applying dynamic INT8 quantization to %s", model_id)
+    return quantize_dynamic_int8(model, inplace=True)
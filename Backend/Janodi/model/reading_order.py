@@ -0,0 +1,52 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+Entry = Tuple[str, Sequence[float]]
+
+
+def reading_order_indices(boxes, H: float, y_tol: float = 0.015) -> List[int]:
+    """Indices of ``boxes`` ((n, 4) [x1, y1, x2, y2], detection order) in reading order.
+
+    Lines run top to bottom, words in a line left to right. Boxes are sorted by
+    vertical center and swept once: a box joins the current line when its center
+    is within ``y_tol * H`` of the previous box's and not below the line's lowest
+    box edge (plus the same tolerance). Chaining to the previous box lets a
+    slightly skewed line drift gradually; the box-edge check stops it from
+    running into the next line.
+
+    O(n log n). When lines are separated by more than the tolerance and each
+    line's centers lie within it, the result equals the old per-word scan of
+    every line.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if not len(boxes):
+        return []
+    tol = y_tol * H
+    centers = (boxes[:, 1] + boxes[:, 3]) / 2
+    # Stable sort: equal centers keep detection order
+    order = np.argsort(centers, kind="stable").tolist()
+    centers, bottoms, lefts = centers.tolist(), boxes[:, 3].tolist(), boxes[:, 0]
+
+    line_ids = np.empty(len(order), dtype=np.int64)
+    line = -1
+    prev_yc = bottom = 0.0
+    for i in order:
+        yc = centers[i]
+        if line >= 0 and yc - prev_yc <= tol and yc <= bottom + tol:
+            bottom = max(bottom, bottoms[i])
+        else:
+            line += 1
+            bottom = bottoms[i]
+        line_ids[i] = line
+        prev_yc = yc
+
+    # One sort by (line, x, detection index): ties on x keep detection order,
+    # like the stable sort this replaced
+    return np.lexsort((np.arange(len(boxes)), lefts, line_ids)).tolist()
+
+
+def reading_order(entries: List[Entry], H: float, y_tol: float = 0.015) -> List[Tuple[str, list]]:
+    """``entries`` ((text, [x1, y1, x2, y2]) in detection order) sorted into reading order."""
+    order = reading_order_indices([box for _, box in entries], H, y_tol)
+    return [(entries[i][0], list(entries[i][1])) for i in order]
@@ -1,49 +1,43 @@
 import logging
-import torch
 from PIL import Image, ImageDraw
-import easyocr
 from transformers import LayoutLMv3Processor, LayoutLMv3ForTokenClassification
-import matplotlib.pyplot as plt
-from typing import Dict
+from typing import Dict, Optional
+
+from ..services.image_io import as_bgr, as_rgb, describe
+from ..services.ocr_service import OcrResult, normalize_boxes, ocr_engine_for, run_ocr
+from ..services.result_cache import FALLBACK_KEY
+from .batching import drop_batcher, get_batcher
+from .layoutlm_encoding import encode_document, word_predictions
+from .model_ids import RECEIPT_MODEL_ID
+from .onnx_backend import drop_runners, inference_model
+from .quantization import maybe_quantize
+from .reading_order import reading_order_indices
+from .registry import model_registry
 
 logger = logging.getLogger(__name__)
 
-# Lazy-loaded globals to avoid heavy work on module import
-_MODEL_NAME = "janodis/layoutlmv3-refinetuned-receipts"
-_processor = None
-_model = None
-_id2label = None
-_reader = None
+# Loaded lazily through the model registry, which may unload it again when idle
+_MODEL_NAME = RECEIPT_MODEL_ID
+
+
+def _load_model():
+    logger.info("Loading LayoutLMv3 processor and model: %s", _MODEL_NAME)
+    processor = LayoutLMv3Processor.from_pretrained(_MODEL_NAME, apply_ocr=False)
+    model = maybe_quantize(_MODEL_NAME, LayoutLMv3ForTokenClassification.from_pretrained(_MODEL_NAME))
+    return processor, model, model.config.id2label
+
+
+def _unload_model(_value):
+    drop_batcher("receipt")
+    drop_runners(_MODEL_NAME)
+
+
+model_registry.register("receipt", _load_model, on_evict=_unload_model)
 
 
 def _init_model():
-    global _processor, _model, _id2label, _reader
-    if _processor is None or _model is None:
-        logger.info("Loading LayoutLMv3 processor and model: %s", _MODEL_NAME)
-        _processor = LayoutLMv3Processor.from_pretrained(_MODEL_NAME, apply_ocr=False)
-        _model = LayoutLMv3ForTokenClassification.from_pretrained(_MODEL_NAME)
-        _id2label = _model.config.id2label
-        _reader = easyocr.Reader(['en'])
-    return _processor, _model, _id2label, _reader
-
-
-def _reading_order(entries, H, y_tol=0.015):
-    lines = {}
-    for t, (x1, y1, x2, y2) in entries:
-        yc = (y1 + y2) / 2
-        placed = False
-        for k in list(lines.keys()):
-            if abs(k - yc) <= y_tol * H:
-                lines[k].append((t, [x1, y1, x2, y2]))
-                placed = True
-                break
-        if not placed:
-            lines[yc] = [(t, [x1, y1, x2, y2])]
-    ordered = []
-    for k in sorted(lines.keys()):
-        line = sorted(lines[k], key=lambda e: e[1][0])
-        ordered.extend(line)
-    return ordered
+    """Return (processor, model, id2label), loading them if needed."""
+    return model_registry.get("receipt")
 
 
 _FIELD_MAP = {
@@ -74,79 +68,53 @@ def _normalize_label(raw_label: str) -> str:
     return lab
 
 
-def extract_receipt_structured_data(image_path: str) -> Dict[str, str]:
+def extract_receipt_structured_data(image, ocr: Optional[OcrResult] = None) -> Dict[str, str]:
     """Extract structured fields from a receipt image and return a dict with these keys:
     Address, Date, Item, OrderId, Subtotal, Tax, Title, TotalPrice
 
+    ``image`` is a decoded BGR array (as from ``cv2.imdecode``), a PIL image or a path;
+    OCR and the LayoutLMv3 processor see the same pixels. Pass ``ocr`` to reuse
+    detections already computed for this image; otherwise OCR runs here.
     This function is safe to import (no heavy work on import); model and reader are loaded lazily.
     """
     try:
-        processor, model, id2label, reader = _init_model()
+        # Held until the prediction is done so the registry cannot unload it mid-inference
+        processor, model, id2label = model_registry.acquire("receipt")
     except Exception as e:
         logger.exception("Failed to initialize model/processor: %s", e)
         # Return empty structured result to avoid crashing the server
-        return {k: "" for k in ["Address", "Date", "Item", "OrderId", "Subtotal", "Tax", "Title", "TotalPrice"]}
+        empty = {k: "" for k in ["Address", "Date", "Item", "OrderId", "Subtotal", "Tax", "Title", "TotalPrice"]}
+        return {**empty, FALLBACK_KEY: "receipt model unavailable"}
 
     try:
-        raw = reader.readtext(image_path)
-        img = Image.open(image_path).convert("RGB")
-        W, H = img.size
+        bgr = as_bgr(image)
+        if ocr is None:
+            ocr = run_ocr(bgr, ocr_engine_for("receipt"))
+        img = as_rgb(bgr)
+        W, H = ocr.image_size
 
-        tmp = []
         CONF_THRESH = 0.35
-        for poly, text, conf in raw:
-            if not text or conf < CONF_THRESH:
-                continue
-            xs = [p[0] for p in poly]
-            ys = [p[1] for p in poly]
-            x1, y1, x2, y2 = max(0, min(xs)), max(0, min(ys)), min(W, max(xs)), min(H, max(ys))
-            tmp.append((text, [x1, y1, x2, y2]))
-
-        ordered = _reading_order(tmp, H)
-        words = []
-        boxes = []
-        for t, (x1, y1, x2, y2) in ordered:
-            b = [
-                int(1000 * x1 / W),
-                int(1000 * y1 / H),
-                int(1000 * x2 / W),
-                int(1000 * y2 / H),
-            ]
-            b = [min(1000, max(0, v)) for v in b]
-            words.append(t)
-            boxes.append(b)
+        words, pixel_boxes = ocr.select(CONF_THRESH)
+
+        order = reading_order_indices(pixel_boxes, H)
+        words = [words[i] for i in order]
+        boxes = normalize_boxes(pixel_boxes[order], ocr.image_size).tolist()
 
         if len(words) == 0:
-            logger.info("No OCR words after filtering for %s", image_path)
+            logger.info("No OCR words after filtering for %s", describe(image))
             return {k: "" for k in ["Address", "Date", "Item", "OrderId", "Subtotal", "Tax", "Title", "TotalPrice"]}
 
-        encoding = processor(
-            images=img,
-            text=words,
-            boxes=boxes,
-            return_tensors="pt",
-            padding="max_length",
-            truncation=True,
-            max_length=512,
-        )
-
-        with torch.no_grad():
-            outputs = model(**encoding)
-
-        logits = outputs.logits
-        pred_ids = logits.argmax(-1).squeeze(0).tolist()
-        word_ids = encoding.word_ids(batch_index=0)
+        encoding = encode_document(processor, img, words, boxes)
+
+        # Concurrent extractions share one batched forward pass
+        runner = inference_model(_MODEL_NAME, model)
+        logits = get_batcher("receipt", runner, processor.tokenizer.pad_token_id).infer(encoding)
+        pred_ids = logits.argmax(-1).tolist()
         word_level_labels = []
-        used = set()
-        for tok_idx, widx in enumerate(word_ids):
-            if widx is None or widx in used:
-                continue
-            used.add(widx)
-            lbl = id2label.get(pred_ids[tok_idx], "")
+        for pred in word_predictions(encoding, pred_ids, len(words)):
+            lbl = id2label.get(pred, "") if pred is not None else ""
             word_level_labels.append(_normalize_label(lbl))
 
-        word_level_labels = word_level_labels[:len(words)]
-
         # Aggregate words by label
         raw_struct = {}
         for w, lab in zip(words, word_level_labels):
@@ -164,11 +132,15 @@ def extract_receipt_structured_data(image_path: str) -> Dict[str, str]:
 
         return final
     except Exception as e:
-        logger.exception("Error extracting structured data from %s: %s", image_path, e)
-        return {k: "" for k in ["Address", "Date", "Item", "OrderId", "Subtotal", "Tax", "Title", "TotalPrice"]}
+        logger.exception("Error extracting structured data from %s: %s", describe(image), e)
+        empty = {k: "" for k in ["Address", "Date", "Item", "OrderId", "Subtotal", "Tax", "Title", "TotalPrice"]}
+        return {**empty, FALLBACK_KEY: "receipt model error"}
+    finally:
+        model_registry.release("receipt")
 
 
 def display_image(image_path):
+    import matplotlib.pyplot as plt
     img = Image.open(image_path).convert("RGB")
     plt.figure(figsize=(10, 14))
     plt.imshow(img)
@@ -182,6 +154,7 @@ def display_image_with_boxes(image_path, boxes, labels=None):
     boxes: list of [x1, y1, x2, y2] in pixel coordinates
     labels: optional list of labels for each box
     """
+    import matplotlib.pyplot as plt
     img = Image.open(image_path).convert("RGB")
     draw = ImageDraw.Draw(img)
     for i, box in enumerate(boxes):
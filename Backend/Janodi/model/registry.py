@@ -0,0 +1,192 @@
+import gc
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for the weights of all registered models held in memory at once.
+# Idle models are evicted least-recently-used first; 0 disables the budget.
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+
+
+def _size_mb(value) -> float:
+    """Parameter and buffer bytes of every torch module in ``value`` (a model or a tuple holding one)."""
+    items = value if isinstance(value, (tuple, list)) else (value,)
+    total = 0
+    for item in items:
+        if hasattr(item, "parameters") and hasattr(item, "buffers"):
+            for t in list(item.parameters()) + list(item.buffers()):
+                total += t.numel() * t.element_size()
+    return total / 2**20
+
+
+class _Entry:
+    __slots__ = ("name", "loader", "on_evict", "value", "size_mb", "refs", "last_used",
+                 "loads", "evictions", "load_ms", "load_lock")
+
+    def __init__(self, name, loader, on_evict):
+        self.name = name
+        self.loader = loader
+        self.on_evict = on_evict
+        self.value = None
+        self.size_mb = 0.0
+        self.refs = 0
+        self.last_used = 0.0
+        self.loads = 0
+        self.evictions = 0
+        self.load_ms = None
+        self.load_lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Loads models on demand and keeps their combined size under a memory budget.
+
+    Callers hold a model between ``acquire`` and ``release``; only models with no
+    in-flight inference are evicted. A model that does not fit even after evicting
+    every idle one is still loaded (and logged), since the request needs it.
+    """
+
+    def __init__(self, budget_mb: float = None):
+        self.budget_mb = MODEL_MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader, on_evict=None):
+        """Declare how to load ``name``; ``on_evict(value)`` drops caches that still reference it."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                self._entries[name] = _Entry(name, loader, on_evict)
+            else:
+                entry.loader, entry.on_evict = loader, on_evict
+
+    def acquire(self, name: str):
+        """Return the loaded value for ``name``, loading it if needed, and mark it in use."""
+        entry = self._entries[name]
+        with entry.load_lock:
+            with self._lock:
+                if entry.value is not None:
+                    entry.refs += 1
+                    entry.last_used = time.monotonic()
+                    return entry.value
+                # Make room up front when the size is known from an earlier load
+                evicted = self._make_room(entry.size_mb, keep=entry)
+            if evicted:
+                gc.collect()
+
+            start = time.perf_counter()
+            value = entry.loader()
+            load_ms = (time.perf_counter() - start) * 1000
+
+            with self._lock:
+                entry.value = value
+                entry.size_mb = _size_mb(value)
+                entry.load_ms = round(load_ms, 1)
+                entry.loads += 1
+                entry.refs += 1
+                entry.last_used = time.monotonic()
+                evicted = self._make_room(0.0, keep=entry)
+                if self.budget_mb and self._resident_mb() > self.budget_mb:
+                    logger.warning("Model memory %.0f MiB exceeds budget %.0f MiB; all other models are in use",
+                                   self._resident_mb(), self.budget_mb)
+            if evicted:
+                gc.collect()
+            logger.info("Loaded model %s (%.0f MiB) in %.0f ms", name, entry.size_mb, load_ms)
+            return value
+
+    def release(self, name: str):
+        with self._lock:
+            entry = self._entries[name]
+            entry.refs = max(0, entry.refs - 1)
+            entry.last_used = time.monotonic()
+            # Get back under budget if a load had to overshoot while everything was in use
+            evicted = self._make_room(0.0, keep=None)
+        if evicted:
+            gc.collect()
+
+    def get(self, name: str):
+        """Load ``name`` if needed and return it without holding it in use (for preloading and warm-up)."""
+        value = self.acquire(name)
+        self.release(name)
+        return value
+
+    def put(self, name: str, value):
+        """Replace the loaded value of ``name``, e.g. with a quantized variant in benchmarks."""
+        with self._lock:
+            entry = self._entries[name]
+            entry.value = value
+            entry.size_mb = _size_mb(value)
+            entry.last_used = time.monotonic()
+
+    def evict(self, name: str) -> bool:
+        """Drop ``name`` now if it is loaded and idle."""
+        with self._lock:
+            entry = self._entries[name]
+            if entry.value is None or entry.refs:
+                return False
+            self._evict(entry)
+        gc.collect()
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            models = {
+                e.name: {
+                    "loaded": e.value is not None,
+                    "size_mb": round(e.size_mb, 1),
+                    "in_flight": e.refs,
+                    "loads": e.loads,
+                    "evictions": e.evictions,
+                    "last_load_ms": e.load_ms,
+                    "idle_s": round(now - e.last_used, 1) if e.value is not None and not e.refs else None,
+                }
+                for e in self._entries.values()
+            }
+            return {
+                "budget_mb": self.budget_mb,
+                "resident_mb": round(self._resident_mb(), 1),
+                "loads": sum(e.loads for e in self._entries.values()),
+                "evictions": sum(e.evictions for e in self._entries.values()),
+                "models": models,
+            }
+
+    def _resident_mb(self) -> float:
+        return sum(e.size_mb for e in self._entries.values() if e.value is not None)
+
+    def _make_room(self, needed_mb: float, keep) -> bool:
+        """Evict idle models, least recently used first, until ``needed_mb`` more fits. Caller holds the lock."""
+        if not self.budget_mb:
+            return False
+        evicted = False
+        idle = sorted(
+            (e for e in self._entries.values() if e.value is not None and not e.refs and e is not keep),
+            key=lambda e: e.last_used,
+        )
+        for entry in idle:
+            if self._resident_mb() + needed_mb <= self.budget_mb:
+                break
+            self._evict(entry)
+            evicted = True
+        return evicted
+
+    def _evict(self, entry):
+        # Runs under the registry lock so a concurrent reload cannot interleave with on_evict
+        value, entry.value = entry.value, None
+        entry.evictions += 1
+        logger.info("Evicting idle model %s (%.0f MiB)", entry.name, entry.size_mb)
+        if entry.on_evict is not None:
+            try:
+                entry.on_evict(value)
+            except Exception:
+                logger.exception("on_evict for %s failed", entry.name)
+
+
+# Process-wide registry shared by the receipt and invoice extractors
+model_registry = ModelRegistry()
+
+
+def registry_stats() -> dict:
+    return model_registry.stats()
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from ..services.warmup import readiness
+
+router = APIRouter()
+
+
+@router.get("/ready")
+async def get_readiness():
+    """
+    Readiness probe for load balancers: 200 once every configured model is loaded
+    and warmed, 503 (with per-model state, load time and memory) until then
+    """
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from typing import List
+from ..services import job_store
+from ..services.job_worker import JOB_POLL_INTERVAL, notify_new_job, wait_for_update
+import asyncio
+import logging
+import time
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(files: List[UploadFile] = File(...)):
+    """
+    Queue files for extraction and return a job id immediately.
+    Poll GET /api/jobs/{job_id} for per-file results.
+    """
+    payload = []
+    for file in files:
+        if not file.filename.lower().endswith((".png", ".jpg", ".jpeg", ".pdf")):
+            raise HTTPException(status_code=400, detail=f"Unsupported file type: {file.filename}")
+        payload.append((file.filename, await file.read()))
+
+    job_id = await asyncio.to_thread(job_store.create_job, payload)
+    notify_new_job()
+    return {"job_id": job_id, "status": "queued", "files": len(payload)}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to long-poll until the job is done"),
+):
+    """
+    Fetch job status and the parsed_data of every finished file
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        job = await asyncio.to_thread(job_store.get_job, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        remaining = deadline - time.monotonic()
+        if job["status"] == "done" or remaining <= 0:
+            return job
+        # Re-read the store at least every poll interval: with APP_ROLE=api the
+        # files are finished by a separate worker process that cannot notify us
+        await wait_for_update(min(remaining, JOB_POLL_INTERVAL))
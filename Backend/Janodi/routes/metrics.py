@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+from ..model.batching import batching_stats
+from ..model.registry import registry_stats
+from ..services.admission import admission_stats
+from ..services.near_duplicate import near_duplicate_stats
+from ..services.quality import quality_stats
+from ..services.result_cache import result_cache_stats
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Extraction pipeline counters for dashboards and autoscaling
+    """
+    return {
+        "layoutlm_batching": batching_stats(),
+        "model_registry": registry_stats(),
+        "admission": admission_stats(),
+        "result_cache": result_cache_stats(),
+        "near_duplicates": near_duplicate_stats(),
+        "quality_gate": quality_stats(),
+    }
@@ -1,198 +1,190 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
-import easyocr
-import cv2
-import numpy as np
-import re
-from pydantic import BaseModel
-from ..gemini_api import classify_document
-from ..model.receipts_model import extract_receipt_structured_data
-from ..model.invoice_model import extract_invoice_structured_data
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from ..services.admission import Overloaded, admission
+from ..services.executor import run_document
+from ..services.near_duplicate import NEAR_DUPLICATE_CHECK, image_hashes, near_duplicate_index
+from ..services.image_io import decode_thumbnail
+from ..services.pdf_io import is_pdf
+from ..services.quality import QUALITY_GATE, QUALITY_SIDE, quality_gate
+from ..services.result_cache import result_cache, result_key
+from ..services.extraction_service import process_document
+import asyncio
+import json
 import logging
-import tempfile
 import os
 import traceback
-from pathlib import Path
 
 router = APIRouter()
 
-# Initialize EasyOCR reader
-reader = easyocr.Reader(['en'])
-
 # Logger
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Files of one multi-file upload processed concurrently (the executor bounds total CPU work)
+UPLOAD_MAX_CONCURRENCY = int(os.getenv("UPLOAD_MAX_CONCURRENCY", "4"))
+
+
+
+def _error_entry(filename: str, status_code: int, detail: str, retry_after: int = None) -> dict:
+    entry = {"filename": filename, "error": detail, "status_code": status_code}
+    if retry_after is not None:
+        entry["retry_after"] = retry_after
+    return entry
+
+
+def _is_supported(filename: str) -> bool:
+    return filename.lower().endswith((".png", ".jpg", ".jpeg", ".pdf"))
+
+
+async def _read_upload(file: UploadFile) -> Optional[bytes]:
+    """Read an uploaded file's bytes; None if its type is not supported."""
+    logger.info(f"Received upload: filename=%s, content_type=%s", file.filename, file.content_type)
+    if not _is_supported(file.filename):
+        return None
+    contents = await file.read()
+    logger.info("Read %d bytes from uploaded file %s", len(contents), file.filename)
+    return contents
+
+
+async def _process_upload(filename: str, contents: Optional[bytes], semaphore: asyncio.Semaphore,
+                          user_id: Optional[str] = None, progress=None) -> dict:
+    """Process one file of a batch; failures become an error entry instead of aborting the batch."""
+    if contents is None:
+        return _error_entry(filename, 400, "Unsupported file type")
+
+    try:
+        # One small grayscale decode serves the quality gate and the near-duplicate hashes
+        check_duplicates = bool(user_id and NEAR_DUPLICATE_CHECK)
+        thumbnail = None
+        if (QUALITY_GATE or check_duplicates) and not is_pdf(contents, filename):
+            thumbnail = await asyncio.to_thread(decode_thumbnail, contents, QUALITY_SIDE)
+
+        # Blurry, dark, washed-out or text-free photos are sent back before any OCR runs
+        if QUALITY_GATE and thumbnail is not None:
+            report = await asyncio.to_thread(quality_gate.check, thumbnail)
+            if not report.ok:
+                entry = _error_entry(filename, 422, report.message)
+                entry["retake_photo"] = True
+                entry["quality"] = {"reasons": report.reasons, "metrics": report.metrics}
+                return entry
+
+        hashes = image_hashes(thumbnail) if check_duplicates and thumbnail is not None else None
+
+        async def extract():
+            # The admission controller bounds extraction across all requests and rejects
+            # with 429/503 when its queue is full instead of letting work pile up
+            async with semaphore, admission.slot():
+                if progress is not None:
+                    progress("started")
+                # Decode, OCR, classification and model inference all block; run them off the event loop.
+                # PDFs go through the same call and are processed page by page.
+                return await run_document(process_document, contents, filename, progress=progress)
+
+        # Re-uploads of the same bytes are answered from the result cache without OCR or inference
+        result = await result_cache.get_or_compute(result_key(contents), extract)
+        if hashes is not None:
+            # A re-shot or re-compressed copy of a photo this user already sent is flagged after
+            # extraction (it saves no work); look-alike photos of other documents are not,
+            # because their fields differ.
+            duplicate = near_duplicate_index.find(user_id, hashes, result)
+            if duplicate is not None:
+                return duplicate
+            near_duplicate_index.add(user_id, hashes, result, filename)
+        return result
+    except Overloaded as e:
+        logger.warning("Rejected %s: %s (retry after %ds)", filename, e.detail, e.retry_after)
+        return _error_entry(filename, e.status_code, e.detail, e.retry_after)
+    except Exception as e:
+        # Log full traceback for debugging, but return a generic error to the client
+        tb = traceback.format_exc()
+        logger.error("Error processing file %s: %s\n%s", filename, str(e), tb)
+        return _error_entry(filename, 500, f"Error processing file {filename}: {str(e)}")
 
 
-def extract_text_from_image(image_bytes: bytes) -> str:
-    # Convert bytes to numpy array
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    if img is None:
-        raise ValueError("Failed to decode image from bytes - cv2.imdecode returned None")
-
-    # Perform OCR
-    results = reader.readtext(img)
-
-    # Extract text
-    text = ' '.join([result[1] for result in results])
-    return text
-
-
-def parse_extracted_data_invoice(text: str) -> dict:
-    # Simple invoice parsing fallback
-    data = {
-        "customer_address": "",
-        "customer_name": "",
-        "due_date": "",
-        "invoice_date": "",
-        "invoice_number": "",
-        "invoice_subtotal": "",
-        "invoice_total": "",
-        "item_description": "",
-        "item_quantity": "",
-        "item_total_price": "",
-        "item_unit_price": "",
-        "supplier_address": "",
-        "supplier_name": "",
-        "tax_amount": "",
-        "tax_rate": ""
-    }
-    lines = text.split('\n') if '\n' in text else text.split(' ')
-    if lines:
-        data["Title"] = lines[0].strip()
-    date_pattern = r'\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\b'
-    date_match = re.search(date_pattern, text)
-    if date_match:
-        data["Date"] = date_match.group(1)
-    orderid_pattern = r'(Invoice\s*(?:#|No\.?|Number)?[:\s]*)(\w[\w-]*)'
-    orderid_match = re.search(orderid_pattern, text, re.IGNORECASE)
-    if orderid_match:
-        data["OrderId"] = orderid_match.group(2)
-    subtotal_match = re.search(r'Subtotal[:\s]*\$?([0-9,]+\.?[0-9]*)', text, re.IGNORECASE)
-    if subtotal_match:
-        data["Subtotal"] = subtotal_match.group(1)
-    tax_match = re.search(r'Tax[:\s]*\$?([0-9,]+\.?[0-9]*)', text, re.IGNORECASE)
-    if tax_match:
-        data["Tax"] = tax_match.group(1)
-    total_match = re.search(r'(Total(?:\s*Due|\s*Amount)?[:\s]*\$?)([0-9,]+\.?[0-9]*)', text, re.IGNORECASE)
-    if total_match:
-        data["TotalPrice"] = total_match.group(2)
-    return data
+@router.post("/upload")
+async def upload_files(files: List[UploadFile] = File(...), user_id: Optional[str] = Form(None)):
+    """
+    Extract data from every uploaded file, processing up to UPLOAD_MAX_CONCURRENCY at once.
+    Results are in input order; a file that fails gets an entry with "error" and "status_code".
+    With ``user_id``, a near-duplicate of one of that user's recent uploads (similar image,
+    same total, date and number) is still extracted, and its result is flagged with
+    "ProbableDuplicate": true and "DuplicateOf" set to the earlier filename. Only
+    byte-identical re-uploads skip extraction (result cache).
+    Photos failing the quality gate get a 422 entry with "retake_photo": true and the
+    reasons ("blurry", "too_dark", "overexposed", "no_text").
+    """
+    uploads = [(file.filename, await _read_upload(file)) for file in files]
+    semaphore = asyncio.Semaphore(max(1, UPLOAD_MAX_CONCURRENCY))
+    results = await asyncio.gather(*(_process_upload(name, contents, semaphore, user_id) for name, contents in uploads))
+
+    failed = [r for r in results if "error" in r and "status_code" in r]
+    if failed and len(failed) == len(results):
+        # Nothing succeeded: keep the plain HTTP error a single-file client expects
+        retry_after = failed[0].get("retry_after")
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+        raise HTTPException(status_code=failed[0]["status_code"], detail=failed[0]["error"], headers=headers)
+    return results
 
 
+def _ndjson(event: dict) -> str:
+    return json.dumps(event) + "\n"
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+@router.post("/upload/stream")
+async def upload_files_stream(
+    files: List[UploadFile] = File(...),
+    user_id: Optional[str] = Form(None),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$", description="ndjson or sse (Server-Sent Events)"),
+):
+    """
+    Streaming variant of /upload: each file's result is sent as soon as it is ready.
+
+    Events, one JSON object per line (NDJSON) or per SSE message, in completion order:
+      {"event": "accepted", "files": N}
+      {"event": "progress", "index": i, "filename": ..., "stage": "started" | "ocr" | "classify" | "extract"}
+      {"event": "result", "index": i, "filename": ..., "data": {...parsed_data...}}
+      {"event": "error", "index": i, "filename": ..., "error": ..., "status_code": ...}
+      {"event": "done", "succeeded": k, "failed": m}
+    PDF progress events also carry "page" and "pages". Stage events need the thread
+    executor; with EXTRACTION_EXECUTOR=process only "started" and the result are sent.
+    """
+    # Read every file before the response starts; the uploads are closed once this handler returns
+    uploads = [(file.filename, await _read_upload(file)) for file in files]
+    encode = _sse if format == "sse" else _ndjson
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+
+    async def events():
+        queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(max(1, UPLOAD_MAX_CONCURRENCY))
+
+        async def run(index: int, filename: str, contents: Optional[bytes]):
+            def progress(stage, **info):
+                queue.put_nowait({"event": "progress", "index": index, "filename": filename, "stage": stage, **info})
+
+            result = await _process_upload(filename, contents, semaphore, user_id, progress)
+            if "error" in result and "status_code" in result:
+                queue.put_nowait({"event": "error", "index": index, **result})
+            else:
+                queue.put_nowait({"event": "result", "index": index, "filename": filename, "data": result})
 
-@router.post("/upload")
-async def upload_files(files: List[UploadFile] = File(...)):
-    results = []
-    for file in files:
-        logger.info(f"Received upload: filename=%s, content_type=%s", file.filename, file.content_type)
-        if not file.filename.lower().endswith((".png", ".jpg", ".jpeg", ".pdf")):
-            raise HTTPException(status_code=400, detail="Unsupported file type")
-
-        temp_path = None
+        tasks = [asyncio.create_task(run(i, name, contents)) for i, (name, contents) in enumerate(uploads)]
         try:
-            contents = await file.read()
-            logger.info("Read %d bytes from uploaded file %s", len(contents), file.filename)
-
-            if file.filename.lower().endswith('.pdf'):
-                raise HTTPException(status_code=400, detail="PDF support not implemented yet")
-
-            # Save image to a secure temporary file (unique)
-            suffix = Path(file.filename).suffix or ".jpg"
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, prefix="upload_", dir=None) as tmp:
-                tmp.write(contents)
-                temp_path = tmp.name
-            logger.info("Saved uploaded file to %s", temp_path)
-
-            # Quick validation: try to decode the saved file with cv2
-            nparr = np.frombuffer(contents, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            if img is None:
-                # Try to read from saved file as a fallback
-                img = cv2.imread(temp_path)
-            if img is None:
-                raise ValueError("Uploaded image could not be decoded by OpenCV")
-
-            # Extract text
-            text = extract_text_from_image(contents)
-
-            # Classify document and get expense type
-            try:
-                doc_class = classify_document(text)
-                # If Gemini returns a JSON string, parse it
-                import json
-                if isinstance(doc_class, str):
-                    try:
-                        doc_json = json.loads(doc_class)
-                        doc_type = doc_json.get("document_type", "unknown")
-                        expense_type = doc_json.get("expense_type", "unknown")
-                    except Exception:
-                        doc_type = doc_class
-                        expense_type = "unknown"
-                elif isinstance(doc_class, dict):
-                    doc_type = doc_class.get("document_type", "unknown")
-                    expense_type = doc_class.get("expense_type", "unknown")
-                else:
-                    doc_type = str(doc_class)
-                    expense_type = "unknown"
-                logger.info(f"Classified document {file.filename} as {doc_type}, expense type: {expense_type}")
-            except Exception as e:
-                logger.exception("Document classification failed, defaulting to 'invoice' and 'unknown'")
-                doc_type = "invoice"
-                expense_type = "unknown"
-
-            # Normalize unknown expense types to 'other'
-            normalized_expense_type = expense_type if expense_type and expense_type.lower() not in ["unknown", "", None] else "other"
-
-            if doc_type == "receipt":
-                logger.info("Receipt detected for file %s", file.filename)
-                structured = extract_receipt_structured_data(temp_path)
-                if not isinstance(structured, dict):
-                    raise ValueError("Receipt model did not return a dict")
-                parsed_data = {k: ' '.join(v) if isinstance(v, list) else v for k, v in structured.items()}
-                parsed_data["DocumentType"] = "receipt"
-                parsed_data["ExpenseType"] = normalized_expense_type
-            elif doc_type == "invoice":
-                logger.info("Invoice detected for file %s", file.filename)
-                try:
-                    structured = extract_invoice_structured_data(temp_path)
-                    if isinstance(structured, dict) and any(v for v in structured.values()):
-                        parsed_data = {k: ' '.join(v) if isinstance(v, list) else v for k, v in structured.items()}
-                        logger.info("Invoice model produced structured data for %s", file.filename)
-                    else:
-                        logger.info("Invoice model returned empty result for %s, using regex fallback", file.filename)
-                        parsed_data = parse_extracted_data_invoice(text)
-                except Exception as exc:
-                    tb = traceback.format_exc()
-                    logger.error("Invoice model error for %s: %s\n%s", file.filename, str(exc), tb)
-                    if 'gated' in str(exc).lower() or '401' in str(exc) or 'access' in str(exc).lower():
-                        logger.error("Invoice model appears to be gated or requires HF authentication. Set HUGGINGFACE_HUB_TOKEN env var with a token that has access.")
-                    parsed_data = parse_extracted_data_invoice(text)
-                parsed_data["DocumentType"] = "invoice"
-                parsed_data["ExpenseType"] = normalized_expense_type
-            else:
-                logger.info("Unknown doc type for file %s: %s", file.filename, doc_type)
-                parsed_data = {"Address": "Unknown", "Date": "", "Item": "", "OrderId": "", "Subtotal": "", "Tax": "", "Title": "", "TotalPrice": "", "DocumentType": "unknown", "ExpenseType": normalized_expense_type}
-
-            results.append(parsed_data)
-           
-        except HTTPException:
-            # re-raise FastAPI HTTPExceptions unchanged
-            raise
-        except Exception as e:
-            # Log full traceback for debugging, but return a generic error to the client
-            tb = traceback.format_exc()
-            logger.error("Error processing file %s: %s\n%s", file.filename, str(e), tb)
-            raise HTTPException(status_code=500, detail=f"Error processing file {file.filename}: {str(e)}")
+            yield encode({"event": "accepted", "files": len(uploads)})
+            counts = {"result": 0, "error": 0}
+            while counts["result"] + counts["error"] < len(tasks):
+                event = await queue.get()
+                if event["event"] in counts:
+                    counts[event["event"]] += 1
+                yield encode(event)
+            yield encode({"event": "done", "succeeded": counts["result"], "failed": counts["error"]})
         finally:
-            # Ensure temporary file is removed
-            try:
-                if temp_path and os.path.exists(temp_path):
-                    os.remove(temp_path)
-                    logger.info("Removed temporary file %s", temp_path)
-            except Exception:
-                logger.exception("Failed to remove temporary file %s", temp_path)
+            # Client went away: stop work that nobody will read
+            for task in tasks:
+                task.cancel()
 
-    return results
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from .executor import EXTRACTION_WORKERS
+from .memory import container_memory_limit_mb, container_memory_mb
+
+logger = logging.getLogger(__name__)
+
+# Documents allowed in extraction at once (0: one per extraction worker)
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "0"))
+# Documents allowed to wait for a slot; beyond this uploads get 429 straight away
+ADMISSION_QUEUE_DEPTH = int(os.getenv("ADMISSION_QUEUE_DEPTH", "16"))
+# Longest a queued upload waits before it gets 503
+ADMISSION_MAX_WAIT_S = float(os.getenv("ADMISSION_MAX_WAIT_S", "30"))
+# Start new work only while the container's working set plus ADMISSION_DOC_MEMORY_MB
+# stays under this limit. "auto" uses 85% of the cgroup memory limit; 0 disables the check.
+ADMISSION_MEMORY_LIMIT_MB = os.getenv("ADMISSION_MEMORY_LIMIT_MB", "auto")
+# Peak extra memory of one extraction (decoded photo, EasyOCR and LayoutLMv3 activations)
+ADMISSION_DOC_MEMORY_MB = float(os.getenv("ADMISSION_DOC_MEMORY_MB", "400"))
+
+
+def _memory_limit_mb() -> float:
+    if ADMISSION_MEMORY_LIMIT_MB.lower() == "auto":
+        return 0.85 * container_memory_limit_mb()
+    return float(ADMISSION_MEMORY_LIMIT_MB)
+
+
+class Overloaded(Exception):
+    """Raised when an upload cannot be admitted; maps to a 429/503 with Retry-After."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded FIFO in front of the extraction executor.
+
+    At most ``max_inflight`` documents run at once, fewer when memory is tight
+    (one is always allowed so the queue keeps draining). Up to ``queue_depth``
+    more wait in arrival order; the rest are rejected immediately.
+    """
+
+    def __init__(self, max_inflight: int = None, queue_depth: int = None, max_wait_s: float = None,
+                 memory_limit_mb: float = None, doc_memory_mb: float = None, memory_fn=container_memory_mb):
+        self.max_inflight = max(1, (ADMISSION_MAX_INFLIGHT or EXTRACTION_WORKERS) if max_inflight is None else max_inflight)
+        self.queue_depth = ADMISSION_QUEUE_DEPTH if queue_depth is None else queue_depth
+        self.max_wait_s = ADMISSION_MAX_WAIT_S if max_wait_s is None else max_wait_s
+        self.memory_limit_mb = _memory_limit_mb() if memory_limit_mb is None else memory_limit_mb
+        self.doc_memory_mb = ADMISSION_DOC_MEMORY_MB if doc_memory_mb is None else doc_memory_mb
+        self._memory_fn = memory_fn
+        self._inflight = 0
+        self._waiters = deque()
+        self._wait_ms = deque(maxlen=1000)
+        self._service_ms = deque(maxlen=200)
+        self._counters = {"admitted": 0, "rejected_queue_full": 0, "rejected_timeout": 0, "memory_deferred": 0}
+
+    def _can_start(self) -> bool:
+        if self._inflight == 0:
+            return True
+        if self._inflight >= self.max_inflight:
+            return False
+        if self.memory_limit_mb and self._memory_fn() + self.doc_memory_mb > self.memory_limit_mb:
+            self._counters["memory_deferred"] += 1
+            return False
+        return True
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from recent service times and the backlog."""
+        service_s = (sum(self._service_ms) / len(self._service_ms) / 1000) if self._service_ms else 5.0
+        backlog = len(self._waiters) + 1
+        return max(1, min(120, math.ceil(service_s * backlog / self.max_inflight)))
+
+    async def acquire(self, reject: bool = True):
+        """Wait for an extraction slot. With ``reject=False`` (queued jobs) wait without limits."""
+        start = time.perf_counter()
+        if not self._waiters and self._can_start():
+            self._admit(start)
+            return
+        if reject and len(self._waiters) >= self.queue_depth:
+            self._counters["rejected_queue_full"] += 1
+            raise Overloaded(429, "Extraction queue is full, try again later", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait_s if reject else None)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Granted just as the timeout fired; keep the slot
+                self._admit(start, counted=True)
+                return
+            waiter.cancel()
+            self._drop(waiter)
+            self._counters["rejected_timeout"] += 1
+            raise Overloaded(503, "Extraction is saturated, try again later", self.retry_after())
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed to us but the request went away
+                self._inflight -= 1
+                self._wake()
+            else:
+                waiter.cancel()
+                self._drop(waiter)
+            raise
+        self._admit(start, counted=True)
+
+    def release(self, service_ms: float = None):
+        self._inflight = max(0, self._inflight - 1)
+        if service_ms is not None:
+            self._service_ms.append(service_ms)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, reject: bool = True):
+        await self.acquire(reject)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release((time.perf_counter() - start) * 1000)
+
+    def _admit(self, start: float, counted: bool = False):
+        if not counted:
+            self._inflight += 1
+        self._counters["admitted"] += 1
+        self._wait_ms.append((time.perf_counter() - start) * 1000)
+
+    def _drop(self, waiter):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _wake(self):
+        # Slots are handed over in _wake so a newcomer cannot overtake the queue
+        while self._waiters and self._can_start():
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._inflight += 1
+            waiter.set_result(None)
+
+    def stats(self) -> dict:
+        waits = sorted(self._wait_ms)
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 1) if waits else None
+
+        return {
+            "inflight": self._inflight,
+            "max_inflight": self.max_inflight,
+            "queue_depth": len(self._waiters),
+            "max_queue_depth": self.queue_depth,
+            "memory_limit_mb": round(self.memory_limit_mb, 1) or None,
+            "memory_mb": round(self._memory_fn(), 1) if self.memory_limit_mb else None,
+            "wait_ms_p50": pct(0.5),
+            "wait_ms_p95": pct(0.95),
+            "wait_ms_max": round(waits[-1], 1) if waits else None,
+            "service_ms_avg": round(sum(self._service_ms) / len(self._service_ms), 1) if self._service_ms else None,
+            "retry_after_s": self.retry_after(),
+            **self._counters,
+        }
+
+
+# Shared by /api/upload, /api/upload/stream and the job drainers of this process
+admission = AdmissionController()
+
+
+def admission_stats() -> dict:
+    return admission.stats()
@@ -0,0 +1,116 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .shared_image import SharedImage, call_with_shared_image
+
+logger = logging.getLogger(__name__)
+
+# Number of extraction jobs (OCR + classification + LayoutLMv3) allowed to run at once.
+# Each job holds a full-size image and model activations, so keep this small.
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+# "thread" shares one set of models inside this process; "process" starts
+# EXTRACTION_WORKERS processes that each preload the OCR reader and both models.
+EXTRACTION_EXECUTOR = os.getenv("EXTRACTION_EXECUTOR", "thread").lower()
+# torch intra-op threads per worker process. 0 splits the cores evenly between workers.
+EXTRACTION_TORCH_THREADS = int(os.getenv("EXTRACTION_TORCH_THREADS", "0"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _torch_threads_per_worker(workers: int) -> int:
+    if EXTRACTION_TORCH_THREADS > 0:
+        return EXTRACTION_TORCH_THREADS
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def _init_process_worker(torch_threads: int):
+    """Process pool initializer: pin torch threads and load every model once at spawn."""
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+    os.environ["MKL_NUM_THREADS"] = str(torch_threads)
+    import torch
+    torch.set_num_threads(torch_threads)
+
+    from .ocr_service import get_engine, ocr_engines_in_use
+    from ..model.receipts_model import _init_model
+    from ..model.invoice_model import _init_invoice_model
+    loaders = [(name, get_engine(name).load) for name in ocr_engines_in_use()]
+    for name, loader in loaders + [("receipt", _init_model), ("invoice", _init_invoice_model)]:
+        try:
+            loader()
+        except Exception:
+            # Leave it to the lazy path on first use rather than killing the worker
+            logger.exception("Worker %d failed to preload %s model", os.getpid(), name)
+    logger.info("Extraction worker %d ready (torch threads=%d)", os.getpid(), torch_threads)
+
+
+def get_executor():
+    """Return the bounded pool used for blocking extraction work, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = max(1, EXTRACTION_WORKERS)
+                if EXTRACTION_EXECUTOR == "process":
+                    torch_threads = _torch_threads_per_worker(workers)
+                    logger.info("Starting extraction executor with %d worker processes (torch threads=%d)", workers, torch_threads)
+                    _executor = ProcessPoolExecutor(
+                        max_workers=workers,
+                        # spawn: torch and OpenMP state are not fork-safe
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_process_worker,
+                        initargs=(torch_threads,),
+                    )
+                else:
+                    if EXTRACTION_TORCH_THREADS > 0:
+                        import torch
+                        torch.set_num_threads(EXTRACTION_TORCH_THREADS)
+                    logger.info("Starting extraction executor with %d worker threads", workers)
+                    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extraction")
+    return _executor
+
+
+async def run_in_executor(fn, *args, **kwargs):
+    """Run a blocking callable on the extraction pool and await its result.
+
+    The event loop stays free to serve other routes while OCR and torch work runs.
+    In process mode ``fn`` and its arguments must be picklable.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_document(fn, contents: bytes, *args, progress=None):
+    """Run ``fn(contents, *args)`` on the extraction pool.
+
+    In process mode the upload bytes go through shared memory and the worker
+    sees a zero-copy memoryview instead of a pickled copy.
+
+    ``progress(stage, **info)``, if given, is passed on to ``fn`` and called on
+    the event loop's thread. Worker processes cannot call back into the loop, so
+    in process mode ``fn`` runs without it and only the final result is reported.
+    """
+    if EXTRACTION_EXECUTOR != "process":
+        if progress is None:
+            return await run_in_executor(fn, contents, *args)
+        loop = asyncio.get_running_loop()
+
+        def report(stage, **info):
+            loop.call_soon_threadsafe(functools.partial(progress, stage, **info))
+
+        return await run_in_executor(fn, contents, *args, progress=report)
+    with SharedImage(contents) as handle:
+        return await run_in_executor(call_with_shared_image, fn, handle, *args)
+
+
+def shutdown_executor(wait: bool = True):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
@@ -0,0 +1,273 @@
+import json
+import logging
+import re
+import traceback
+
+from ..gemini_api import classify_document
+from .image_io import decode_image
+from .ocr_service import OcrResult, ocr_engine_for, run_ocr
+from .pdf_io import is_pdf, iter_pages, page_count
+from .result_cache import FALLBACK_KEY
+
+logger = logging.getLogger(__name__)
+
+
+def extract_ocr_from_image(image_bytes: bytes) -> OcrResult:
+    # Perform OCR once; the result is reused by classification and the extractors
+    return run_ocr(decode_image(image_bytes))
+
+
+def extract_text_from_image(image_bytes: bytes) -> str:
+    return extract_ocr_from_image(image_bytes).text
+
+
+def parse_extracted_data_invoice(text: str) -> dict:
+    # Simple invoice parsing fallback
+    data = {
+        "customer_address": "",
+        "customer_name": "",
+        "due_date": "",
+        "invoice_date": "",
+        "invoice_number": "",
+        "invoice_subtotal": "",
+        "invoice_total": "",
+        "item_description": "",
+        "item_quantity": "",
+        "item_total_price": "",
+        "item_unit_price": "",
+        "supplier_address": "",
+        "supplier_name": "",
+        "tax_amount": "",
+        "tax_rate": ""
+    }
+    lines = text.split('\n') if '\n' in text else text.split(' ')
+    if lines:
+        data["Title"] = lines[0].strip()
+    date_pattern = r'\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\b'
+    date_match = re.search(date_pattern, text)
+    if date_match:
+        data["Date"] = date_match.group(1)
+    orderid_pattern = r'(Invoice\s*(?:#|No\.?|Number)?[:\s]*)(\w[\w-]*)'
+    orderid_match = re.search(orderid_pattern, text, re.IGNORECASE)
+    if orderid_match:
+        data["OrderId"] = orderid_match.group(2)
+    subtotal_match = re.search(r'Subtotal[:\s]*\$?([0-9,]+\.?[0-9]*)', text, re.IGNORECASE)
+    if subtotal_match:
+        data["Subtotal"] = subtotal_match.group(1)
+    tax_match = re.search(r'Tax[:\s]*\$?([0-9,]+\.?[0-9]*)', text, re.IGNORECASE)
+    if tax_match:
+        data["Tax"] = tax_match.group(1)
+    total_match = re.search(r'(Total(?:\s*Due|\s*Amount)?[:\s]*\$?)([0-9,]+\.?[0-9]*)', text, re.IGNORECASE)
+    if total_match:
+        data["TotalPrice"] = total_match.group(2)
+    return data
+
+
+_RECEIPT_FIELDS = ["Address", "Date", "Item", "OrderId", "Subtotal", "Tax", "Title", "TotalPrice"]
+
+# When merging pages, amounts come from the last page that has them (totals sit at the end),
+# line items are concatenated, and every other field keeps its first non-empty value
+_LAST_PAGE_FIELDS = {"Subtotal", "Tax", "TotalPrice", "invoice_subtotal", "invoice_total", "tax_amount", "tax_rate"}
+# Raw invoice model labels behind those amount fields; their model_label_* keys merge the same way
+_LAST_PAGE_LABELS = {"INVOICE_SUBTOTAL", "INVOICE_TOTAL", "TAX_AMOUNT", "TAX_RATE",
+                     "SUBTOTAL", "TAX", "TOTAL", "AMOUNT_DUE", "PAID"}
+_APPEND_FIELDS = {"Item", "item_description", "item_quantity", "item_unit_price", "item_total_price"}
+
+
+def _classify(text: str, filename: str):
+    """Return (document_type, expense_type, fallback) for the OCR text, falling back to invoice/other.
+
+    ``fallback`` names the failure when the type is a default rather than a classification.
+    """
+    fallback = None
+    try:
+        doc_class = classify_document(text)
+        # If Gemini returns a JSON string, parse it
+        if isinstance(doc_class, str):
+            try:
+                doc_json = json.loads(doc_class)
+                doc_type = doc_json.get("document_type", "unknown")
+                expense_type = doc_json.get("expense_type", "unknown")
+            except Exception:
+                doc_type = doc_class
+                expense_type = "unknown"
+        elif isinstance(doc_class, dict):
+            doc_type = doc_class.get("document_type", "unknown")
+            expense_type = doc_class.get("expense_type", "unknown")
+            fallback = doc_class.get(FALLBACK_KEY)
+        else:
+            doc_type = str(doc_class)
+            expense_type = "unknown"
+        logger.info(f"Classified document {filename} as {doc_type}, expense type: {expense_type}")
+    except Exception as e:
+        logger.exception("Document classification failed, defaulting to 'invoice' and 'unknown'")
+        doc_type = "invoice"
+        expense_type = "unknown"
+        fallback = "classification error"
+
+    # Normalize unknown expense types to 'other'
+    normalized_expense_type = expense_type if expense_type and expense_type.lower() not in ["unknown", "", None] else "other"
+    return doc_type, normalized_expense_type, fallback
+
+
+def _extract_fields(doc_type: str, img, ocr: OcrResult, filename: str) -> dict:
+    """Run the receipt or invoice model on one page; an empty dict means the model found nothing."""
+    if doc_type == "receipt":
+        from ..model.receipts_model import extract_receipt_structured_data
+        structured = extract_receipt_structured_data(img, ocr=ocr)
+        if not isinstance(structured, dict):
+            raise ValueError("Receipt model did not return a dict")
+        return {k: ' '.join(v) if isinstance(v, list) else v for k, v in structured.items()}
+
+    try:
+        from ..model.invoice_model import extract_invoice_structured_data
+        structured = extract_invoice_structured_data(img, ocr=ocr)
+        fallback = structured.pop(FALLBACK_KEY, None) if isinstance(structured, dict) else None
+        if fallback:
+            # Keep the marker but leave the fields empty so _finish runs the regex fallback
+            return {FALLBACK_KEY: fallback}
+        if isinstance(structured, dict) and any(v for v in structured.values()):
+            logger.info("Invoice model produced structured data for %s", filename)
+            return {k: ' '.join(v) if isinstance(v, list) else v for k, v in structured.items()}
+        logger.info("Invoice model returned empty result for %s", filename)
+    except Exception as exc:
+        tb = traceback.format_exc()
+        logger.error("Invoice model error for %s: %s\n%s", filename, str(exc), tb)
+        if 'gated' in str(exc).lower() or '401' in str(exc) or 'access' in str(exc).lower():
+            logger.error("Invoice model appears to be gated or requires HF authentication. Set HUGGINGFACE_HUB_TOKEN env var with a token that has access.")
+        return {FALLBACK_KEY: "invoice model error"}
+    return {}
+
+
+def _unknown_result(expense_type: str, fallback: str = None) -> dict:
+    result = {"Address": "Unknown", "Date": "", "Item": "", "OrderId": "", "Subtotal": "", "Tax": "", "Title": "", "TotalPrice": "", "DocumentType": "unknown", "ExpenseType": expense_type}
+    if fallback:
+        result[FALLBACK_KEY] = fallback
+    return result
+
+
+def _finish(doc_type: str, expense_type: str, fields: dict, text: str, fallback: str = None) -> dict:
+    # A model fallback inside the fields or a classifier fallback marks the whole result (never cached)
+    fallback = fields.pop(FALLBACK_KEY, None) or fallback
+    if doc_type == "receipt":
+        parsed_data = fields or {k: "" for k in _RECEIPT_FIELDS}
+    else:
+        # Regex fallback over the OCR text when the model produced nothing
+        parsed_data = fields or parse_extracted_data_invoice(text)
+    parsed_data["DocumentType"] = doc_type
+    parsed_data["ExpenseType"] = expense_type
+    if fallback:
+        parsed_data[FALLBACK_KEY] = fallback
+    return parsed_data
+
+
+def _takes_last_page(key: str) -> bool:
+    if key.startswith("model_label_"):
+        return key[len("model_label_"):] in _LAST_PAGE_LABELS
+    return key in _LAST_PAGE_FIELDS
+
+
+def merge_page_fields(pages) -> dict:
+    """Merge per-page extraction dicts of one document into a single record."""
+    merged = {}
+    for fields in pages:
+        for key, value in fields.items():
+            if not value:
+                merged.setdefault(key, "")
+            elif _takes_last_page(key) or not merged.get(key):
+                merged[key] = value
+            elif key in _APPEND_FIELDS or key.startswith("model_label_"):
+                merged[key] = f"{merged[key]} {value}"
+    return merged
+
+
+def _ocr_for_type(doc_type: str, img, ocr: OcrResult, filename: str) -> OcrResult:
+    """Re-read the image with the engine configured for ``doc_type`` if it was classified from another one."""
+    engine = ocr_engine_for(doc_type)
+    if not ocr.engine or ocr.engine == engine:
+        return ocr
+    logger.info("Re-reading %s with %s for %s extraction (classified from %s)", filename, engine, doc_type, ocr.engine)
+    return run_ocr(img, engine)
+
+
+def _report(progress, stage: str, **info):
+    """Send a progress event to the caller; a failing callback never fails the extraction."""
+    if progress is None:
+        return
+    try:
+        progress(stage, **info)
+    except Exception:
+        logger.exception("Progress callback failed for stage %s", stage)
+
+
+def process_document(contents: bytes, filename: str, progress=None) -> dict:
+    """Run OCR, classification and model extraction for one uploaded image or PDF.
+
+    This is blocking, CPU-bound work; the upload route dispatches it to the
+    extraction executor instead of calling it on the event loop.
+    ``progress(stage, **info)`` is called as the "ocr", "classify" and "extract" stages start.
+    """
+    if is_pdf(contents, filename):
+        return process_pdf(contents, filename, progress)
+
+    # Decode once; OCR and the LayoutLMv3 extractors all read this one pixel buffer
+    img = decode_image(contents)
+
+    # Extract text (single OCR pass shared with the model extractors)
+    _report(progress, "ocr")
+    ocr = run_ocr(img)
+    text = ocr.text
+
+    _report(progress, "classify", words=len(ocr.words))
+    doc_type, expense_type, fallback = _classify(text, filename)
+    if doc_type not in ("receipt", "invoice"):
+        logger.info("Unknown doc type for file %s: %s", filename, doc_type)
+        return _unknown_result(expense_type, fallback)
+
+    logger.info("%s detected for file %s", doc_type.capitalize(), filename)
+    _report(progress, "extract", document_type=doc_type)
+    ocr = _ocr_for_type(doc_type, img, ocr, filename)
+    return _finish(doc_type, expense_type, _extract_fields(doc_type, img, ocr, filename), ocr.text, fallback)
+
+
+def process_pdf(contents: bytes, filename: str, progress=None) -> dict:
+    """Extract one record from a (multi-page) PDF, processing its pages as a stream.
+
+    Each page is rendered, read from its text layer or OCRed, and run through the
+    model before the next page is rendered. The first page decides the document type.
+    Progress events carry ``page`` and ``pages``.
+    """
+    total_pages = page_count(contents)
+    doc_type = expense_type = fallback = None
+    page_fields, texts = [], []
+    for page in iter_pages(contents):
+        where = {"page": page.index + 1, "pages": total_pages}
+        ocr = page.ocr
+        source = "text layer"
+        if ocr is None:
+            _report(progress, "ocr", **where)
+            # Once the type is known, later pages go straight to that type's engine
+            ocr = run_ocr(page.image, ocr_engine_for(doc_type) if doc_type else None)
+            source = "OCR"
+        logger.info("PDF %s page %d: %d words from %s", filename, page.index + 1, len(ocr.words), source)
+
+        if doc_type is None:
+            _report(progress, "classify", words=len(ocr.words), **where)
+            doc_type, expense_type, fallback = _classify(ocr.text, filename)
+            if doc_type not in ("receipt", "invoice"):
+                logger.info("Unknown doc type for file %s: %s", filename, doc_type)
+                return _unknown_result(expense_type, fallback)
+            ocr = _ocr_for_type(doc_type, page.image, ocr, f"{filename} page {page.index + 1}")
+        texts.append(ocr.text)
+        if ocr.words:
+            _report(progress, "extract", document_type=doc_type, **where)
+            page_fields.append(_extract_fields(doc_type, page.image, ocr, f"{filename} page {page.index + 1}"))
+
+    if doc_type is None:
+        raise ValueError("PDF has no pages")
+    parsed_data = _finish(doc_type, expense_type, merge_page_fields(page_fields), "\n".join(texts), fallback)
+    parsed_data["PageCount"] = total_pages
+    if total_pages > len(texts):
+        logger.warning("PDF %s has %d pages; only the first %d were processed", filename, total_pages, len(texts))
+        parsed_data["PagesSkipped"] = total_pages - len(texts)
+    return parsed_data
@@ -0,0 +1,146 @@
+import io
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# Images move through the pipeline as decoded arrays: OpenCV's BGR uint8 (H, W, 3)
+# for OCR and an RGB view of the same buffer for the LayoutLMv3 processor.
+# cv2 and PIL are imported on first use to keep app import cheap.
+
+# Longest image side kept after decoding; larger photos are decoded at reduced
+# resolution and downscaled. OCR accuracy barely improves past a few megapixels. 0 disables.
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2048"))
+# Feed EasyOCR a single-channel image (LayoutLMv3 still gets the color pixels)
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "0") == "1"
+# "clahe" equalizes local contrast before OCR (helps faded thermal receipts); "none" leaves pixels as is
+OCR_CONTRAST = os.getenv("OCR_CONTRAST", "none").lower()
+
+_REDUCED_FLAGS = {2: "IMREAD_REDUCED_COLOR_2", 4: "IMREAD_REDUCED_COLOR_4", 8: "IMREAD_REDUCED_COLOR_8"}
+_REDUCED_GRAY_FLAGS = {2: "IMREAD_REDUCED_GRAYSCALE_2", 4: "IMREAD_REDUCED_GRAYSCALE_4", 8: "IMREAD_REDUCED_GRAYSCALE_8"}
+
+
+def _encoded_size(data):
+    """(format, (width, height)) from the image header without decoding pixels."""
+    from PIL import Image
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            return im.format, im.size
+    except Exception:
+        return None, None
+
+
+def reduction_factor(width: int, height: int, max_side: int) -> int:
+    """Largest JPEG DCT scale (1, 2, 4 or 8) that keeps the long side at or above 3/4 of ``max_side``.
+
+    Landing slightly under the cap is cheaper than a full decode followed by a resize.
+    """
+    factor = 1
+    while factor < 8 and max(width, height) // (factor * 2) >= max_side * 3 // 4:
+        factor *= 2
+    return factor
+
+
+def cap_long_side(img: np.ndarray, max_side: int) -> np.ndarray:
+    """Downscale so the long side is at most ``max_side`` (no-op for smaller images or 0)."""
+    h, w = img.shape[:2]
+    if not max_side or max(h, w) <= max_side:
+        return img
+    import cv2
+    scale = max_side / max(h, w)
+    return cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def _decode_flags(buf: np.ndarray, max_side: int, full: int, reduced: dict) -> int:
+    """imdecode flags that decode a large JPEG directly at 1/2, 1/4 or 1/8 scale."""
+    import cv2
+    if max_side:
+        fmt, size = _encoded_size(buf)
+        if fmt == "JPEG" and size:
+            factor = reduction_factor(size[0], size[1], max_side)
+            if factor > 1:
+                return getattr(cv2, reduced[factor])
+    return full
+
+
+def decode_image(data, max_side: int = None) -> np.ndarray:
+    """Decode uploaded bytes (or a memoryview of them) to a BGR array, exactly once per upload.
+
+    EXIF orientation is applied. Images whose long side exceeds ``max_side``
+    (default OCR_MAX_SIDE) are capped to it; huge JPEGs are decoded directly at
+    1/2, 1/4 or 1/8 scale, which skips most of the IDCT work and memory.
+    """
+    import cv2
+    max_side = OCR_MAX_SIDE if max_side is None else max_side
+    buf = np.frombuffer(data, np.uint8)
+    img = cv2.imdecode(buf, _decode_flags(buf, max_side, cv2.IMREAD_COLOR, _REDUCED_FLAGS))
+    if img is None:
+        raise ValueError("Uploaded image could not be decoded by OpenCV")
+    return cap_long_side(img, max_side)
+
+
+def decode_thumbnail(data, max_side: int) -> Optional[np.ndarray]:
+    """Small grayscale copy of an upload for the pre-OCR checks, or None if the bytes do not decode.
+
+    The upload route decodes this once and hands it to both the quality gate and
+    the near-duplicate hashes; OCR still decodes the full image with decode_image.
+    """
+    import cv2
+    buf = np.frombuffer(data, np.uint8)
+    gray = cv2.imdecode(buf, _decode_flags(buf, max_side, cv2.IMREAD_GRAYSCALE, _REDUCED_GRAY_FLAGS))
+    if gray is None:
+        return None
+    return cap_long_side(gray, max_side)
+
+
+def prepare_for_ocr(img: np.ndarray) -> np.ndarray:
+    """Apply the OCR-only normalization: resolution cap, optional grayscale and contrast."""
+    img = cap_long_side(img, OCR_MAX_SIDE)
+    if not OCR_GRAYSCALE and OCR_CONTRAST == "none":
+        return img
+    import cv2
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if OCR_CONTRAST == "clahe":
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        if OCR_GRAYSCALE or img.ndim == 2:
+            return clahe.apply(gray)
+        lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+        lab[..., 0] = clahe.apply(lab[..., 0])
+        return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+    return gray
+
+
+def as_bgr(image) -> np.ndarray:
+    """BGR array for a path, a decoded BGR array (returned as is) or a PIL image."""
+    if isinstance(image, np.ndarray):
+        return image
+    if isinstance(image, (str, Path)):
+        import cv2
+        img = cv2.imread(str(image))
+        if img is None:
+            raise ValueError(f"Failed to read image {image}")
+        return img
+    # PIL image
+    return np.ascontiguousarray(np.asarray(image.convert("RGB"))[..., ::-1])
+
+
+def as_rgb(image) -> np.ndarray:
+    """RGB array for a path, a decoded BGR array or a PIL image.
+
+    For arrays this is a channel-reversed view of the same buffer, not a copy.
+    """
+    if isinstance(image, np.ndarray):
+        return image[..., ::-1]
+    if isinstance(image, (str, Path)):
+        return as_bgr(image)[..., ::-1]
+    return np.asarray(image.convert("RGB"))
+
+
+def describe(image) -> str:
+    """Short label for log messages: the path, or the size of an in-memory image."""
+    if isinstance(image, (str, Path)):
+        return str(image)
+    if isinstance(image, np.ndarray):
+        return f"<image {image.shape[1]}x{image.shape[0]}>"
+    return f"<image {image.size[0]}x{image.size[1]}>"
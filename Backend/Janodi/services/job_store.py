@@ -0,0 +1,247 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SQLite file that holds submitted documents until a worker has processed them.
+# Keep it on a persistent volume so queued jobs survive a restart.
+EXTRACTION_JOB_DB = os.getenv("EXTRACTION_JOB_DB", "extraction_jobs.db")
+# A claimed file belongs to its worker for this long; the worker renews the lease while
+# it is still extracting, so only files of a crashed or hung process are handed out again
+EXTRACTION_JOB_LEASE_S = float(os.getenv("EXTRACTION_JOB_LEASE_S", "120"))
+# Claims per file before it is marked failed (e.g. a document that crashes its worker every time)
+EXTRACTION_JOB_MAX_ATTEMPTS = int(os.getenv("EXTRACTION_JOB_MAX_ATTEMPTS", "3"))
+
+# Identifies this process in the lease columns; unique across hosts sharing the database
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id TEXT NOT NULL REFERENCES jobs(id),
+    idx INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    content BLOB,
+    status TEXT NOT NULL DEFAULT 'queued',
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS job_files_status ON job_files(status, created_at);
+"""
+
+# Columns added after the first release; databases created before get them on open
+_MIGRATIONS = {
+    "worker": "ALTER TABLE job_files ADD COLUMN worker TEXT",
+    "lease_until": "ALTER TABLE job_files ADD COLUMN lease_until REAL",
+    "attempts": "ALTER TABLE job_files ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+}
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(EXTRACTION_JOB_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    if EXTRACTION_JOB_DB not in _schema_ready:
+        with _schema_lock:
+            if EXTRACTION_JOB_DB not in _schema_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                columns = {row["name"] for row in conn.execute("PRAGMA table_info(job_files)")}
+                for column, statement in _MIGRATIONS.items():
+                    if column not in columns:
+                        conn.execute(statement)
+                _schema_ready.add(EXTRACTION_JOB_DB)
+    return conn
+
+
+def create_job(files: List[Tuple[str, bytes]]) -> str:
+    """Persist a job with its uploaded files and return the new job id."""
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT INTO jobs (id, created_at) VALUES (?, ?)", (job_id, now))
+        conn.executemany(
+            "INSERT INTO job_files (job_id, idx, filename, content, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(job_id, i, name, sqlite3.Binary(data), now, now) for i, (name, data) in enumerate(files)],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    logger.info("Queued extraction job %s with %d file(s)", job_id, len(files))
+    return job_id
+
+
+def _expire_leases(conn: sqlite3.Connection, now: float) -> Tuple[int, int]:
+    """Requeue running files whose lease ran out, or fail them once out of attempts.
+
+    Must run inside the caller's transaction. Returns (requeued, failed).
+    """
+    failed = conn.execute(
+        "UPDATE job_files SET status = 'error', content = NULL, worker = NULL, lease_until = NULL, updated_at = ?, "
+        "error = 'Extraction did not finish after ' || attempts || ' attempt(s); the worker crashed or timed out' "
+        "WHERE status = 'running' AND COALESCE(lease_until, 0) < ? AND attempts >= ?",
+        (now, now, EXTRACTION_JOB_MAX_ATTEMPTS),
+    ).rowcount
+    requeued = conn.execute(
+        "UPDATE job_files SET status = 'queued', worker = NULL, lease_until = NULL, updated_at = ? "
+        "WHERE status = 'running' AND COALESCE(lease_until, 0) < ?",
+        (now, now),
+    ).rowcount
+    if requeued or failed:
+        logger.warning("Expired extraction leases: %d file(s) requeued, %d failed after %d attempts",
+                       requeued, failed, EXTRACTION_JOB_MAX_ATTEMPTS)
+    return requeued, failed
+
+
+def claim_next_file(worker_id: str = None) -> Optional[Tuple[str, int, str, bytes]]:
+    """Lease the oldest queued file to ``worker_id`` (default this process) and return
+    (job_id, idx, filename, content). Expired leases are put back in the queue first."""
+    worker_id = worker_id or WORKER_ID
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        now = time.time()
+        _expire_leases(conn, now)
+        row = conn.execute(
+            "SELECT job_id, idx, filename, content FROM job_files WHERE status = 'queued' ORDER BY created_at, idx LIMIT 1"
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE job_files SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? "
+            "WHERE job_id = ? AND idx = ?",
+            (worker_id, now + EXTRACTION_JOB_LEASE_S, now, row["job_id"], row["idx"]),
+        )
+        conn.execute("COMMIT")
+        return row["job_id"], row["idx"], row["filename"], bytes(row["content"])
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def renew_lease(job_id: str, idx: int, worker_id: str = None) -> bool:
+    """Extend the lease on a file this worker is extracting; False if it lost the file."""
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "UPDATE job_files SET lease_until = ? WHERE job_id = ? AND idx = ? AND status = 'running' AND worker = ?",
+            (time.time() + EXTRACTION_JOB_LEASE_S, job_id, idx, worker_id or WORKER_ID),
+        )
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def release_file(job_id: str, idx: int, worker_id: str = None):
+    """Hand a file back to the queue without using up an attempt (graceful shutdown)."""
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE job_files SET status = 'queued', worker = NULL, lease_until = NULL, attempts = MAX(0, attempts - 1), "
+            "updated_at = ? WHERE job_id = ? AND idx = ? AND status = 'running' AND worker = ?",
+            (time.time(), job_id, idx, worker_id or WORKER_ID),
+        )
+    finally:
+        conn.close()
+
+
+def _finish_file(job_id: str, idx: int, status: str, result: Optional[dict], error: Optional[str], worker_id: str):
+    conn = _connect()
+    try:
+        # The upload bytes are no longer needed once the file has a result. A worker whose
+        # lease expired (and whose file went to another worker) must not overwrite it.
+        cur = conn.execute(
+            "UPDATE job_files SET status = ?, result = ?, error = ?, content = NULL, worker = NULL, lease_until = NULL, "
+            "updated_at = ? WHERE job_id = ? AND idx = ? AND status = 'running' AND worker = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, idx,
+             worker_id or WORKER_ID),
+        )
+        if cur.rowcount == 0:
+            logger.warning("Dropped %s for job %s file %d: the lease was lost to another worker", status, job_id, idx)
+    finally:
+        conn.close()
+
+
+def complete_file(job_id: str, idx: int, result: dict, worker_id: str = None):
+    _finish_file(job_id, idx, "done", result, None, worker_id)
+
+
+def fail_file(job_id: str, idx: int, error: str, worker_id: str = None):
+    _finish_file(job_id, idx, "error", None, error, worker_id)
+
+
+def requeue_expired() -> Tuple[int, int]:
+    """Requeue (or fail, once out of attempts) files whose worker stopped renewing its lease.
+
+    Files other live processes are extracting keep their lease and are left alone.
+    Returns (requeued, failed).
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        counts = _expire_leases(conn, time.time())
+        conn.execute("COMMIT")
+        return counts
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """Return the job with per-file status and results, or None if it does not exist."""
+    conn = _connect()
+    try:
+        job = conn.execute("SELECT id, created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        rows = conn.execute(
+            "SELECT idx, filename, status, result, error FROM job_files WHERE job_id = ? ORDER BY idx", (job_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    files = [
+        {
+            "filename": r["filename"],
+            "status": r["status"],
+            "result": json.loads(r["result"]) if r["result"] else None,
+            "error": r["error"],
+        }
+        for r in rows
+    ]
+    statuses = {f["status"] for f in files}
+    if statuses <= {"done", "error"}:
+        status = "done"
+    elif statuses == {"queued"}:
+        status = "queued"
+    else:
+        status = "running"
+    return {"job_id": job["id"], "status": status, "created_at": job["created_at"], "files": files}
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+
+from . import job_store
+from .admission import admission
+from .executor import EXTRACTION_WORKERS, run_document
+from .extraction_service import process_document
+from .result_cache import result_cache, result_key
+
+logger = logging.getLogger(__name__)
+
+# How often idle drainers re-check the queue for jobs submitted by another process
+JOB_POLL_INTERVAL = float(os.getenv("EXTRACTION_JOB_POLL_INTERVAL", "1.0"))
+
+_tasks = []
+_wakeup = None
+_job_updated = None
+
+
+def _events():
+    global _wakeup, _job_updated
+    if _wakeup is None:
+        _wakeup = asyncio.Event()
+        _job_updated = asyncio.Condition()
+    return _wakeup, _job_updated
+
+
+def notify_new_job():
+    """Wake the drainers after a job has been queued."""
+    wakeup, _ = _events()
+    wakeup.set()
+
+
+async def wait_for_update(timeout: float):
+    """Block until any job file finishes or ``timeout`` seconds pass (used for long-polling)."""
+    _, job_updated = _events()
+    async with job_updated:
+        try:
+            await asyncio.wait_for(job_updated.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _keep_lease(job_id: str, idx: int):
+    """Renew this process's lease on a file for as long as it is being extracted."""
+    while True:
+        await asyncio.sleep(job_store.EXTRACTION_JOB_LEASE_S / 3)
+        try:
+            if not await asyncio.to_thread(job_store.renew_lease, job_id, idx):
+                logger.warning("Lost the lease on job %s file %d", job_id, idx)
+                return
+        except Exception:
+            logger.exception("Renewing the lease on job %s file %d failed", job_id, idx)
+
+
+async def _drain(worker_id: int):
+    wakeup, job_updated = _events()
+    while True:
+        claimed = await asyncio.to_thread(job_store.claim_next_file)
+        if claimed is None:
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        job_id, idx, filename, content = claimed
+        logger.info("Job drainer %d processing %s file %d (%s)", worker_id, job_id, idx, filename)
+        heartbeat = asyncio.create_task(_keep_lease(job_id, idx))
+        try:
+            async def extract():
+                # Jobs were already accepted, so they wait for a slot instead of being rejected
+                async with admission.slot(reject=False):
+                    return await run_document(process_document, content, filename)
+
+            parsed_data = await result_cache.get_or_compute(result_key(content), extract)
+            await asyncio.to_thread(job_store.complete_file, job_id, idx, parsed_data)
+        except asyncio.CancelledError:
+            # Shutdown mid-file: hand the file straight back instead of waiting for the lease to expire
+            try:
+                job_store.release_file(job_id, idx)
+            except Exception:
+                logger.exception("Could not release job %s file %d; it is requeued when its lease expires", job_id, idx)
+            raise
+        except Exception as e:
+            logger.exception("Job %s file %s failed", job_id, filename)
+            await asyncio.to_thread(job_store.fail_file, job_id, idx, str(e))
+        finally:
+            heartbeat.cancel()
+        async with job_updated:
+            job_updated.notify_all()
+
+
+async def start_job_workers():
+    """Requeue work whose lease expired and start one queue drainer per extraction worker.
+
+    Files that sibling processes are still extracting keep their lease and are not touched.
+    """
+    global _wakeup, _job_updated
+    await asyncio.to_thread(job_store.requeue_expired)
+    # asyncio primitives belong to the loop that is starting the app
+    _wakeup = asyncio.Event()
+    _job_updated = asyncio.Condition()
+    for i in range(max(1, EXTRACTION_WORKERS)):
+        _tasks.append(asyncio.create_task(_drain(i)))
+    notify_new_job()
+
+
+async def stop_job_workers():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
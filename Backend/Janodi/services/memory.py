@@ -0,0 +1,83 @@
+import os
+import sys
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MiB.
+
+    Reads /proc on Linux; elsewhere falls back to the peak RSS reported by getrusage.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB on Linux/BSD
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def smaps_rollup(pid="self") -> dict:
+    """RSS, PSS and USS of a process in MiB (Linux only; empty dict elsewhere).
+
+    USS (private pages) is what a forked worker adds on top of pages it shares
+    with its parent; PSS splits shared pages evenly between the processes using them.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].isdigit():
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "uss_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def _read_cgroup(*paths):
+    for path in paths:
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except OSError:
+            continue
+    return None
+
+
+def container_memory_limit_mb() -> float:
+    """Memory limit of this container's cgroup in MiB, or 0 if there is none."""
+    value = _read_cgroup("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes")
+    if value is None or value == "max":
+        return 0.0
+    limit = int(value) / 2**20
+    # cgroup v1 reports "unlimited" as a huge page-aligned number
+    return 0.0 if limit > 2**40 else limit
+
+
+def container_memory_mb() -> float:
+    """Working set of this container (usage minus reclaimable page cache) in MiB.
+
+    This is the number the OOM killer acts on and it includes worker processes;
+    outside a cgroup it falls back to this process's RSS.
+    """
+    usage = _read_cgroup("/sys/fs/cgroup/memory.current", "/sys/fs/cgroup/memory/memory.usage_in_bytes")
+    if usage is None:
+        return rss_mb()
+    stat = _read_cgroup("/sys/fs/cgroup/memory.stat", "/sys/fs/cgroup/memory/memory.stat") or ""
+    inactive = 0
+    for line in stat.splitlines():
+        key, _, value = line.partition(" ")
+        if key in ("inactive_file", "total_inactive_file"):
+            inactive = int(value)
+            break
+    return max(0, int(usage) - inactive) / 2**20
@@ -0,0 +1,185 @@
+import copy
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Flag uploads that look like a photo the same user already sent (re-shot, re-compressed).
+# This only labels the result: the upload is still extracted, because only its extracted
+# fields can tell a copy from another receipt of the same layout. Byte-identical
+# re-uploads are the ones that skip OCR, through the result cache.
+NEAR_DUPLICATE_CHECK = os.getenv("NEAR_DUPLICATE_CHECK", "1") == "1"
+# Largest Hamming distance (of 64 bits) at which BOTH the pHash and the dHash must match.
+# Hashes only pick candidates: different receipts printed from one template can be 0-6 apart,
+# while a copy re-shot at a slight angle reaches ~10, so the extracted fields decide.
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "10"))
+# Recent uploads remembered per user, and for how long
+NEAR_DUPLICATE_PER_USER = int(os.getenv("NEAR_DUPLICATE_PER_USER", "50"))
+NEAR_DUPLICATE_TTL_S = float(os.getenv("NEAR_DUPLICATE_TTL_S", str(7 * 24 * 3600)))
+# Users kept in the in-memory index; the least recently active are dropped first
+NEAR_DUPLICATE_MAX_USERS = int(os.getenv("NEAR_DUPLICATE_MAX_USERS", "10000"))
+
+ImageHashes = Tuple[int, int]
+
+# A candidate is the same document only if the totals agree, and the date and number
+# agree wherever both extractions found one
+_TOTAL_FIELDS = ("TotalPrice", "invoice_total")
+_IDENTITY_FIELDS = ("Date", "OrderId", "invoice_date", "invoice_number")
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def image_hashes(data) -> Optional[ImageHashes]:
+    """64-bit (pHash, dHash) of uploaded image bytes or a grayscale thumbnail, or None if the bytes do not decode.
+
+    The upload route passes the thumbnail it already decoded for the quality gate.
+    Bytes are decoded at 1/8 scale in grayscale, which is all a 32x32 hash needs.
+    """
+    import cv2
+    if isinstance(data, np.ndarray):
+        gray = data
+    else:
+        buf = np.frombuffer(data, np.uint8)
+        gray = cv2.imdecode(buf, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if gray is None or min(gray.shape) < 8:
+            gray = cv2.imdecode(buf, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            return None
+
+    # pHash: low-frequency DCT coefficients compared with their median
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].ravel()
+    phash = _bits_to_int(low > np.median(low[1:]))
+
+    # dHash: sign of the horizontal gradient on a 9x8 thumbnail
+    thumb = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    dhash = _bits_to_int(thumb[:, 1:] > thumb[:, :-1])
+    return phash, dhash
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _normalize(value) -> str:
+    return re.sub(r"[^0-9a-z.]", "", str(value or "").lower())
+
+
+def same_document(a: dict, b: dict) -> bool:
+    """Whether two extraction results agree on type, total and (where both have them) date and number."""
+    if a.get("DocumentType") != b.get("DocumentType"):
+        return False
+    totals = [(_normalize(a.get(f)), _normalize(b.get(f))) for f in _TOTAL_FIELDS]
+    totals = [(x, y) for x, y in totals if x and y]
+    if not totals or any(x != y for x, y in totals):
+        return False
+    for field in _IDENTITY_FIELDS:
+        x, y = _normalize(a.get(field)), _normalize(b.get(field))
+        if x and y and x != y:
+            return False
+    return True
+
+
+class _Seen:
+    __slots__ = ("hashes", "result", "filename", "seen_at")
+
+    def __init__(self, hashes, result, filename, seen_at):
+        self.hashes = hashes
+        self.result = result
+        self.filename = filename
+        self.seen_at = seen_at
+
+
+class NearDuplicateIndex:
+    """Per-user ring of recent upload hashes and the extraction result for each.
+
+    Lookups happen after extraction and compare the new result with the earlier ones;
+    the index flags duplicates, it does not save any OCR or model work.
+    """
+
+    def __init__(self, max_distance: int = None, per_user: int = None, ttl_s: float = None, max_users: int = None):
+        self.max_distance = NEAR_DUPLICATE_MAX_DISTANCE if max_distance is None else max_distance
+        self.per_user = NEAR_DUPLICATE_PER_USER if per_user is None else per_user
+        self.ttl_s = NEAR_DUPLICATE_TTL_S if ttl_s is None else ttl_s
+        self.max_users = NEAR_DUPLICATE_MAX_USERS if max_users is None else max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"checks": 0, "duplicates": 0, "content_mismatches": 0, "indexed": 0}
+
+    def find(self, user_id: str, hashes: ImageHashes, result: dict) -> Optional[dict]:
+        """Return a copy of the freshly extracted ``result`` flagged as a probable duplicate, or None.
+
+        An earlier upload matches when its hashes are within ``max_distance`` and
+        its extraction describes the same document (see ``same_document``).
+        """
+        now = time.time()
+        with self._lock:
+            self._counters["checks"] += 1
+            seen = self._users.get(user_id)
+            if not seen:
+                return None
+            candidates = []
+            for entry in seen:
+                if now - entry.seen_at > self.ttl_s:
+                    continue
+                p = hamming(hashes[0], entry.hashes[0])
+                d = hamming(hashes[1], entry.hashes[1])
+                if p <= self.max_distance and d <= self.max_distance:
+                    candidates.append((p + d, entry))
+            best = best_distance = None
+            for distance, entry in sorted(candidates, key=lambda c: c[0]):
+                if same_document(result, entry.result):
+                    best, best_distance = entry, distance
+                    break
+            if best is None:
+                if candidates:
+                    # Looked alike but is another document (e.g. the same shop's receipt template)
+                    self._counters["content_mismatches"] += 1
+                return None
+            self._counters["duplicates"] += 1
+        result = copy.deepcopy(result)
+        result["ProbableDuplicate"] = True
+        result["DuplicateOf"] = best.filename
+        result["DuplicateDistance"] = best_distance
+        logger.info("Upload for user %s is a probable duplicate of %s (distance %d)", user_id, best.filename, best_distance)
+        return result
+
+    def add(self, user_id: str, hashes: ImageHashes, result: dict, filename: str):
+        with self._lock:
+            seen = self._users.get(user_id)
+            if seen is None:
+                seen = self._users[user_id] = deque(maxlen=self.per_user)
+            self._users.move_to_end(user_id)
+            seen.append(_Seen(hashes, copy.deepcopy(result), filename, time.time()))
+            self._counters["indexed"] += 1
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            users = len(self._users)
+        return {
+            "enabled": NEAR_DUPLICATE_CHECK,
+            "max_distance": self.max_distance,
+            "users": users,
+            "duplicate_rate": round(counters["duplicates"] / counters["checks"], 3) if counters["checks"] else None,
+            **counters,
+        }
+
+
+# Process-wide index used by /api/upload
+near_duplicate_index = NearDuplicateIndex()
+
+
+def near_duplicate_stats() -> dict:
+    return near_duplicate_index.stats()
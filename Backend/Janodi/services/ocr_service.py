@@ -0,0 +1,205 @@
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .image_io import as_bgr, prepare_for_ocr
+
+logger = logging.getLogger(__name__)
+
+# OCR engine used when no per-type engine applies, including the pass that classifies the document
+OCR_ENGINE = os.getenv("OCR_ENGINE", "easyocr").lower()
+# Per document type overrides, e.g. "invoice=tesseract,receipt=easyocr". A document whose
+# type maps to another engine than OCR_ENGINE is read again with that engine for extraction.
+OCR_ENGINE_BY_TYPE = os.getenv("OCR_ENGINE_BY_TYPE", "")
+# Tesseract language(s) and extra command line options (OEM 1 is the LSTM recognizer)
+TESSERACT_LANG = os.getenv("TESSERACT_LANG", "eng")
+TESSERACT_CONFIG = os.getenv("TESSERACT_CONFIG", "--oem 1 --psm 3")
+
+# One EasyOCR reader per process, shared by the upload route and both extractors
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def get_reader():
+    """Return the process-wide EasyOCR reader, creating it on first use."""
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                # Imported here: easyocr pulls in torch, which costs seconds at app import
+                import easyocr
+                logger.info("Loading EasyOCR reader")
+                _reader = easyocr.Reader(['en'])
+    return _reader
+
+
+@dataclass
+class OcrResult:
+    """OCR output for one image, computed once and shared by classification and extraction.
+
+    ``boxes`` is an (n, 4) int32 array of axis-aligned pixel boxes [x1, y1, x2, y2]
+    enclosing each detected polygon and ``confidences`` an (n,) float32 array,
+    both parallel to ``words`` in the engine's order (EasyOCR detection order,
+    Tesseract reading order). ``image_size`` is (width, height) of the image
+    the boxes refer to.
+    """
+    words: List[str] = field(default_factory=list)
+    boxes: np.ndarray = field(default_factory=lambda: np.zeros((0, 4), dtype=np.int32))
+    confidences: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.float32))
+    image_size: Tuple[int, int] = (0, 0)
+    engine: str = ""              # OCR engine that produced it; empty for a PDF text layer
+
+    @property
+    def text(self) -> str:
+        return ' '.join(self.words)
+
+    @classmethod
+    def from_readtext(cls, raw, image_size: Tuple[int, int]) -> "OcrResult":
+        """Build from the (poly, text, conf) triples returned by ``reader.readtext``."""
+        image_size = (int(image_size[0]), int(image_size[1]))
+        if not raw:
+            return cls(image_size=image_size, engine="easyocr")
+        polys = np.array([poly for poly, _, _ in raw], dtype=np.float64).reshape(len(raw), -1, 2)
+        boxes = np.concatenate([np.floor(polys.min(axis=1)), np.ceil(polys.max(axis=1))], axis=1)
+        return cls(
+            words=[text for _, text, _ in raw],
+            boxes=boxes.astype(np.int32),
+            confidences=np.array([conf for _, _, conf in raw], dtype=np.float32),
+            image_size=image_size,
+            engine="easyocr",
+        )
+
+    @classmethod
+    def from_tesseract(cls, data: dict, image_size: Tuple[int, int]) -> "OcrResult":
+        """Build from ``pytesseract.image_to_data(..., output_type=Output.DICT)``.
+
+        Only word-level rows with text are kept; Tesseract's 0-100 confidence is scaled to 0-1.
+        """
+        image_size = (int(image_size[0]), int(image_size[1]))
+        rows = [i for i, (level, text) in enumerate(zip(data["level"], data["text"]))
+                if int(level) == 5 and str(text).strip()]
+        if not rows:
+            return cls(image_size=image_size, engine="tesseract")
+        col = {k: np.array([data[k][i] for i in rows], dtype=np.int32) for k in ("left", "top", "width", "height")}
+        return cls(
+            words=[str(data["text"][i]).strip() for i in rows],
+            boxes=np.stack([col["left"], col["top"], col["left"] + col["width"], col["top"] + col["height"]], axis=1),
+            confidences=np.clip(np.array([float(data["conf"][i]) for i in rows], dtype=np.float32) / 100, 0, 1),
+            image_size=image_size,
+            engine="tesseract",
+        )
+
+    def select(self, conf_thresh: float) -> Tuple[List[str], np.ndarray]:
+        """Words with confidence >= ``conf_thresh`` and their pixel boxes clipped to the image."""
+        W, H = self.image_size
+        keep = (self.confidences >= conf_thresh) & np.array([bool(w) for w in self.words], dtype=bool)
+        boxes = np.clip(self.boxes[keep], 0, np.array([W, H, W, H], dtype=np.int32))
+        return [w for w, k in zip(self.words, keep) if k], boxes
+
+    def entries(self, conf_thresh: float):
+        """Return (text, [x1, y1, x2, y2]) pixel boxes clipped to the image, skipping low-confidence words."""
+        words, boxes = self.select(conf_thresh)
+        return list(zip(words, boxes.tolist()))
+
+
+def normalize_boxes(boxes: np.ndarray, image_size: Tuple[int, int]) -> np.ndarray:
+    """Scale pixel boxes to LayoutLM's 0-1000 grid (truncating, like ``int(1000 * x / W)``)."""
+    W, H = image_size
+    scale = np.array([W, H, W, H], dtype=np.int64)
+    return np.clip(np.asarray(boxes, dtype=np.int64) * 1000 // np.maximum(scale, 1), 0, 1000)
+
+
+class OcrEngine:
+    """Reads the words, pixel boxes and confidences of one prepared image."""
+
+    name = ""
+
+    def load(self):
+        """Load models or check the binary is installed, so the first request does not pay for it."""
+
+    def read(self, img: np.ndarray) -> OcrResult:
+        raise NotImplementedError
+
+
+class EasyOcrEngine(OcrEngine):
+    """CRAFT detection + CRNN recognition; robust on crumpled, skewed or low-contrast receipts."""
+
+    name = "easyocr"
+
+    def load(self):
+        return get_reader()
+
+    def read(self, img: np.ndarray) -> OcrResult:
+        H, W = img.shape[:2]
+        return OcrResult.from_readtext(get_reader().readtext(img), (W, H))
+
+
+class TesseractEngine(OcrEngine):
+    """Tesseract via pytesseract; much faster on clean, flat printed pages such as PDF scans of invoices.
+
+    Needs the ``tesseract`` binary (``apt-get install tesseract-ocr``) and the pytesseract package.
+    """
+
+    name = "tesseract"
+
+    def load(self):
+        import pytesseract
+        return pytesseract.get_tesseract_version()
+
+    def read(self, img: np.ndarray) -> OcrResult:
+        import pytesseract
+        H, W = img.shape[:2]
+        if img.ndim == 3:
+            import cv2
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        data = pytesseract.image_to_data(img, lang=TESSERACT_LANG, config=TESSERACT_CONFIG,
+                                         output_type=pytesseract.Output.DICT)
+        return OcrResult.from_tesseract(data, (W, H))
+
+
+ENGINES = {engine.name: engine for engine in (EasyOcrEngine, TesseractEngine)}
+_engines: Dict[str, OcrEngine] = {}
+
+
+def get_engine(name: str = None) -> OcrEngine:
+    """Return the shared engine instance for ``name`` (default OCR_ENGINE)."""
+    name = (name or OCR_ENGINE).lower()
+    engine = _engines.get(name)
+    if engine is None:
+        if name not in ENGINES:
+            raise ValueError(f"Unknown OCR engine '{name}'; choose one of {', '.join(ENGINES)}")
+        engine = _engines.setdefault(name, ENGINES[name]())
+    return engine
+
+
+def _engines_by_type() -> Dict[str, str]:
+    pairs = (item.split("=", 1) for item in OCR_ENGINE_BY_TYPE.split(",") if "=" in item)
+    return {doc_type.strip().lower(): engine.strip().lower() for doc_type, engine in pairs}
+
+
+def ocr_engine_for(doc_type: str = None) -> str:
+    """Engine configured for ``doc_type`` ("receipt", "invoice"), or OCR_ENGINE."""
+    return _engines_by_type().get((doc_type or "").lower(), OCR_ENGINE)
+
+
+def ocr_engines_in_use() -> List[str]:
+    """Every engine the current configuration can call, default engine first."""
+    names = [OCR_ENGINE]
+    for name in _engines_by_type().values():
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def run_ocr(img, engine: str = None) -> OcrResult:
+    """Run OCR once on a decoded BGR image (numpy array), a PIL image or an image path.
+
+    ``engine`` picks the backend (default OCR_ENGINE). The image is normalized
+    first (see ``prepare_for_ocr``); boxes and ``image_size`` refer to the normalized image.
+    """
+    img = prepare_for_ocr(as_bgr(img))
+    return get_engine(engine).read(img)
@@ -0,0 +1,118 @@
+import logging
+import os
+from typing import Iterator, NamedTuple, Optional
+
+import numpy as np
+
+from .ocr_service import OcrResult
+
+logger = logging.getLogger(__name__)
+
+# Resolution PDF pages are rasterized at for OCR and the LayoutLMv3 pixel input
+PDF_RENDER_DPI = float(os.getenv("PDF_RENDER_DPI", "150"))
+# Pages beyond this are not processed (the result reports how many were skipped)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+# Use the embedded text layer instead of OCR when a page has at least PDF_MIN_TEXT_WORDS words
+PDF_TEXT_LAYER = os.getenv("PDF_TEXT_LAYER", "1") == "1"
+PDF_MIN_TEXT_WORDS = int(os.getenv("PDF_MIN_TEXT_WORDS", "5"))
+
+# pypdfium2 (PDFium wheels, no system packages) is an optional dependency, imported on first PDF
+
+
+def is_pdf(data, filename: str = "") -> bool:
+    return filename.lower().endswith(".pdf") or bytes(data[:5]) == b"%PDF-"
+
+
+class PdfPage(NamedTuple):
+    index: int
+    image: np.ndarray             # BGR, rendered at PDF_RENDER_DPI
+    ocr: Optional[OcrResult]      # words from the text layer, or None if the page needs OCR
+
+
+def page_count(data) -> int:
+    import pypdfium2 as pdfium
+    doc = pdfium.PdfDocument(bytes(data))
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+
+def iter_pages(data, dpi: float = None, max_pages: int = None) -> Iterator[PdfPage]:
+    """Render and yield one page at a time, so only the current page's pixels are held in memory."""
+    import pypdfium2 as pdfium
+    dpi = PDF_RENDER_DPI if dpi is None else dpi
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    scale = dpi / 72.0
+
+    doc = pdfium.PdfDocument(bytes(data))
+    try:
+        for index in range(min(len(doc), max_pages)):
+            page = doc[index]
+            try:
+                bitmap = page.render(scale=scale)
+                # Copy out of PDFium's buffer so the bitmap can be released right away
+                image = np.array(bitmap.to_numpy()[..., :3])
+                bitmap.close()
+                ocr = text_layer(page, scale, image.shape[1], image.shape[0]) if PDF_TEXT_LAYER else None
+            finally:
+                page.close()
+            yield PdfPage(index, image, ocr)
+    finally:
+        doc.close()
+
+
+def text_layer(page, scale: float, width: int, height: int) -> Optional[OcrResult]:
+    """Words and pixel boxes from the page's embedded text, or None for scanned/rotated pages."""
+    if page.get_rotation():
+        # Character boxes are in unrotated page space; let OCR read the rendered page
+        return None
+    textpage = page.get_textpage()
+    try:
+        n = textpage.count_chars()
+        if n <= 0:
+            return None
+        text = textpage.get_text_range(0, n)
+        if len(text) != n:
+            return None
+        _, page_height = page.get_size()
+
+        words, boxes = [], []
+        current, box = [], None
+        for i, ch in enumerate(text):
+            if ch.isspace():
+                if current:
+                    words.append("".join(current))
+                    boxes.append(box)
+                current, box = [], None
+                continue
+            left, bottom, right, top = textpage.get_charbox(i)
+            current.append(ch)
+            if box is None:
+                box = [left, bottom, right, top]
+            else:
+                box = [min(box[0], left), min(box[1], bottom), max(box[2], right), max(box[3], top)]
+        if current:
+            words.append("".join(current))
+            boxes.append(box)
+    finally:
+        textpage.close()
+
+    if len(words) < PDF_MIN_TEXT_WORDS:
+        return None
+    # PDF space has its origin at the bottom left; pixels start at the top left
+    pts = np.array(boxes, dtype=np.float64)
+    pixel = np.stack([
+        np.floor(pts[:, 0] * scale),
+        np.floor((page_height - pts[:, 3]) * scale),
+        np.ceil(pts[:, 2] * scale),
+        np.ceil((page_height - pts[:, 1]) * scale),
+    ], axis=1)
+    pixel[:, [0, 2]] = pixel[:, [0, 2]].clip(0, width)
+    pixel[:, [1, 3]] = pixel[:, [1, 3]].clip(0, height)
+    return OcrResult(
+        words=words,
+        boxes=pixel.astype(np.int32),
+        confidences=np.ones(len(words), dtype=np.float32),
+        image_size=(width, height),
+    )
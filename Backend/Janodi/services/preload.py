@@ -0,0 +1,51 @@
+import gc
+import logging
+import os
+import time
+
+from .executor import EXTRACTION_EXECUTOR, EXTRACTION_TORCH_THREADS
+from .memory import rss_mb
+from .warmup import DEFAULT_MODELS
+
+logger = logging.getLogger(__name__)
+
+# Models loaded in the gunicorn master before it forks the web workers (see
+# gunicorn.conf.py). Workers then share the weight pages copy-on-write.
+PRELOAD_MODELS = [m.strip() for m in os.getenv("PRELOAD_MODELS", DEFAULT_MODELS).split(",") if m.strip()]
+
+
+def preload_models(names=None) -> dict:
+    """Load model weights in this process without running them; returns load time per model.
+
+    No forward pass happens here, so torch's thread pools are only started in the
+    forked workers. ``gc.freeze()`` afterwards keeps the collector from touching
+    (and so copying) the pages of every object loaded so far.
+    """
+    from .warmup import _MODELS
+    if EXTRACTION_EXECUTOR == "process":
+        logger.warning("EXTRACTION_EXECUTOR=process spawns fresh extraction processes; preloaded weights are not shared with them")
+    names = list(names or PRELOAD_MODELS)
+    before = rss_mb()
+    timings = {}
+    for name in names:
+        start = time.perf_counter()
+        try:
+            _MODELS[name][0]()
+        except Exception:
+            logger.exception("Preloading %s failed; workers will load it on first use", name)
+            continue
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    gc.collect()
+    gc.freeze()
+    logger.info("Preloaded %s in pid %d (+%.0f MiB RSS)", ", ".join(timings) or "nothing", os.getpid(), rss_mb() - before)
+    return timings
+
+
+def configure_forked_worker(workers: int):
+    """Split the cores between forked web workers so they don't oversubscribe the CPU."""
+    threads = EXTRACTION_TORCH_THREADS or max(1, (os.cpu_count() or 1) // max(1, workers))
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    logger.info("Worker %d using %d torch threads", os.getpid(), threads)
@@ -0,0 +1,159 @@
+import logging
+import os
+import threading
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from .image_io import decode_thumbnail
+
+logger = logging.getLogger(__name__)
+
+# Reject photos that are too blurry, dark, washed out or text-free before running OCR
+QUALITY_GATE = os.getenv("QUALITY_GATE", "1") == "1"
+# Long side of the grayscale thumbnail the checks run on
+QUALITY_SIDE = int(os.getenv("QUALITY_SIDE", "768"))
+# Laplacian variance of the contrast-stretched thumbnail below which a photo counts as blurry
+QUALITY_MIN_SHARPNESS = float(os.getenv("QUALITY_MIN_SHARPNESS", "20"))
+# Mean brightness (0-255) below which a photo counts as too dark
+QUALITY_MIN_BRIGHTNESS = float(os.getenv("QUALITY_MIN_BRIGHTNESS", "40"))
+# A photo is washed out when at least this share of its pixels is clipped to white...
+QUALITY_MAX_CLIPPED = float(os.getenv("QUALITY_MAX_CLIPPED", "0.5"))
+# ...and even its darkest 0.1% of pixels (the ink) are at least this bright. A clean page
+# with little text is mostly white too, but its ink stays dark.
+QUALITY_MIN_DARK_LEVEL = float(os.getenv("QUALITY_MIN_DARK_LEVEL", "200"))
+# Text-line-sized blobs a document photo must contain
+QUALITY_MIN_TEXT_REGIONS = int(os.getenv("QUALITY_MIN_TEXT_REGIONS", "5"))
+
+# What the user should do about each problem, in the order they are reported
+RETAKE_HINTS = {
+    "too_dark": "the photo is too dark, retake it in better light",
+    "overexposed": "the photo is washed out, avoid glare or direct light on the paper",
+    "blurry": "the photo is out of focus, hold the camera steady and tap the text to focus",
+    "no_text": "no text was found, make sure the receipt or invoice fills the frame",
+}
+
+
+class QualityReport(NamedTuple):
+    ok: bool
+    reasons: List[str]            # keys of RETAKE_HINTS, empty when ok
+    metrics: Optional[dict]       # None when the bytes could not be decoded
+
+    @property
+    def message(self) -> str:
+        hints = "; ".join(RETAKE_HINTS[r] for r in self.reasons)
+        return f"Please retake the photo: {hints}" if hints else ""
+
+
+def count_text_regions(gray: np.ndarray) -> int:
+    """Number of blobs shaped like words or text lines.
+
+    Strong local edges are joined horizontally and the connected components
+    kept whose short side is a plausible character height for the thumbnail.
+    """
+    import cv2
+    grad = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+    level, edges = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    if level < 20:
+        # Otsu splits any image in two; faint gradients (flat paper, dark shots) are not text
+        _, edges = cv2.threshold(grad, 20, 255, cv2.THRESH_BINARY)
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, np.ones((1, 9), np.uint8))
+    n, _, stats, _ = cv2.connectedComponentsWithStats(edges, connectivity=8)
+    long_side = max(gray.shape)
+    sizes = stats[1:n, cv2.CC_STAT_WIDTH:cv2.CC_STAT_HEIGHT + 1]
+    short, long = sizes.min(axis=1), sizes.max(axis=1)
+    text_like = (short >= max(3, 0.004 * long_side)) & (short <= 0.08 * long_side) & (long <= 0.9 * long_side)
+    return int(text_like.sum())
+
+
+def assess_quality(data, side: int = None) -> QualityReport:
+    """Blur, exposure and text-presence checks on a small grayscale thumbnail (a few ms).
+
+    ``data`` is the uploaded bytes or a thumbnail already decoded with
+    ``decode_thumbnail(data, QUALITY_SIDE)``. Bytes that do not decode pass,
+    so the extraction step reports the decode error as before.
+    """
+    import cv2
+    if isinstance(data, np.ndarray):
+        gray = data
+    else:
+        gray = decode_thumbnail(data, QUALITY_SIDE if side is None else side)
+    if gray is None or min(gray.shape) < 16:
+        return QualityReport(True, [], None)
+
+    mean = float(gray.mean())
+    ink_level, dark_level, bright_level = (float(v) for v in np.percentile(gray, (0.1, 1, 99)))
+    clipped = float(np.count_nonzero(gray >= 250)) / gray.size
+    # Stretch contrast first so sharpness does not depend on exposure. On a sparse page
+    # even the 1st percentile is paper, so the ink level is the dark end there.
+    low = dark_level if bright_level - dark_level >= 32 else ink_level
+    spread = max(bright_level - low, 1.0)
+    stretched = cv2.convertScaleAbs(gray, alpha=255.0 / spread, beta=-low * 255.0 / spread)
+    sharpness = float(cv2.Laplacian(stretched, cv2.CV_32F).var())
+    text_regions = count_text_regions(gray)
+
+    reasons = []
+    if mean < QUALITY_MIN_BRIGHTNESS:
+        reasons.append("too_dark")
+    elif clipped >= QUALITY_MAX_CLIPPED and ink_level >= QUALITY_MIN_DARK_LEVEL:
+        reasons.append("overexposed")
+    if spread < 32:
+        # Nothing but flat paper or a wall: there is no detail to be out of focus
+        if not reasons:
+            reasons.append("no_text")
+    elif sharpness < QUALITY_MIN_SHARPNESS:
+        reasons.append("blurry")
+    if text_regions < QUALITY_MIN_TEXT_REGIONS and not reasons:
+        # A dark, washed-out or blurry shot loses its text too; report the cause instead
+        reasons.append("no_text")
+
+    metrics = {
+        "sharpness": round(sharpness, 1),
+        "brightness": round(mean, 1),
+        "dark_level": round(dark_level, 1),
+        "ink_level": round(ink_level, 1),
+        "clipped": round(clipped, 3),
+        "text_regions": text_regions,
+        "thumbnail": [gray.shape[1], gray.shape[0]],
+    }
+    return QualityReport(not reasons, reasons, metrics)
+
+
+class QualityGate:
+    """Runs :func:`assess_quality` and counts how many uploads it turns away, and why."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {"checks": 0, "rejected": 0}
+        self._by_reason = {reason: 0 for reason in RETAKE_HINTS}
+
+    def check(self, data) -> QualityReport:
+        report = assess_quality(data)
+        with self._lock:
+            self._counters["checks"] += 1
+            if not report.ok:
+                self._counters["rejected"] += 1
+                for reason in report.reasons:
+                    self._by_reason[reason] += 1
+        if not report.ok:
+            logger.info("Quality gate rejected upload: %s %s", report.reasons, report.metrics)
+        return report
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            by_reason = dict(self._by_reason)
+        return {
+            "enabled": QUALITY_GATE,
+            "rejection_rate": round(counters["rejected"] / counters["checks"], 3) if counters["checks"] else None,
+            **counters,
+            "by_reason": by_reason,
+        }
+
+
+# Process-wide gate used by /api/upload
+quality_gate = QualityGate()
+
+
+def quality_stats() -> dict:
+    return quality_gate.stats()
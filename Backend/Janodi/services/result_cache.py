@@ -0,0 +1,339 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from ..model.model_ids import INVOICE_MODEL_ID, RECEIPT_MODEL_ID
+
+logger = logging.getLogger(__name__)
+
+# Extraction results kept in process memory, keyed by a hash of the uploaded bytes; 0 disables the cache
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "512"))
+# Optional second tier shared by workers and restarts; empty keeps results in memory only
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "")
+# Size cap for RESULT_CACHE_DIR; least recently used results are deleted first
+RESULT_CACHE_DISK_MB = float(os.getenv("RESULT_CACHE_DISK_MB", "256"))
+# Bump to invalidate every cached result, e.g. after a model repo is updated in place
+RESULT_CACHE_VERSION = os.getenv("RESULT_CACHE_VERSION", "1")
+
+# Settings that change what process_document returns for the same bytes
+_OUTPUT_SETTINGS = (
+    "LAYOUTLM_QUANTIZE",
+    "LAYOUTLM_BACKEND",
+    "LAYOUTLM_SLIDING_WINDOW",
+    "LAYOUTLM_WINDOW_STRIDE",
+    "GEMINI_FOR_DOCS",
+    "OCR_ENGINE",
+    "OCR_ENGINE_BY_TYPE",
+    "TESSERACT_LANG",
+    "TESSERACT_CONFIG",
+    "PDF_RENDER_DPI",
+    "PDF_TEXT_LAYER",
+    "PDF_MIN_TEXT_WORDS",
+    "PDF_MAX_PAGES",
+    "OCR_MAX_SIDE",
+    "OCR_GRAYSCALE",
+    "OCR_CONTRAST",
+)
+
+# Results carrying this key came from a fallback path (a model failed to load or raised, the
+# classifier errored); get_or_compute strips it and never caches such a result
+FALLBACK_KEY = "_fallback"
+
+
+def _hub_cache_dir() -> Path:
+    cache = os.getenv("HF_HUB_CACHE") or os.getenv("HUGGINGFACE_HUB_CACHE")
+    if cache:
+        return Path(cache)
+    if os.getenv("HF_HOME"):
+        return Path(os.getenv("HF_HOME")) / "hub"
+    return Path.home() / ".cache" / "huggingface" / "hub"
+
+
+def resolved_revision(model_id: str) -> str:
+    """Commit of ``model_id`` that from_pretrained resolves to, read from the hub cache.
+
+    Returns "local" for a checkpoint directory and "unresolved" before the weights are downloaded.
+    """
+    if Path(model_id).is_dir():
+        return "local"
+    ref = _hub_cache_dir() / f"models--{model_id.replace('/', '--')}" / "refs" / "main"
+    try:
+        return ref.read_text(encoding="utf-8").strip() or "unresolved"
+    except OSError:
+        return "unresolved"
+
+
+def model_fingerprint() -> str:
+    """Identify the models (with their resolved revisions) and settings a cached result was produced with."""
+    settings = ",".join(f"{name}={os.getenv(name, '')}" for name in _OUTPUT_SETTINGS)
+    models = "|".join(f"{m}@{resolved_revision(m)}" for m in (RECEIPT_MODEL_ID, INVOICE_MODEL_ID))
+    return f"v{RESULT_CACHE_VERSION}|{models}|{settings}"
+
+
+def result_key(contents: bytes) -> str:
+    """SHA-256 of the model fingerprint and the uploaded bytes."""
+    digest = hashlib.sha256(model_fingerprint().encode())
+    digest.update(b"\0")
+    digest.update(contents)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache of extraction results: an in-process LRU and an optional directory.
+
+    Results are stored as JSON text, so every hit hands out a fresh copy that the
+    caller may modify. Disk entries are written atomically and evicted least
+    recently used first once the directory grows past its size cap. The async
+    path (``get_or_compute``) does all file I/O in worker threads.
+    """
+
+    def __init__(self, max_entries: int = None, directory: str = None, disk_mb: float = None):
+        self.max_entries = RESULT_CACHE_SIZE if max_entries is None else max_entries
+        directory = RESULT_CACHE_DIR if directory is None else directory
+        self.directory = Path(directory) if directory else None
+        self.disk_bytes_limit = int((RESULT_CACHE_DISK_MB if disk_mb is None else disk_mb) * 2**20)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        # Disk entries (key -> bytes) in least recently used order, so eviction never re-scans
+        # the directory. Built by one scan on first disk access; files other processes write
+        # after that are counted at the next start.
+        self._disk_index = None
+        self._disk_bytes = 0
+        self._inflight = {}
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0,
+                          "coalesced": 0, "fallbacks_not_cached": 0, "memory_evictions": 0, "disk_evictions": 0, "disk_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        text = self._memory_get(key)
+        if text is None:
+            text = self._disk_hit(key, self._disk_get(key))
+        return json.loads(text) if text is not None else None
+
+    def put(self, key: str, result: dict):
+        if not self.enabled:
+            return
+        text = self._memory_put(key, result)
+        self._disk_put(key, text)
+
+    async def _aget(self, key: str) -> Optional[dict]:
+        """``get`` for the event loop: the disk tier is read in a worker thread."""
+        text = self._memory_get(key)
+        if text is None:
+            disk = await asyncio.to_thread(self._disk_get, key) if self.directory is not None else None
+            if disk is None:
+                # An identical upload may have finished while the file was being looked up
+                with self._lock:
+                    disk = self._memory.get(key)
+            text = self._disk_hit(key, disk)
+        return json.loads(text) if text is not None else None
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+            return text
+
+    def _disk_hit(self, key: str, text: Optional[str]) -> Optional[str]:
+        """Count a memory miss and promote what the disk tier returned for it."""
+        with self._lock:
+            if text is None:
+                self._counters["misses"] += 1
+            else:
+                self._counters["disk_hits"] += 1
+                self._remember(key, text)
+        return text
+
+    def _memory_put(self, key: str, result: dict) -> str:
+        text = json.dumps(result)
+        with self._lock:
+            self._counters["stores"] += 1
+            self._remember(key, text)
+        return text
+
+    async def get_or_compute(self, key: str, compute):
+        """Return the cached result for ``key`` or await ``compute()`` and cache it.
+
+        Identical uploads that arrive while the first is still being processed
+        wait for that run instead of starting their own. If that request is
+        cancelled, its waiters do not inherit the cancellation: one of them
+        takes over the computation and the rest wait for it.
+        """
+        while True:
+            cached = await self._aget(key)
+            if cached is not None:
+                return cached
+            if not self.enabled:
+                result = await compute()
+                self._pop_fallback(key, result)
+                return result
+            pending = self._inflight.get(key)
+            if pending is None:
+                return await self._compute(key, compute)
+            with self._lock:
+                self._counters["coalesced"] += 1
+            text = await asyncio.shield(pending)
+            if text is not None:
+                return json.loads(text)
+            # The owning request was cancelled before it had a result; start over
+
+    async def _compute(self, key: str, compute):
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; retrieve it here so asyncio does not log it when there are none
+            future.exception()
+            raise
+        except BaseException:
+            # None tells waiters to retry; cancelling the future would cancel them too
+            future.set_result(None)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        if self._pop_fallback(key, result):
+            future.set_result(json.dumps(result))
+            return result
+        # Stored in memory before the waiters wake; the file is written off the event loop
+        text = self._memory_put(key, result)
+        future.set_result(text)
+        if self.directory is not None:
+            await asyncio.to_thread(self._disk_put, key, text)
+        return result
+
+    def _pop_fallback(self, key: str, result) -> bool:
+        """Strip the fallback marker from ``result``; True if it was a degraded result that must not be cached."""
+        reason = result.pop(FALLBACK_KEY, None) if isinstance(result, dict) else None
+        if not reason:
+            return False
+        logger.warning("Not caching result %s: produced by a fallback (%s)", key[:12], reason)
+        with self._lock:
+            self._counters["fallbacks_not_cached"] += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._memory)
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        lookups = hits + counters["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "disk_dir": str(self.directory) if self.directory else None,
+            "disk_mb": round(self._disk_bytes / 2**20, 2) if self._disk_index is not None else None,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            **counters,
+        }
+
+    def _remember(self, key: str, text: str):
+        # Caller holds self._lock
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["memory_evictions"] += 1
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+            os.utime(path)  # keeps the order right for the next process's index scan
+            with self._disk_lock:
+                if self._disk_index is not None and key in self._disk_index:
+                    self._disk_index.move_to_end(key)
+            return text
+        except FileNotFoundError:
+            return None
+        except OSError:
+            logger.exception("Failed to read cached result %s", path)
+            with self._lock:
+                self._counters["disk_errors"] += 1
+            return None
+
+    def _disk_put(self, key: str, text: str):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        data = text.encode("utf-8")
+        try:
+            with self._disk_lock:
+                if self._disk_index is None:
+                    self._disk_scan()
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp.write_bytes(data)
+                os.replace(tmp, path)
+                self._disk_bytes += len(data) - self._disk_index.pop(key, 0)
+                self._disk_index[key] = len(data)
+                if self._disk_bytes > self.disk_bytes_limit:
+                    self._disk_evict()
+        except OSError:
+            logger.exception("Failed to write cached result %s", path)
+            with self._lock:
+                self._counters["disk_errors"] += 1
+
+    def _disk_scan(self):
+        """Index the files already in the directory, oldest access first. Caller holds _disk_lock."""
+        files = []
+        for p in self.directory.glob("*/*.json"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, p.stem, st.st_size))
+        files.sort()
+        self._disk_index = OrderedDict((key, size) for _, key, size in files)
+        self._disk_bytes = sum(self._disk_index.values())
+
+    def _disk_evict(self):
+        """Delete least recently used files until the directory is under 90% of its cap. Caller holds _disk_lock."""
+        target = self.disk_bytes_limit * 0.9
+        evicted = 0
+        while self._disk_index and self._disk_bytes > target:
+            key, size = self._disk_index.popitem(last=False)
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+            self._disk_bytes -= size
+            evicted += 1
+        with self._lock:
+            self._counters["disk_evictions"] += evicted
+        logger.info("Result cache evicted %d files from %s (%.1f MiB left)",
+                    evicted, self.directory, self._disk_bytes / 2**20)
+
+
+# Process-wide cache used by /api/upload and the job drainers
+result_cache = ResultCache()
+
+
+def result_cache_stats() -> dict:
+    return result_cache.stats()
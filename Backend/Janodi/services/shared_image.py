@@ -0,0 +1,72 @@
+import logging
+import sys
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SharedImageHandle:
+    """Picklable reference to upload bytes held in a shared memory block."""
+    name: str
+    size: int
+
+
+class SharedImage:
+    """Owner side: copy upload bytes into shared memory once and unlink on exit.
+
+    Only the small handle is pickled to the worker process, so the image
+    payload never goes through the executor's pipe.
+    """
+
+    def __init__(self, data: bytes):
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        self._shm.buf[:len(data)] = data
+        self.handle = SharedImageHandle(self._shm.name, len(data))
+
+    def __enter__(self) -> SharedImageHandle:
+        return self.handle
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._shm is None:
+            return
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._shm = None
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    # Before 3.13 attaching registers the block with the resource tracker, which
+    # would unlink it (and warn) when this worker exits; the owner unlinks it instead.
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def call_with_shared_image(fn, handle: SharedImageHandle, *args):
+    """Worker side: call ``fn(view, *args)`` with a zero-copy memoryview of the shared bytes."""
+    shm = _attach(handle.name)
+    view = shm.buf[:handle.size]
+    try:
+        return fn(view, *args)
+    finally:
+        try:
+            view.release()
+            shm.close()
+        except BufferError:
+            # An exception traceback can still reference arrays built on the view;
+            # the mapping is released when those are collected.
+            logger.debug("Shared image %s still referenced, deferring close", handle.name)
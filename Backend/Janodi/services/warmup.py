@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import os
+import time
+
+from .executor import EXTRACTION_EXECUTOR, EXTRACTION_WORKERS, run_in_executor
+from .memory import rss_mb
+from .ocr_service import ocr_engines_in_use
+
+logger = logging.getLogger(__name__)
+
+# Load and warm every configured model in the background at startup so the first
+# real request does not pay for it. /ready reports 503 until all of them are ready.
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+# Defaults to the OCR engines the configuration uses plus both LayoutLMv3 models.
+DEFAULT_MODELS = ",".join(ocr_engines_in_use() + ["receipt", "invoice"])
+WARMUP_MODELS = [m.strip() for m in os.getenv("WARMUP_MODELS", DEFAULT_MODELS).split(",") if m.strip()]
+
+# Worst state first; used when merging reports from several worker processes
+_STATES = ["failed", "pending", "loading", "warming", "ready"]
+
+_status = {}
+_task = None
+
+
+def _load_easyocr():
+    from .ocr_service import get_reader
+    return get_reader()
+
+
+def _warm_easyocr(reader):
+    import numpy as np
+    reader.readtext(np.full((64, 256, 3), 255, dtype=np.uint8))
+
+
+def _load_tesseract():
+    from .ocr_service import get_engine
+    engine = get_engine("tesseract")
+    engine.load()
+    return engine
+
+
+def _warm_tesseract(engine):
+    import numpy as np
+    engine.read(np.full((64, 256, 3), 255, dtype=np.uint8))
+
+
+def _load_receipt():
+    from ..model.receipts_model import _MODEL_NAME, _init_model
+    processor, model, _ = _init_model()
+    return _MODEL_NAME, processor, model
+
+
+def _load_invoice():
+    from ..model.invoice_model import _MODEL_ID, _init_invoice_model
+    processor, model = _init_invoice_model()
+    return _MODEL_ID, processor, model
+
+
+def _warm_layoutlm(loaded):
+    """One forward pass on a blank page (also builds the ONNX session when that backend is on)."""
+    import torch
+    from PIL import Image
+    from ..model.layoutlm_encoding import encode_document
+    from ..model.onnx_backend import inference_model
+    model_id, processor, model = loaded
+    encoding = encode_document(processor, Image.new("RGB", (224, 224), "white"), ["warmup"], [[0, 0, 100, 100]])
+    with torch.no_grad():
+        inference_model(model_id, model)(**encoding)
+
+
+_MODELS = {
+    "easyocr": (_load_easyocr, _warm_easyocr),
+    "tesseract": (_load_tesseract, _warm_tesseract),
+    "receipt": (_load_receipt, _warm_layoutlm),
+    "invoice": (_load_invoice, _warm_layoutlm),
+}
+
+
+def _entry(state: str) -> dict:
+    return {"state": state, "load_ms": None, "warmup_ms": None, "rss_mb": None, "error": None}
+
+
+def warm_models(names=None) -> dict:
+    """Load and warm ``names`` (default WARMUP_MODELS) in this process, one after another.
+
+    Returns per-model state, load and warm-up time, and the RSS growth while loading.
+    """
+    names = list(names or WARMUP_MODELS)
+    report = {name: _entry("pending") for name in names}
+    _status.update(report)
+    for name in names:
+        entry = report[name]
+        if name not in _MODELS:
+            entry.update(state="failed", error=f"unknown model '{name}'")
+            continue
+        load, warm = _MODELS[name]
+        try:
+            entry["state"] = "loading"
+            before = rss_mb()
+            start = time.perf_counter()
+            loaded = load()
+            entry["load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            entry["rss_mb"] = round(rss_mb() - before, 1)
+            entry["state"] = "warming"
+            start = time.perf_counter()
+            warm(loaded)
+            entry["warmup_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            entry["state"] = "ready"
+            logger.info("Model %s ready (load %.0f ms, warm-up %.0f ms)", name, entry["load_ms"], entry["warmup_ms"])
+        except Exception as e:
+            logger.exception("Warm-up of %s failed; it will be loaded on first use", name)
+            entry.update(state="failed", error=str(e))
+    return report
+
+
+def _merge(reports) -> dict:
+    """Combine per-worker reports: worst state, slowest times, largest memory growth."""
+    merged = {}
+    for report in reports:
+        for name, entry in report.items():
+            current = merged.setdefault(name, dict(entry))
+            if _STATES.index(entry["state"]) < _STATES.index(current["state"]):
+                current["state"], current["error"] = entry["state"], entry["error"]
+            for key in ("load_ms", "warmup_ms", "rss_mb"):
+                if entry[key] is not None:
+                    current[key] = max(current[key] or 0, entry[key])
+    return merged
+
+
+async def _run_warmup():
+    started = time.perf_counter()
+    # In process mode every worker holds its own models, so warm each of them
+    runs = max(1, EXTRACTION_WORKERS) if EXTRACTION_EXECUTOR == "process" else 1
+    reports = await asyncio.gather(*(run_in_executor(warm_models) for _ in range(runs)), return_exceptions=True)
+    results = []
+    for report in reports:
+        if isinstance(report, BaseException):
+            logger.error("Model warm-up task failed: %s", report)
+            report = {name: dict(_entry("failed"), error=str(report)) for name in WARMUP_MODELS}
+        results.append(report)
+    _status.update(_merge(results))
+    logger.info("Model warm-up finished in %.1f s", time.perf_counter() - started)
+
+
+def start_model_warmup():
+    """Schedule background warm-up on the running loop; returns immediately."""
+    global _task
+    if not MODEL_WARMUP or _task is not None:
+        return
+    _status.clear()
+    _status.update({name: _entry("pending") for name in WARMUP_MODELS})
+    _task = asyncio.get_running_loop().create_task(_run_warmup())
+
+
+async def stop_model_warmup():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+def readiness() -> dict:
+    """Per-model warm-up status; ready once every configured model is loaded and warmed."""
+    models = {name: dict(entry) for name, entry in _status.items()}
+    ready = not MODEL_WARMUP or all(entry["state"] == "ready" for entry in models.values())
+    return {"ready": ready, "warmup": MODEL_WARMUP, "models": models}
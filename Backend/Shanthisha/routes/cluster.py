@@ -1,6 +1,4 @@
 import os
-import joblib
-import pandas as pd
 import numpy as np
 import warnings
 
@@ -25,7 +23,8 @@ def get_bundle():
         if not os.path.exists(CLUSTER_PIPELINE_PATH):
             raise FileNotFoundError("Cluster pipeline file not found. Please ensure 'cluster_pipeline.joblib' is placed in the correct directory.")
             
-        # Load cluster pipeline bundle
+        # Load cluster pipeline bundle (joblib/sklearn imported on first use)
+        import joblib
         bundle = joblib.load(CLUSTER_PIPELINE_PATH)
         return bundle
     except Exception as e:
@@ -48,6 +47,7 @@ async def predict_cluster(data: ClusterPredictionInput):
     """
     Predict cluster ID based on user data
     """
+    import pandas as pd
     try:
         # Load cluster bundle
         bundle = get_bundle()
@@ -375,6 +375,7 @@ async def debug_predict_cluster(data: ClusterPredictionInput):
     """
     Debug endpoint to predict cluster ID with additional information about the preprocessing
     """
+    import pandas as pd
     try:
         # Regular prediction
         result = await predict_cluster(data)
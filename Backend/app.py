@@ -1,32 +1,50 @@
+import os
+
 from fastapi import FastAPI
 import uvicorn
 from dotenv import load_dotenv
 
 from Janodi.routes import upload
-from Janodi.routes import receiptsave
-from Janodi.routes import invoicesave
-from core.config import db
+from Janodi.routes import jobs
+from Janodi.routes import metrics
+from Janodi.routes import health
+from Janodi.services.executor import shutdown_executor
+from Janodi.services.job_worker import start_job_workers, stop_job_workers
+from Janodi.services.warmup import start_model_warmup, stop_model_warmup
 from fastapi.middleware.cors import CORSMiddleware
 
-from Maduni.routes import auth
-from Maduni.routes import document
-from Shanthisha.routes import receipt
-from Maduni.routes import email_route
-from Shanthisha.routes import user
-from Shanthisha.routes import chatbot
+load_dotenv()
 
-from Maduni.routes import test_auth_router
-from Maduni.routes import auth_signup
+# Which part of the backend this process serves:
+#   "all"    - every route, plus model warm-up and the extraction job workers (default)
+#   "api"    - Firebase/chatbot/cluster routes and job submission; never loads the
+#              OCR/LayoutLMv3 models (jobs are drained by a separate worker instance)
+#   "worker" - /api/upload, /api/jobs, /api/metrics and /ready with warm models and
+#              job workers; no Firebase routes
+APP_ROLE = os.getenv("APP_ROLE", "all").lower()
+SERVES_API = APP_ROLE in ("all", "api")
+SERVES_EXTRACTION = APP_ROLE in ("all", "worker")
 
+if SERVES_API:
+    from Janodi.routes import receiptsave
+    from Janodi.routes import invoicesave
+    from core.config import db
 
+    from Maduni.routes import auth
+    from Maduni.routes import document
+    from Shanthisha.routes import receipt
+    from Maduni.routes import email_route
+    from Shanthisha.routes import user
+    from Shanthisha.routes import chatbot
 
+    from Maduni.routes import test_auth_router
+    from Maduni.routes import auth_signup
 
-from Shanthisha.routes import cluster
+    from Shanthisha.routes import cluster
 
 
 
 app = FastAPI()
-load_dotenv()
 
 app.add_middleware(
     CORSMiddleware,
@@ -40,31 +58,49 @@ app.add_middleware(
 def read_root():
     return {"message": "Hello from FastAPI!"}
 
-app.include_router(auth.router, prefix="/auth", tags=["Firebase Auth"])
-app.include_router(upload.router, prefix="/api", tags=["Upload"])
-app.include_router(document.router, prefix="/fetch", tags=["Fetch receipts invoices"])
-app.include_router(receipt.router, prefix="/get", tags=["Receipts"])
-app.include_router(user.router, prefix="/get", tags=["Users"])
+@app.on_event("startup")
+async def start_extraction_jobs():
+    if SERVES_EXTRACTION:
+        start_model_warmup()
+        await start_job_workers()
+
+@app.on_event("shutdown")
+async def stop_extraction_workers():
+    await stop_model_warmup()
+    await stop_job_workers()
+    shutdown_executor()
 
-app.include_router(email_route.router, prefix="/email", tags=["Send email"])
+app.include_router(health.router, tags=["Health"])
+app.include_router(jobs.router, prefix="/api", tags=["Extraction jobs"])
 
-app.include_router(receiptsave.router, prefix="/api", tags=["Save_receipt_data"])
-app.include_router(invoicesave.router, prefix="/api", tags=["Save_invoice_data"])
+if SERVES_EXTRACTION:
+    app.include_router(upload.router, prefix="/api", tags=["Upload"])
+    app.include_router(metrics.router, prefix="/api", tags=["Extraction metrics"])
 
-# Add the chatbot router
-app.include_router(chatbot.router, prefix="/chatbot", tags=["AI Chatbot"])
+if SERVES_API:
+    app.include_router(auth.router, prefix="/auth", tags=["Firebase Auth"])
+    app.include_router(document.router, prefix="/fetch", tags=["Fetch receipts invoices"])
+    app.include_router(receipt.router, prefix="/get", tags=["Receipts"])
+    app.include_router(user.router, prefix="/get", tags=["Users"])
 
+    app.include_router(email_route.router, prefix="/email", tags=["Send email"])
 
-app.include_router(test_auth_router.router, prefix="/test", tags=["Firebase Auth Test"])
-app.include_router(auth_signup.router, prefix="/auth", tags=["Firebase Auth Test"])
+    app.include_router(receiptsave.router, prefix="/api", tags=["Save_receipt_data"])
+    app.include_router(invoicesave.router, prefix="/api", tags=["Save_invoice_data"])
 
+    # Add the chatbot router
+    app.include_router(chatbot.router, prefix="/chatbot", tags=["AI Chatbot"])
 
-# Add the cluster prediction router
-app.include_router(cluster.router, prefix="/user", tags=["Cluster Prediction"])
+
+    app.include_router(test_auth_router.router, prefix="/test", tags=["Firebase Auth Test"])
+    app.include_router(auth_signup.router, prefix="/auth", tags=["Firebase Auth Test"])
+
+
+    # Add the cluster prediction router
+    app.include_router(cluster.router, prefix="/user", tags=["Cluster Prediction"])
 
 
 
 
 if __name__ == "__main__":
     uvicorn.run("app:app", host="127.0.0.1", port=8000, reload=True)
-
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+OCR Engine Benchmark
+
+Runs every OCR engine (see OCR_ENGINE in Janodi/services/ocr_service.py) over
+the images in one or more folders, after the same decode and normalization the
+upload route applies, and reports per folder and engine:
+
+  * load: time to load the engine (model weights, binary check), not counted below
+  * latency: median and p95 milliseconds per image
+  * throughput: images and recognized words per second (one image at a time)
+  * agreement: word-level F1 against the reference engine (the first one listed),
+    and against ground truth when ``<image stem>.txt`` holds the document's text
+
+Run it once per kind of document, e.g. a folder of clean printed invoices and a
+folder of crumpled receipt photos, to choose OCR_ENGINE_BY_TYPE.
+
+Usage:
+    python benchmarks/bench_ocr_engines.py [FOLDER ...] [--engines easyocr,tesseract]
+        [--repeat 1] [--limit 0]
+"""
+
+import argparse
+import re
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND_DIR))
+
+from Janodi.services.image_io import decode_image
+from Janodi.services.ocr_service import get_engine, run_ocr
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg"}
+
+
+def normalize_words(words):
+    """Lower-cased words without surrounding punctuation; engines split and punctuate differently."""
+    out = []
+    for word in words:
+        for part in word.split():
+            part = re.sub(r"^\W+|\W+$", "", part.lower())
+            if part:
+                out.append(part)
+    return out
+
+
+def word_f1(words, reference) -> float:
+    """Multiset F1 of two word lists (1.0 when both are empty)."""
+    a, b = Counter(words), Counter(reference)
+    total = sum(a.values()) + sum(b.values())
+    return 2 * sum((a & b).values()) / total if total else 1.0
+
+
+def load_engine(name):
+    """(engine, load ms), or (None, reason) when the engine cannot run here."""
+    start = time.perf_counter()
+    try:
+        engine = get_engine(name)
+        engine.load()
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}".splitlines()[0]
+    return engine, (time.perf_counter() - start) * 1000
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def bench_folder(folder: Path, engines, repeat: int, limit: int):
+    images = sorted(p for p in folder.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if limit:
+        images = images[:limit]
+    if not images:
+        print(f"{folder}: no images")
+        return
+
+    decoded = [(path, decode_image(path.read_bytes())) for path in images]
+    truth = {path: normalize_words(path.with_suffix(".txt").read_text().split())
+             for path in images if path.with_suffix(".txt").exists()}
+
+    words = {}
+    rows = []
+    for name, _ in engines:
+        # One untimed read so lazy initialization does not land on the first image
+        run_ocr(decoded[0][1], name)
+        latencies, word_count = [], 0
+        words[name] = {}
+        for path, img in decoded:
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                ocr = run_ocr(img, name)
+                times.append((time.perf_counter() - start) * 1000)
+            latencies.append(statistics.median(times))
+            words[name][path] = normalize_words(ocr.words)
+            word_count += len(ocr.words)
+        total_s = sum(latencies) / 1000
+        rows.append((name, latencies, word_count, total_s))
+
+    reference = engines[0][0]
+    print(f"\n{folder} ({len(images)} images, {len(truth)} with ground truth), reference engine: {reference}")
+    print(f"{'engine':<12} {'p50 ms':>8} {'p95 ms':>8} {'img/s':>7} {'words/s':>8} {'agree':>6} {'truth F1':>9}")
+    for name, latencies, word_count, total_s in rows:
+        agree = statistics.mean(word_f1(words[name][p], words[reference][p]) for p, _ in decoded)
+        truth_f1 = statistics.mean(word_f1(words[name][p], t) for p, t in truth.items()) if truth else None
+        print(f"{name:<12} {statistics.median(latencies):>8.0f} {pct(latencies, 0.95):>8.0f} "
+              f"{len(latencies) / total_s:>7.2f} {word_count / total_s:>8.0f} {agree:>6.2f} "
+              f"{'-' if truth_f1 is None else f'{truth_f1:.2f}':>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folders", nargs="*", type=Path, default=[BACKEND_DIR / "test_data"])
+    parser.add_argument("--engines", default="easyocr,tesseract", help="comma-separated; the first is the reference")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per image (median is kept)")
+    parser.add_argument("--limit", type=int, default=0, help="only the first N images of each folder")
+    args = parser.parse_args()
+
+    engines = []
+    for name in (n.strip() for n in args.engines.split(",") if n.strip()):
+        engine, info = load_engine(name)
+        if engine is None:
+            print(f"{name}: unavailable ({info})")
+            continue
+        print(f"{name}: loaded in {info:.0f} ms")
+        engines.append((name, engine))
+    if not engines:
+        sys.exit("No OCR engine available")
+
+    for folder in args.folders:
+        bench_folder(folder, engines, args.repeat, args.limit)
+
+
+if __name__ == "__main__":
+    main()
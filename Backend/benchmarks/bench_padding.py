@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+LayoutLMv3 Padding Benchmark
+
+Runs OCR once on the sample receipt and invoice, then times a forward pass of
+each model with the old 512 max_length padding, every length bucket that fits
+the document, and no padding at all ("longest"). Word-level labels of every
+variant are compared against the 512-padded path.
+
+Usage:
+    python benchmarks/bench_padding.py [--repeat N]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import torch
+from PIL import Image
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND_DIR))
+
+from Janodi.model import invoice_model, receipts_model
+from Janodi.model.layoutlm_encoding import LAYOUTLM_LENGTH_BUCKETS, encode_document, pad_encoding
+from Janodi.model.reading_order import reading_order_indices
+from Janodi.services.ocr_service import normalize_boxes, run_ocr
+
+SAMPLES = [
+    ("receipt", BACKEND_DIR / "test_data" / "receipt_sample.jpg", 0.35),
+    ("invoice", BACKEND_DIR / "test_data" / "invoice_sample.jpg", 0.3),
+]
+
+
+def load(name):
+    if name == "receipt":
+        processor, model, _ = receipts_model._init_model()
+    else:
+        processor, model = invoice_model._init_invoice_model()
+    return processor, model
+
+
+def words_and_boxes(ocr, conf_thresh):
+    words, pixel_boxes = ocr.select(conf_thresh)
+    order = reading_order_indices(pixel_boxes, ocr.image_size[1])
+    return [words[i] for i in order], normalize_boxes(pixel_boxes[order], ocr.image_size).tolist()
+
+
+def word_labels(model, encoding):
+    with torch.no_grad():
+        pred_ids = model(**encoding).logits.argmax(-1).squeeze(0).tolist()
+    labels, used = [], set()
+    for tok_idx, widx in enumerate(encoding.word_ids(batch_index=0)):
+        if widx is None or widx in used:
+            continue
+        used.add(widx)
+        labels.append(model.config.id2label.get(pred_ids[tok_idx], "O"))
+    return labels
+
+
+def time_forward(model, encoding, repeat):
+    timings = []
+    with torch.no_grad():
+        model(**encoding)  # warm-up
+        for _ in range(repeat):
+            start = time.perf_counter()
+            model(**encoding)
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="timed forward passes per variant")
+    args = parser.parse_args()
+
+    all_match = True
+    for name, path, conf_thresh in SAMPLES:
+        processor, model = load(name)
+        ocr = run_ocr(str(path))
+        words, boxes = words_and_boxes(ocr, conf_thresh)
+        img = Image.open(path).convert("RGB")
+        pad_id = processor.tokenizer.pad_token_id
+
+        reference = encode_document(processor, img, words, boxes, padding="max_length")
+        ref_labels = word_labels(model, reference)
+        length = int(encode_document(processor, img, words, boxes, padding="longest")["input_ids"].shape[1])
+
+        variants = [("max_length", 512)]
+        variants += [(f"bucket_{b}", b) for b in LAYOUTLM_LENGTH_BUCKETS if b >= length]
+        variants.append(("longest", length))
+
+        print(f"\n{name}: {len(words)} words, {length} tokens ({path.name})")
+        print(f"{'variant':<14}{'seq_len':>8}{'median_ms':>12}{'labels':>10}")
+        for label, target in variants:
+            encoding = encode_document(processor, img, words, boxes, padding="longest")
+            pad_encoding(encoding, target, pad_id)
+            ms = time_forward(model, encoding, args.repeat)
+            same = word_labels(model, encoding) == ref_labels
+            all_match &= same
+            print(f"{label:<14}{target:>8}{ms:>12.1f}{'same' if same else 'DIFF':>10}")
+
+    print("\nAll variants match the 512-padded labels" if all_match else "\nLabel mismatch detected")
+    return 0 if all_match else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
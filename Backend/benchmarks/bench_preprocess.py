@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+"""
+Pre-OCR Normalization Benchmark
+
+Measures what capping the image size before OCR saves on phone-sized photos.
+The sample images in test_data are small scans, so each one is upscaled to
+12 MP and 48 MP phone-photo sizes and re-encoded as JPEG. For every size it
+times:
+
+  * decode: full-resolution ``cv2.imdecode`` vs ``decode_image`` (reduced
+    JPEG decode + cap to OCR_MAX_SIDE)
+  * detect: the EasyOCR CRAFT text detector on the image it would receive
+    (EasyOCR itself shrinks its input to a 2560 px canvas, so this is where
+    a cap below 2560 still pays off)
+  * ocr: the full ``reader.readtext`` call and word-level agreement between
+    the full-size and the capped run (only when the EasyOCR weights are
+    available; skipped with --random-weights)
+
+Usage:
+    python benchmarks/bench_preprocess.py [--images test_data/receipt_sample.jpg ...]
+        [--megapixels 12,48] [--max-side 2048] [--repeat 3] [--random-weights]
+
+--random-weights builds the CRAFT network without downloading weights; its
+timings are representative because cost depends only on input size.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND_DIR))
+
+from Janodi.services.image_io import decode_image
+
+DEFAULT_IMAGES = [BACKEND_DIR / "test_data" / "receipt_sample.jpg", BACKEND_DIR / "test_data" / "invoice_sample.jpg"]
+EASYOCR_CANVAS = 2560
+
+
+def phone_photo(path: Path, megapixels: float) -> bytes:
+    """JPEG bytes of ``path`` upscaled to roughly ``megapixels`` (aspect ratio kept)."""
+    img = cv2.imread(str(path))
+    h, w = img.shape[:2]
+    scale = (megapixels * 1e6 / (w * h)) ** 0.5
+    big = cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_CUBIC)
+    return cv2.imencode(".jpg", big, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def timed(fn, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def craft_detector(random_weights: bool):
+    """(callable running CRAFT on a BGR image, label), or (None, reason) if unavailable."""
+    import torch
+    from easyocr import imgproc
+    if random_weights:
+        from easyocr.craft import CRAFT
+        net = CRAFT(pretrained=False).eval()
+        label = "CRAFT (random weights)"
+    else:
+        from Janodi.services.ocr_service import get_reader
+        try:
+            net = get_reader().detector
+        except Exception as e:
+            return None, f"EasyOCR weights unavailable ({type(e).__name__}); rerun with --random-weights"
+        net = net.module if hasattr(net, "module") else net
+        label = "CRAFT (EasyOCR weights)"
+
+    def detect(bgr):
+        rgb = bgr[..., ::-1]
+        resized, _, _ = imgproc.resize_aspect_ratio(rgb, EASYOCR_CANVAS, interpolation=cv2.INTER_LINEAR, mag_ratio=1.0)
+        x = torch.from_numpy(imgproc.normalizeMeanVariance(resized)).permute(2, 0, 1).unsqueeze(0)
+        with torch.no_grad():
+            net(x)
+        return resized.shape[:2]
+
+    return detect, label
+
+
+def word_agreement(a, b) -> float:
+    """Share of words found in both runs (multiset overlap over the larger run)."""
+    from collections import Counter
+    ca, cb = Counter(w.lower() for w in a), Counter(w.lower() for w in b)
+    total = max(sum(ca.values()), sum(cb.values()))
+    return sum((ca & cb).values()) / total if total else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", nargs="*", type=Path, default=DEFAULT_IMAGES)
+    parser.add_argument("--megapixels", default="12,48")
+    parser.add_argument("--max-side", type=int, default=2048)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--random-weights", action="store_true", help="time CRAFT without downloading EasyOCR weights")
+    args = parser.parse_args()
+
+    detect, label = craft_detector(args.random_weights)
+    if detect is None:
+        print(label)
+    reader = None
+    if not args.random_weights and detect is not None:
+        from Janodi.services.ocr_service import get_reader
+        reader = get_reader()
+
+    print(f"OCR_MAX_SIDE={args.max_side}, median of {args.repeat} runs\n")
+    header = f"{'image':<22} {'MP':>4} {'decode full':>12} {'decode capped':>14}"
+    if detect is not None:
+        header += f" {'detect full':>12} {'detect capped':>14}"
+    if reader is not None:
+        header += f" {'ocr full':>10} {'ocr capped':>11} {'agree':>6}"
+    print(header)
+
+    # Pay the one-off PIL/cv2 import costs before timing
+    decode_image(phone_photo(args.images[0], 1), max_side=args.max_side)
+
+    saved = []
+    for path in args.images:
+        for mp in (float(m) for m in args.megapixels.split(",")):
+            data = phone_photo(path, mp)
+            full_ms, full = timed(lambda: cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR), args.repeat)
+            capped_ms, capped = timed(lambda: decode_image(data, max_side=args.max_side), args.repeat)
+            row = f"{path.name:<22} {mp:>4.0f} {full_ms:>10.0f}ms {capped_ms:>12.0f}ms"
+            stage_full = stage_capped = 0.0
+            if detect is not None:
+                det_full_ms, _ = timed(lambda: detect(full), args.repeat)
+                det_capped_ms, _ = timed(lambda: detect(capped), args.repeat)
+                row += f" {det_full_ms:>10.0f}ms {det_capped_ms:>12.0f}ms"
+                stage_full, stage_capped = det_full_ms, det_capped_ms
+            if reader is not None:
+                # readtext includes detection, so it replaces the detect timing in the total
+                stage_full, words_full = timed(lambda: [t for _, t, _ in reader.readtext(full)], 1)
+                stage_capped, words_capped = timed(lambda: [t for _, t, _ in reader.readtext(capped)], 1)
+                row += f" {stage_full:>8.0f}ms {stage_capped:>9.0f}ms {word_agreement(words_full, words_capped):>6.2f}"
+            print(row + f"   ({full.shape[1]}x{full.shape[0]} -> {capped.shape[1]}x{capped.shape[0]})")
+            saved.append((full_ms + stage_full, capped_ms + stage_capped))
+
+    full_sum = sum(f for f, _ in saved)
+    capped_sum = sum(c for _, c in saved)
+    stages = "decode + detect" if reader is None and detect is not None else ("decode + readtext" if reader else "decode")
+    print(f"\nTotal {stages}: {full_sum:.0f} ms -> {capped_sum:.0f} ms "
+          f"({100 * (1 - capped_sum / full_sum):.0f}% saved)" + (f" [{label}]" if detect is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
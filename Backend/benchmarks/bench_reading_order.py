@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Reading-Order Micro-Benchmark
+
+Times the sort-and-sweep ``reading_order`` against the per-word line scan it
+replaced, on synthetic pages of 100, 1k and 10k word boxes (shuffled detection
+order, slight vertical jitter within each line), and checks both give the same
+order. A skewed page shows where the two differ.
+
+Usage:
+    python benchmarks/bench_reading_order.py [--sizes 100,1000,10000] [--repeat 5]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND_DIR))
+
+from Janodi.model.reading_order import reading_order
+
+
+def legacy_reading_order(entries, H, y_tol=0.015):
+    """The implementation previously duplicated in receipts_model and invoice_model."""
+    lines = {}
+    for t, (x1, y1, x2, y2) in entries:
+        yc = (y1 + y2) / 2
+        placed = False
+        for k in list(lines.keys()):
+            if abs(k - yc) <= y_tol * H:
+                lines[k].append((t, [x1, y1, x2, y2]))
+                placed = True
+                break
+        if not placed:
+            lines[yc] = [(t, [x1, y1, x2, y2])]
+    ordered = []
+    for k in sorted(lines.keys()):
+        line = sorted(lines[k], key=lambda e: e[1][0])
+        ordered.extend(line)
+    return ordered
+
+
+def synthetic_page(n, seed=0, skew=0.0):
+    """``n`` word boxes on up to 30 lines; ``skew`` is the vertical drift per pixel of x."""
+    rng = random.Random(seed)
+    num_lines = max(1, min(30, n // 10))
+    per_line = -(-n // num_lines)
+    spacing, box_h, box_w = 60, 20, 40
+    H = num_lines * spacing + spacing
+    tol = 0.015 * H
+    entries = []
+    for line in range(num_lines):
+        for col in range(per_line):
+            if len(entries) == n:
+                break
+            x1 = 10 + col * (box_w + 5)
+            y1 = spacing + line * spacing + rng.uniform(-tol / 3, tol / 3) + skew * x1
+            entries.append((f"w{line}_{col}", [x1, y1, x1 + box_w, y1 + box_h]))
+    rng.shuffle(entries)
+    return entries, H
+
+
+def intact_lines(ordered):
+    """Number of synthetic lines whose words come out contiguous and left to right."""
+    rows = [(t.split("_")[0], b[0]) for t, b in ordered]
+    intact = 0
+    for row in {r for r, _ in rows}:
+        positions = [i for i, (r, _) in enumerate(rows) if r == row]
+        xs = [rows[i][1] for i in positions]
+        if positions == list(range(positions[0], positions[0] + len(positions))) and xs == sorted(xs):
+            intact += 1
+    return intact
+
+
+def best_ms(fn, entries, H, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(entries, H)
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'boxes':>7} {'legacy ms':>10} {'sweep ms':>9} {'speed-up':>9}  same order")
+    for n in [int(s) for s in args.sizes.split(",")]:
+        entries, H = synthetic_page(n)
+        legacy_min, _ = best_ms(legacy_reading_order, entries, H, args.repeat)
+        sweep_min, _ = best_ms(reading_order, entries, H, args.repeat)
+        same = legacy_reading_order(entries, H) == reading_order(entries, H)
+        print(f"{n:7d} {legacy_min:10.2f} {sweep_min:9.2f} {legacy_min / sweep_min:8.1f}x  {same}")
+
+    # Lines drifting downwards by 5% of x: more than the tolerance across a line
+    entries, H = synthetic_page(200, skew=0.05)
+    print(f"\nskewed page (200 boxes, 20 lines) read as whole lines left to right: "
+          f"legacy {intact_lines(legacy_reading_order(entries, H))}/20, "
+          f"sweep {intact_lines(reading_order(entries, H))}/20")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Per-Worker Memory Benchmark
+
+Starts N worker processes the two ways a multi-worker deployment can:
+
+  independent  each worker loads its own models (uvicorn --workers N, or gunicorn
+               without preloading)
+  preload      the parent loads the models once and forks the workers
+               (gunicorn -c gunicorn.conf.py, see Janodi/services/preload.py)
+
+Every worker then runs one LayoutLMv3 forward pass per model, like warm-up
+does, and reports RSS, PSS and USS. USS (private memory) is what each extra
+worker really costs; RSS counts shared pages in every process.
+
+--random-weights builds base-size LayoutLMv3 models locally instead of
+downloading the fine-tuned ones; the memory picture is the same.
+
+Usage:
+    python benchmarks/bench_worker_memory.py [--workers 4] [--models receipt,invoice] [--random-weights]
+"""
+
+import argparse
+import multiprocessing
+import statistics
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND_DIR))
+
+from Janodi.services.memory import smaps_rollup
+
+
+def load_models(names, random_weights):
+    """Return the LayoutLMv3 models to share (EasyOCR is loaded but has no forward here)."""
+    if random_weights:
+        from transformers import LayoutLMv3Config, LayoutLMv3ForTokenClassification
+        return [LayoutLMv3ForTokenClassification(LayoutLMv3Config(num_labels=13)).eval()
+                for name in names if name != "easyocr"]
+    from Janodi.model.registry import model_registry
+    from Janodi.services.preload import preload_models
+    preload_models(names)
+    return [model_registry.get(name)[1] for name in names if name != "easyocr"]
+
+
+def forward(models):
+    import torch
+    torch.set_num_threads(1)
+    inputs = {
+        "input_ids": torch.ones(1, 128, dtype=torch.long),
+        "bbox": torch.zeros(1, 128, 4, dtype=torch.long),
+        "attention_mask": torch.ones(1, 128, dtype=torch.long),
+        "pixel_values": torch.zeros(1, 3, 224, 224),
+    }
+    with torch.no_grad():
+        for model in models:
+            model(**inputs)
+
+
+def _forked_worker(models, ready, done, conn):
+    forward(models)
+    conn.send(smaps_rollup())
+    ready.set()
+    done.wait()
+
+
+def _independent_worker(names, random_weights, ready, done, conn):
+    # Keep a reference: the models must stay resident while memory is measured
+    models = load_models(names, random_weights)
+    forward(models)
+    conn.send(smaps_rollup())
+    ready.set()
+    done.wait()
+
+
+def run(mode, workers, names, random_weights):
+    ctx = multiprocessing.get_context("fork" if mode == "preload" else "spawn")
+    models = load_models(names, random_weights) if mode == "preload" else None
+    if mode == "preload":
+        import gc
+        gc.collect()
+        gc.freeze()
+    parent = smaps_rollup()
+    done = ctx.Event()
+    procs, conns, readies = [], [], []
+    for _ in range(workers):
+        recv, send = ctx.Pipe(duplex=False)
+        ready = ctx.Event()
+        args = (models, ready, done, send) if mode == "preload" else (names, random_weights, ready, done, send)
+        p = ctx.Process(target=_forked_worker if mode == "preload" else _independent_worker, args=args)
+        p.start()
+        procs.append(p)
+        conns.append(recv)
+        readies.append(ready)
+    # All workers stay alive until every one has measured, so shared pages count as shared
+    for ready in readies:
+        ready.wait()
+    reports = [c.recv() for c in conns]
+    done.set()
+    for p in procs:
+        p.join()
+    return parent, reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--models", default="receipt,invoice", help="comma-separated: easyocr,receipt,invoice")
+    parser.add_argument("--random-weights", action="store_true", help="base-size LayoutLMv3 without downloading")
+    parser.add_argument("--mode", choices=["both", "independent", "preload"], default="both")
+    args = parser.parse_args()
+    if not smaps_rollup():
+        print("Needs Linux /proc/<pid>/smaps_rollup")
+        return 2
+    names = [n.strip() for n in args.models.split(",") if n.strip()]
+
+    modes = ["independent", "preload"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        parent, reports = run(mode, args.workers, names, args.random_weights)
+        uss = [r["uss_mb"] for r in reports]
+        total_pss = sum(r["pss_mb"] for r in reports) + (parent["pss_mb"] if mode == "preload" else 0)
+        print(f"\n{mode}: {args.workers} workers, models={','.join(names)}")
+        if mode == "preload":
+            print(f"  parent RSS {parent['rss_mb']:.0f} MiB (weights loaded once)")
+        print(f"  per-worker RSS  mean {statistics.mean(r['rss_mb'] for r in reports):.0f} MiB")
+        print(f"  per-worker USS  mean {statistics.mean(uss):.0f} MiB, max {max(uss):.0f} MiB  <- incremental cost")
+        print(f"  total PSS       {total_pss:.0f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Quantization Accuracy Gate
+
+Runs the receipt and invoice extractors over a labeled local image set, once
+with the fp32 model and once with its dynamic INT8 version, and reports
+field-level agreement between the two (plus accuracy against the labels when
+present). The result is written to the gate file; LAYOUTLM_QUANTIZE=1 only
+takes effect for a model id and revision that passed.
+
+The INT8 variant matches LAYOUTLM_BACKEND: torch dynamic quantization of the
+Linear layers, or ONNX Runtime dynamic quantization of the exported graph.
+
+Image set layout:
+    <images>/receipt/*.jpg|*.png   receipts, each with an optional <name>.json of expected fields
+    <images>/invoice/*.jpg|*.png   invoices, same
+
+Usage:
+    python benchmarks/eval_quantization.py --images eval_images [--threshold 0.98]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND_DIR))
+
+from Janodi.model import invoice_model, onnx_backend, quantization, receipts_model
+from Janodi.model.registry import model_registry
+from Janodi.services.ocr_service import run_ocr
+
+MODELS = [
+    ("receipt", receipts_model._MODEL_NAME, receipts_model.extract_receipt_structured_data),
+    ("invoice", invoice_model._MODEL_ID, invoice_model.extract_invoice_structured_data),
+]
+
+
+def run_extractor(extract, samples):
+    outputs = []
+    start = time.perf_counter()
+    for path, ocr, _ in samples:
+        outputs.append(extract(str(path), ocr=ocr))
+    return outputs, (time.perf_counter() - start) * 1000 / max(1, len(samples))
+
+
+def label_accuracy(samples, outputs):
+    labeled = [(labels, out) for (_, _, labels), out in zip(samples, outputs) if labels]
+    if not labeled:
+        return None
+    return quantization.field_agreement([l for l, _ in labeled], [o for _, o in labeled])
+
+
+def use_int8(kind, model_id, loaded):
+    """Point the extractor at the INT8 variant of the fp32 model in ``loaded`` for the configured backend."""
+    fp32 = loaded[1]
+    if onnx_backend.LAYOUTLM_BACKEND == "onnx":
+        runner = onnx_backend.inference_model(model_id, fp32)
+        int8_path = runner.path.with_name("model.int8.onnx")
+        if not int8_path.exists():
+            quantization.quantize_onnx_int8(runner.path, int8_path)
+        key = (model_id, onnx_backend.model_revision(fp32))
+        onnx_backend._runners[key] = onnx_backend.OnnxTokenClassifier(int8_path, fp32.config)
+    else:
+        int8 = quantization.quantize_dynamic_int8(fp32, inplace=False)
+        model_registry.put(kind, (loaded[0], int8) + tuple(loaded[2:]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="labeled image set (see layout above)")
+    parser.add_argument("--threshold", type=float, default=quantization.QUANTIZATION_MIN_AGREEMENT,
+                        help="minimum INT8/fp32 field agreement to approve a model")
+    args = parser.parse_args()
+
+    # Evaluate from fp32 weights regardless of the current environment
+    quantization.LAYOUTLM_QUANTIZE = False
+    root = Path(args.images)
+    exit_code = 0
+
+    for kind, model_id, extract in MODELS:
+        images = sorted(p for p in (root / kind).glob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        if not images:
+            print(f"{kind}: no images under {root / kind}, skipped")
+            continue
+
+        samples = []
+        for path in images:
+            label_path = path.with_suffix(".json")
+            labels = json.loads(label_path.read_text()) if label_path.exists() else None
+            samples.append((path, run_ocr(str(path)), labels))
+
+        loaded = model_registry.get(kind)
+        revision = onnx_backend.model_revision(loaded[1])
+        fp32_out, fp32_ms = run_extractor(extract, samples)
+
+        use_int8(kind, model_id, loaded)
+        try:
+            int8_out, int8_ms = run_extractor(extract, samples)
+        finally:
+            model_registry.put(kind, loaded)
+            onnx_backend._runners.clear()
+
+        agreement = quantization.field_agreement(fp32_out, int8_out)
+        entry = quantization.record_gate(model_id, revision, onnx_backend.LAYOUTLM_BACKEND, agreement,
+                                         len(samples), args.threshold)
+
+        print(f"\n{kind}: {model_id}@{revision} ({len(samples)} images, backend={onnx_backend.LAYOUTLM_BACKEND})")
+        print(f"  latency per image: fp32 {fp32_ms:.0f} ms, int8 {int8_ms:.0f} ms")
+        print(f"  int8/fp32 field agreement: {agreement:.2%} (threshold {args.threshold:.2%})")
+        fp32_acc, int8_acc = label_accuracy(samples, fp32_out), label_accuracy(samples, int8_out)
+        if fp32_acc is not None:
+            print(f"  label accuracy: fp32 {fp32_acc:.2%}, int8 {int8_acc:.2%}")
+        print(f"  quantization {'APPROVED' if entry['approved'] else 'REFUSED'}")
+        if not entry["approved"]:
+            exit_code = 1
+
+    print(f"\nGate written to {quantization.QUANTIZATION_GATE_FILE}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
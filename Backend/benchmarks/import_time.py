@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Import-Time Report
+
+Imports a module in a fresh interpreter with ``-X importtime`` and reports the
+total import time, the slowest top-level imports, and whether any heavy
+dependency (torch, transformers, easyocr, cv2, pandas, joblib,
+google.generativeai, matplotlib) was pulled in. Those must only load when an
+extraction, chatbot or cluster request actually needs them.
+
+Exits 1 when a heavy module was imported or the total exceeds --max-ms, so it
+can run as a startup regression check.
+
+Usage:
+    python benchmarks/import_time.py [--module app] [--role api] [--top 15] [--max-ms 3000]
+
+``import app`` with the "all" or "api" role needs serviceAccountKey.json; use
+``--role worker`` or ``--module Janodi.routes.upload`` without Firebase credentials.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = [
+    "torch",
+    "transformers",
+    "easyocr",
+    "cv2",
+    "pandas",
+    "joblib",
+    "google.generativeai",
+    "matplotlib",
+]
+
+
+def profile_import(module: str, role: str = None) -> dict:
+    """Import ``module`` in a subprocess; return per-module timings and the heavy modules it loaded."""
+    probe = (
+        "import importlib, json, sys\n"
+        f"importlib.import_module({module!r})\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    env = dict(os.environ)
+    if role:
+        env["APP_ROLE"] = role
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.splitlines()[-15:])
+        raise RuntimeError(f"importing {module} failed:\n{tail}")
+
+    # Lines look like "import time:      self [us] |  cumulative | imported package"
+    timings = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        timings.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "top_level": depth == 0,
+        })
+    heavy = json.loads(proc.stdout.strip().splitlines()[-1])
+    target = next((t for t in reversed(timings) if t["module"] == module), None)
+    total_ms = target["cumulative_ms"] if target else sum(t["self_ms"] for t in timings)
+    return {"module": module, "total_ms": total_ms, "timings": timings, "heavy": heavy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app", help="module to import (default: app)")
+    parser.add_argument("--role", default=None, help="APP_ROLE for the import (all, api, worker)")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if the import takes longer")
+    args = parser.parse_args()
+
+    try:
+        report = profile_import(args.module, args.role)
+    except RuntimeError as e:
+        print(e)
+        return 2
+
+    print(f"import {report['module']} (APP_ROLE={args.role or os.getenv('APP_ROLE', 'all')}): "
+          f"{report['total_ms']:.0f} ms")
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  module")
+    slowest = sorted(report["timings"], key=lambda t: t["cumulative_ms"], reverse=True)
+    for t in [t for t in slowest if t["top_level"]][:args.top]:
+        print(f"{t['cumulative_ms']:14.1f} {t['self_ms']:9.1f}  {t['module']}")
+
+    exit_code = 0
+    if report["heavy"]:
+        print(f"\nFAIL: heavy modules imported eagerly: {', '.join(report['heavy'])}")
+        exit_code = 1
+    else:
+        print("\nNo heavy modules imported")
+    if args.max_ms is not None and report["total_ms"] > args.max_ms:
+        print(f"FAIL: import took {report['total_ms']:.0f} ms (budget {args.max_ms:.0f} ms)")
+        exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
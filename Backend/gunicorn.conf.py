@@ -0,0 +1,31 @@
+"""
+Multi-worker serving with shared model weights:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The master loads the EasyOCR reader and both LayoutLMv3 models once (PRELOAD_MODELS)
+and then forks WEB_CONCURRENCY Uvicorn workers. The weights are never written after
+loading, so every worker shares the same physical pages instead of holding its own
+copy. `uvicorn --workers N` cannot do this: it starts each worker from scratch.
+
+Keep EXTRACTION_EXECUTOR=thread (the default) in this mode; process executors spawn
+fresh interpreters that load their own weights.
+"""
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8080")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# Requests run OCR and LayoutLMv3 inference; give them time on slow CPUs
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def on_starting(server):
+    from Janodi.services.preload import preload_models
+    preload_models()
+
+
+def post_fork(server, worker):
+    from Janodi.services.preload import configure_forked_worker
+    configure_forked_worker(server.cfg.workers)
@@ -9,6 +9,11 @@ from dotenv import load_dotenv
 # Add backend root to sys.path so imports work
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+# Route tests use fake extractors; don't load the real models in the background
+os.environ.setdefault("MODEL_WARMUP", "0")
+# Fake extractors return per-call results; tests that exercise the result cache enable it themselves
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+
 # Import your existing FastAPI app
 from app import app
 
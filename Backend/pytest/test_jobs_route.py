@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+from app import app
+from Janodi.services import job_store, job_worker
+
+
+def fake_process_document(contents, filename):
+    if bytes(contents) == b"corrupt":
+        raise ValueError("Uploaded image could not be decoded by OpenCV")
+    return {"DocumentType": "receipt", "ExpenseType": "Food", "Title": filename}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """TestClient with the job queue in a temporary SQLite file and a fake extractor"""
+    monkeypatch.setattr(job_store, "EXTRACTION_JOB_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(job_worker, "process_document", fake_process_document)
+    with TestClient(app) as c:
+        yield c
+
+
+def test_submit_job_returns_id_immediately(client):
+    """POST /api/jobs answers 202 with a job id before extraction runs"""
+    files = [("files", ("a.jpg", b"img-a", "image/jpeg"))]
+    r = client.post("/api/jobs", files=files)
+    assert r.status_code == 202
+    data = r.json()
+    assert data["job_id"]
+    assert data["files"] == 1
+
+
+def test_long_poll_returns_per_file_results(client):
+    """GET /api/jobs/{id}?wait= blocks until every file has a result or an error"""
+    files = [
+        ("files", ("a.jpg", b"img-a", "image/jpeg")),
+        ("files", ("bad.jpg", b"corrupt", "image/jpeg")),
+    ]
+    job_id = client.post("/api/jobs", files=files).json()["job_id"]
+
+    r = client.get(f"/api/jobs/{job_id}", params={"wait": 10})
+    assert r.status_code == 200
+    job = r.json()
+    assert job["status"] == "done"
+    assert job["files"][0]["status"] == "done"
+    assert job["files"][0]["result"]["Title"] == "a.jpg"
+    assert job["files"][1]["status"] == "error"
+    assert "decoded" in job["files"][1]["error"]
+    print("✅ Job results:", job["files"])
+
+
+def test_unknown_job_is_404(client):
+    """Polling a job id that was never submitted returns 404"""
+    r = client.get("/api/jobs/does-not-exist")
+    assert r.status_code == 404
+
+
+def test_unsupported_file_type_rejected(client):
+    """Non-image files are rejected before anything is queued"""
+    files = [("files", ("notes.txt", b"hello", "text/plain"))]
+    r = client.post("/api/jobs", files=files)
+    assert r.status_code == 400
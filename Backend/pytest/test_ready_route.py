@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from app import app
+from Janodi.services import warmup
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """Replace the real loaders with instant fakes; 'invoice' blocks until released"""
+    release = threading.Event()
+    warmed = []
+
+    def blocking_load():
+        release.wait(10)
+        return "invoice"
+
+    def broken_load():
+        raise RuntimeError("weights not found")
+
+    monkeypatch.setattr(warmup, "MODEL_WARMUP", True)
+    monkeypatch.setattr(warmup, "_task", None)
+    monkeypatch.setattr(warmup, "_status", {})
+    monkeypatch.setattr(warmup, "_MODELS", {
+        "easyocr": (lambda: "easyocr", warmed.append),
+        "invoice": (blocking_load, warmed.append),
+        "broken": (broken_load, warmed.append),
+    })
+    return release, warmed
+
+
+def wait_for_state(client, name, state, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        models = client.get("/ready").json()["models"]
+        if models.get(name, {}).get("state") == state:
+            return models
+        time.sleep(0.05)
+    raise AssertionError(f"{name} never reached {state}: {models}")
+
+
+def test_ready_is_503_until_all_models_are_warm(fake_models, monkeypatch):
+    """/ready reports 503 with per-model state while warm-up runs, then 200"""
+    release, warmed = fake_models
+    monkeypatch.setattr(warmup, "WARMUP_MODELS", ["easyocr", "invoice"])
+    with TestClient(app) as client:
+        models = wait_for_state(client, "easyocr", "ready")
+        r = client.get("/ready")
+        assert r.status_code == 503
+        assert models["invoice"]["state"] == "loading"
+        assert models["easyocr"]["load_ms"] is not None
+
+        release.set()
+        wait_for_state(client, "invoice", "ready")
+        r = client.get("/ready")
+        assert r.status_code == 200
+        assert r.json()["ready"] is True
+        assert warmed == ["easyocr", "invoice"]
+        print("✅ Readiness:", r.json())
+
+
+def test_failed_model_keeps_instance_unready(fake_models, monkeypatch):
+    """A model that fails to load is reported with its error and /ready stays 503"""
+    monkeypatch.setattr(warmup, "WARMUP_MODELS", ["easyocr", "broken"])
+    with TestClient(app) as client:
+        models = wait_for_state(client, "broken", "failed")
+        assert "weights not found" in models["broken"]["error"]
+        assert client.get("/ready").status_code == 503
+
+
+def test_ready_without_warmup(monkeypatch):
+    """With MODEL_WARMUP=0 models load lazily and the instance is ready immediately"""
+    monkeypatch.setattr(warmup, "MODEL_WARMUP", False)
+    monkeypatch.setattr(warmup, "_status", {})
+    with TestClient(app) as client:
+        r = client.get("/ready")
+        assert r.status_code == 200
+        assert r.json()["warmup"] is False
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from app import app
+from Janodi.routes import upload
+from Janodi.services.admission import AdmissionController
+
+
+def slow_process_document(contents, filename, progress=None):
+    time.sleep(0.5)
+    return {"DocumentType": "receipt", "ExpenseType": "other", "Title": filename}
+
+
+@pytest.mark.asyncio
+async def test_saturated_pipeline_answers_429_with_retry_after(monkeypatch):
+    """With one slot and no queue, a second concurrent upload is refused at once instead of piling up"""
+    monkeypatch.setattr(upload, "process_document", slow_process_document)
+    monkeypatch.setattr(upload, "admission",
+                        AdmissionController(max_inflight=1, queue_depth=0, max_wait_s=5, memory_limit_mb=0))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        first = asyncio.create_task(ac.post("/api/upload", files={"files": ("a.jpg", b"img-a", "image/jpeg")}))
+        await asyncio.sleep(0.1)
+        start = time.perf_counter()
+        rejected = await ac.post("/api/upload", files={"files": ("b.jpg", b"img-b", "image/jpeg")})
+        rejected_s = time.perf_counter() - start
+        accepted = await first
+
+    assert accepted.status_code == 200
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert rejected_s < 0.3
+
+
+def test_metrics_report_admission_queue():
+    from fastapi.testclient import TestClient
+    stats = TestClient(app).get("/api/metrics").json()["admission"]
+    for key in ("inflight", "queue_depth", "wait_ms_p95", "rejected_queue_full", "retry_after_s"):
+        assert key in stats
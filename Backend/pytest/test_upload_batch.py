@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from app import app
+from Janodi.routes import upload
+
+
+@pytest.fixture
+def client():
+    """Create a TestClient for FastAPI app"""
+    return TestClient(app)
+
+
+def fake_process_document(contents, filename):
+    if bytes(contents) == b"corrupt":
+        raise ValueError("Uploaded image could not be decoded by OpenCV")
+    # Finish the first file last so ordering can't come from completion order
+    time.sleep(0.3 if filename == "first.jpg" else 0.05)
+    return {"DocumentType": "receipt", "ExpenseType": "other", "Title": filename}
+
+
+def test_batch_keeps_input_order_and_reports_bad_file(client, monkeypatch):
+    """One corrupt file gets an error entry; the other results are kept in input order"""
+    monkeypatch.setattr(upload, "process_document", fake_process_document)
+    files = [
+        ("files", ("first.jpg", b"img-1", "image/jpeg")),
+        ("files", ("broken.jpg", b"corrupt", "image/jpeg")),
+        ("files", ("third.jpg", b"img-3", "image/jpeg")),
+    ]
+    r = client.post("/api/upload", files=files)
+    assert r.status_code == 200
+    data = r.json()
+    assert [d.get("Title") for d in data] == ["first.jpg", None, "third.jpg"]
+    assert data[1]["filename"] == "broken.jpg"
+    assert data[1]["status_code"] == 500
+    print("✅ Batch upload returned per-file results:", data)
+
+
+def test_batch_files_run_concurrently(client, monkeypatch):
+    """Files of one upload overlap instead of running one after another"""
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def tracking_process_document(contents, filename):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.2)
+        with lock:
+            active -= 1
+        return {"DocumentType": "receipt", "ExpenseType": "other"}
+
+    monkeypatch.setattr(upload, "process_document", tracking_process_document)
+    files = [("files", (f"r{i}.jpg", b"img", "image/jpeg")) for i in range(4)]
+    r = client.post("/api/upload", files=files)
+    assert r.status_code == 200
+    assert peak > 1
+
+
+def test_single_failed_file_still_returns_http_error(client, monkeypatch):
+    """When every file fails the route keeps returning a plain HTTP error"""
+    monkeypatch.setattr(upload, "process_document", fake_process_document)
+    files = {"files": ("notes.txt", b"hello", "text/plain")}
+    r = client.post("/api/upload", files=files)
+    assert r.status_code == 400
@@ -0,0 +1,57 @@
+import pytest
+from fastapi.testclient import TestClient
+from app import app
+from Janodi.routes import upload
+from Janodi.services.result_cache import result_cache
+
+
+@pytest.fixture
+def client():
+    """Create a TestClient for FastAPI app"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(result_cache, "max_entries", 16)
+    result_cache.clear()
+    yield result_cache
+    result_cache.clear()
+
+
+def test_reupload_is_served_from_cache(client, cache, monkeypatch):
+    """Uploading the same bytes twice runs extraction once and reports a cache hit"""
+    calls = []
+
+    def counting_process_document(contents, filename):
+        calls.append(filename)
+        return {"DocumentType": "receipt", "ExpenseType": "other", "Title": "Shop"}
+
+    monkeypatch.setattr(upload, "process_document", counting_process_document)
+    before = client.get("/api/metrics").json()["result_cache"]
+
+    files = {"files": ("receipt.jpg", b"same-photo", "image/jpeg")}
+    first = client.post("/api/upload", files=files)
+    second = client.post("/api/upload", files={"files": ("retry.jpg", b"same-photo", "image/jpeg")})
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert calls == ["receipt.jpg"]
+    after = client.get("/api/metrics").json()["result_cache"]
+    assert after["memory_hits"] == before["memory_hits"] + 1
+    assert after["misses"] == before["misses"] + 1
+
+
+def test_failed_upload_is_retried(client, cache, monkeypatch):
+    """Errors are not cached, so a retry of the same bytes runs extraction again"""
+    calls = []
+
+    def failing_process_document(contents, filename):
+        calls.append(filename)
+        raise ValueError("Uploaded image could not be decoded by OpenCV")
+
+    monkeypatch.setattr(upload, "process_document", failing_process_document)
+    files = {"files": ("receipt.jpg", b"broken", "image/jpeg")}
+    assert client.post("/api/upload", files=files).status_code == 500
+    assert client.post("/api/upload", files=files).status_code == 500
+    assert len(calls) == 2
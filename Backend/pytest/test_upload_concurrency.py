@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from app import app
+from Janodi.routes import upload
+
+
+def slow_process_document(contents: bytes, filename: str) -> dict:
+    """Stand-in for OCR + LayoutLM: blocks the calling thread like the real pipeline"""
+    time.sleep(1.5)
+    return {"DocumentType": "receipt", "ExpenseType": "other"}
+
+
+@pytest.mark.asyncio
+async def test_slow_upload_does_not_block_other_routes(monkeypatch):
+    """A slow upload runs on the extraction pool, so cheap routes still answer immediately"""
+    monkeypatch.setattr(upload, "process_document", slow_process_document)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        files = {"files": ("receipt.jpg", b"fake-bytes", "image/jpeg")}
+        upload_task = asyncio.create_task(ac.post("/api/upload", files=files))
+        # Give the upload a head start so its blocking work is already running
+        await asyncio.sleep(0.2)
+
+        start = time.perf_counter()
+        r = await ac.get("/")
+        cheap_elapsed = time.perf_counter() - start
+
+        upload_response = await upload_task
+
+    assert r.status_code == 200
+    assert cheap_elapsed < 0.5, f"Root request waited {cheap_elapsed:.2f}s behind the upload"
+    assert upload_response.status_code == 200
+    assert upload_response.json()[0]["DocumentType"] == "receipt"
+    print(f"\n✅ Root answered in {cheap_elapsed * 1000:.0f} ms while upload was running")
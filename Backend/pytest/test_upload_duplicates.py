@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app import app
+from Janodi.routes import upload
+from Janodi.services.near_duplicate import NearDuplicateIndex
+
+
+@pytest.fixture
+def client():
+    """Create a TestClient for FastAPI app"""
+    return TestClient(app)
+
+
+def photo_bytes(quality):
+    img = np.full((400, 300, 3), 230, np.uint8)
+    for i, y in enumerate(range(40, 380, 30)):
+        cv2.putText(img, f"ITEM {i} ... {i * 3}.50", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (10, 10, 10), 2)
+    return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+def test_recompressed_reupload_is_extracted_and_flagged(client, monkeypatch):
+    """The same receipt re-sent at lower JPEG quality gets its own extraction, marked as a duplicate"""
+    calls = []
+
+    def fake_process_document(contents, filename):
+        calls.append(filename)
+        return {"DocumentType": "receipt", "ExpenseType": "other", "TotalPrice": "42.00", "Title": filename}
+
+    monkeypatch.setattr(upload, "process_document", fake_process_document)
+    monkeypatch.setattr(upload, "near_duplicate_index", NearDuplicateIndex())
+
+    first = client.post("/api/upload", data={"user_id": "u1"},
+                        files={"files": ("first.jpg", photo_bytes(95), "image/jpeg")})
+    again = client.post("/api/upload", data={"user_id": "u1"},
+                        files={"files": ("whatsapp.jpg", photo_bytes(40), "image/jpeg")})
+    other_user = client.post("/api/upload", data={"user_id": "u2"},
+                             files={"files": ("mine.jpg", photo_bytes(40), "image/jpeg")})
+
+    assert "ProbableDuplicate" not in first.json()[0]
+    dup = again.json()[0]
+    assert dup["ProbableDuplicate"] is True
+    assert dup["DuplicateOf"] == "first.jpg"
+    assert dup["Title"] == "whatsapp.jpg"
+    assert "ProbableDuplicate" not in other_user.json()[0]
+    assert calls == ["first.jpg", "whatsapp.jpg", "mine.jpg"]
+
+
+def test_look_alike_receipt_with_another_total_is_not_flagged(client, monkeypatch):
+    """A different receipt from the same template keeps its own fields and no duplicate flag"""
+    totals = iter(["42.00", "17.30"])
+
+    def fake_process_document(contents, filename):
+        return {"DocumentType": "receipt", "ExpenseType": "other", "TotalPrice": next(totals)}
+
+    monkeypatch.setattr(upload, "process_document", fake_process_document)
+    monkeypatch.setattr(upload, "near_duplicate_index", NearDuplicateIndex())
+
+    client.post("/api/upload", data={"user_id": "u1"}, files={"files": ("a.jpg", photo_bytes(95), "image/jpeg")})
+    second = client.post("/api/upload", data={"user_id": "u1"},
+                         files={"files": ("b.jpg", photo_bytes(90), "image/jpeg")}).json()[0]
+    assert second["TotalPrice"] == "17.30"
+    assert "ProbableDuplicate" not in second
+
+
+def test_quality_gate_and_hashes_share_one_decode(client, monkeypatch):
+    """Before extraction the upload is decoded once, for both the quality gate and the hashes"""
+    decodes = []
+    real_imdecode = cv2.imdecode
+    monkeypatch.setattr(cv2, "imdecode", lambda buf, flags: decodes.append(flags) or real_imdecode(buf, flags))
+    monkeypatch.setattr(upload, "process_document",
+                        lambda contents, filename: {"DocumentType": "receipt", "TotalPrice": "1.00"})
+    monkeypatch.setattr(upload, "near_duplicate_index", NearDuplicateIndex())
+
+    response = client.post("/api/upload", data={"user_id": "u1"},
+                           files={"files": ("r.jpg", photo_bytes(90), "image/jpeg")})
+    assert response.status_code == 200
+    assert len(decodes) == 1
+    assert upload.near_duplicate_index.stats()["indexed"] == 1
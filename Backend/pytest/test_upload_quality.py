@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app import app
+from Janodi.routes import upload
+from Janodi.services import quality
+
+
+@pytest.fixture
+def client():
+    """Create a TestClient for FastAPI app"""
+    return TestClient(app)
+
+
+def photo_bytes(blur=0):
+    img = np.full((1200, 900, 3), 230, np.uint8)
+    for i, y in enumerate(range(80, 1150, 70)):
+        cv2.putText(img, f"ITEM {i} ... {i * 3}.50", (40, y), cv2.FONT_HERSHEY_SIMPLEX, 1.4, (10, 10, 10), 3)
+    if blur:
+        img = cv2.GaussianBlur(img, (0, 0), blur)
+    return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+@pytest.fixture
+def extracted(monkeypatch):
+    calls = []
+
+    def fake_process_document(contents, filename):
+        calls.append(filename)
+        return {"DocumentType": "receipt", "ExpenseType": "other", "TotalPrice": "42.00"}
+
+    monkeypatch.setattr(upload, "process_document", fake_process_document)
+    gate = quality.QualityGate()
+    monkeypatch.setattr(upload, "quality_gate", gate)
+    monkeypatch.setattr(quality, "quality_gate", gate)
+    return calls
+
+
+def test_blurry_photo_gets_retake_response_without_extraction(client, extracted):
+    """A blurred photo is answered with 422 and a retake hint; OCR never runs"""
+    response = client.post("/api/upload", files={"files": ("blurry.jpg", photo_bytes(blur=12), "image/jpeg")})
+
+    assert response.status_code == 422
+    assert "retake the photo" in response.json()["detail"]
+    assert extracted == []
+
+
+def test_batch_reports_rejected_photo_and_processes_the_rest(client, extracted):
+    """In a batch the rejected photo gets an entry with the reasons; the good one is extracted"""
+    response = client.post("/api/upload", files=[
+        ("files", ("good.jpg", photo_bytes(), "image/jpeg")),
+        ("files", ("dark.jpg", cv2.imencode(".jpg", np.full((800, 600, 3), 8, np.uint8))[1].tobytes(), "image/jpeg")),
+    ])
+
+    assert response.status_code == 200
+    good, dark = response.json()
+    assert good["TotalPrice"] == "42.00"
+    assert dark["status_code"] == 422
+    assert dark["retake_photo"] is True
+    assert dark["quality"]["reasons"] == ["too_dark"]
+    assert extracted == ["good.jpg"]
+
+    stats = client.get("/api/metrics").json()["quality_gate"]
+    assert stats["checks"] == 2
+    assert stats["rejected"] == 1
+    assert stats["rejection_rate"] == 0.5
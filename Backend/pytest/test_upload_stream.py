@@ -0,0 +1,68 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from app import app
+from Janodi.routes import upload
+
+
+@pytest.fixture
+def client():
+    """Create a TestClient for FastAPI app"""
+    return TestClient(app)
+
+
+def staged_process_document(contents, filename, progress=None):
+    """Stand-in for the pipeline that reports its stages like process_document"""
+    if bytes(contents) == b"corrupt":
+        raise ValueError("Uploaded image could not be decoded by OpenCV")
+    for stage in ("ocr", "classify", "extract"):
+        if progress is not None:
+            progress(stage)
+    time.sleep(1.5 if filename == "slow.jpg" else 0.05)
+    return {"DocumentType": "receipt", "ExpenseType": "other", "Title": filename}
+
+
+def test_stream_emits_progress_results_and_done(client, monkeypatch):
+    """Every file gets its stage events and a result or error, then a final summary"""
+    monkeypatch.setattr(upload, "process_document", staged_process_document)
+    files = [
+        ("files", ("a.jpg", b"img-a", "image/jpeg")),
+        ("files", ("broken.jpg", b"corrupt", "image/jpeg")),
+        ("files", ("notes.txt", b"text", "text/plain")),
+    ]
+    r = client.post("/api/upload/stream", files=files)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in r.text.splitlines()]
+
+    assert events[0] == {"event": "accepted", "files": 3}
+    assert events[-1] == {"event": "done", "succeeded": 1, "failed": 2}
+    stages = [e["stage"] for e in events if e["event"] == "progress" and e["index"] == 0]
+    assert stages == ["started", "ocr", "classify", "extract"]
+    result = next(e for e in events if e["event"] == "result")
+    assert result["index"] == 0 and result["data"]["Title"] == "a.jpg"
+    errors = {e["filename"]: e["status_code"] for e in events if e["event"] == "error"}
+    assert errors == {"broken.jpg": 500, "notes.txt": 400}
+
+
+def test_stream_sse_format(client, monkeypatch):
+    monkeypatch.setattr(upload, "process_document", staged_process_document)
+    r = client.post("/api/upload/stream?format=sse", files={"files": ("a.jpg", b"img-a", "image/jpeg")})
+    assert r.headers["content-type"].startswith("text/event-stream")
+    messages = [m for m in r.text.split("\n\n") if m]
+    assert messages[0].startswith("event: accepted\ndata: ")
+    assert messages[-1].startswith("event: done\n")
+    result = next(m for m in messages if m.startswith("event: result"))
+    assert json.loads(result.split("data: ", 1)[1])["data"]["Title"] == "a.jpg"
+
+
+def test_results_are_streamed_in_completion_order(client, monkeypatch):
+    """The fast file's result is emitted before the slow one's, whatever their upload order"""
+    monkeypatch.setattr(upload, "process_document", staged_process_document)
+    files = [("files", ("slow.jpg", b"img-slow", "image/jpeg")), ("files", ("fast.jpg", b"img-fast", "image/jpeg"))]
+    with client.stream("POST", "/api/upload/stream", files=files) as r:
+        events = [json.loads(line) for line in r.iter_lines() if line]
+    results = [(e["index"], e["filename"]) for e in events if e["event"] == "result"]
+    assert results == [(1, "fast.jpg"), (0, "slow.jpg")]
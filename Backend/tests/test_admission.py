@@ -0,0 +1,125 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.services.admission import AdmissionController, Overloaded
+
+
+def controller(**kwargs):
+    options = dict(max_inflight=2, queue_depth=2, max_wait_s=5, memory_limit_mb=0, doc_memory_mb=100)
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+async def hold(ctl, seconds, log, name, reject=True):
+    async with ctl.slot(reject):
+        log.append(("start", name))
+        await asyncio.sleep(seconds)
+    log.append(("end", name))
+
+
+def test_inflight_is_bounded_and_queue_is_fifo():
+    async def run():
+        ctl = controller()
+        log = []
+        tasks = [asyncio.create_task(hold(ctl, 0.05, log, i)) for i in range(4)]
+        await asyncio.sleep(0.01)
+        assert ctl.stats()["inflight"] == 2
+        assert ctl.stats()["queue_depth"] == 2
+        await asyncio.gather(*tasks)
+        return ctl, log
+
+    ctl, log = asyncio.run(run())
+    starts = [name for event, name in log if event == "start"]
+    assert starts == [0, 1, 2, 3]
+    stats = ctl.stats()
+    assert stats["admitted"] == 4
+    assert stats["inflight"] == 0
+    assert stats["wait_ms_max"] >= 40
+
+
+def test_full_queue_is_rejected_immediately_with_429():
+    async def run():
+        ctl = controller(max_inflight=1, queue_depth=1)
+        log = []
+        tasks = [asyncio.create_task(hold(ctl, 0.2, log, i)) for i in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded) as err:
+            await ctl.acquire()
+        await asyncio.gather(*tasks)
+        return ctl, err.value
+
+    ctl, err = asyncio.run(run())
+    assert err.status_code == 429
+    assert err.retry_after >= 1
+    assert ctl.stats()["rejected_queue_full"] == 1
+
+
+def test_queued_upload_times_out_with_503_and_leaves_the_queue():
+    async def run():
+        ctl = controller(max_inflight=1, max_wait_s=0.05)
+        task = asyncio.create_task(hold(ctl, 0.3, [], "long"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded) as err:
+            await ctl.acquire()
+        depth = ctl.stats()["queue_depth"]
+        await task
+        return ctl, err.value, depth
+
+    ctl, err, depth = asyncio.run(run())
+    assert err.status_code == 503
+    assert depth == 0
+    assert ctl.stats()["rejected_timeout"] == 1
+    assert ctl.stats()["inflight"] == 0
+
+
+def test_jobs_wait_past_the_queue_limit():
+    async def run():
+        ctl = controller(max_inflight=1, queue_depth=0, max_wait_s=0.01)
+        log = []
+        await asyncio.gather(*(hold(ctl, 0.03, log, i, reject=False) for i in range(3)))
+        return log
+
+    assert [n for e, n in asyncio.run(run()) if e == "start"] == [0, 1, 2]
+
+
+def test_memory_pressure_limits_inflight_to_one():
+    """Under memory pressure only one document runs, but the queue keeps draining"""
+    memory = {"mb": 900}
+
+    async def run():
+        ctl = controller(max_inflight=4, queue_depth=4, memory_limit_mb=1000, doc_memory_mb=200,
+                         memory_fn=lambda: memory["mb"])
+        log = []
+        tasks = [asyncio.create_task(hold(ctl, 0.05, log, i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        running_under_pressure = ctl.stats()["inflight"]
+        memory["mb"] = 100
+        await asyncio.gather(*tasks)
+        return ctl, running_under_pressure, log
+
+    ctl, running, log = asyncio.run(run())
+    assert running == 1
+    assert len([e for e, _ in log if e == "start"]) == 3
+    assert ctl.stats()["memory_deferred"] >= 1
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def run():
+        ctl = controller(max_inflight=1)
+        first = asyncio.create_task(hold(ctl, 0.05, [], "a"))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(ctl.acquire())
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await asyncio.gather(first, waiting, return_exceptions=True)
+        return ctl
+
+    stats = asyncio.run(run()).stats()
+    assert stats["inflight"] == 0
+    assert stats["queue_depth"] == 0
@@ -0,0 +1,127 @@
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import torch
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.model.batching import MicroBatcher, collate_encodings
+
+
+class TinyTokenClassifier(torch.nn.Module):
+    """Per-token classifier whose output for a token ignores padding, like LayoutLMv3 with an attention mask"""
+
+    def __init__(self):
+        super().__init__()
+        torch.manual_seed(0)
+        self.embed = torch.nn.Embedding(100, 4)
+        self.calls = []
+
+    def forward(self, input_ids, attention_mask, bbox, pixel_values):
+        self.calls.append(input_ids.shape[0])
+        logits = self.embed(input_ids) + bbox.float().sum(-1, keepdim=True) + pixel_values.mean(dim=(1, 2, 3)).view(-1, 1, 1)
+        return SimpleNamespace(logits=logits * attention_mask.unsqueeze(-1))
+
+
+def make_encoding(length, seed):
+    g = torch.Generator().manual_seed(seed)
+    return {
+        "input_ids": torch.randint(2, 100, (1, length), generator=g),
+        "attention_mask": torch.ones(1, length, dtype=torch.long),
+        "bbox": torch.randint(0, 1000, (1, length, 4), generator=g),
+        "pixel_values": torch.rand(1, 3, 8, 8, generator=g),
+    }
+
+
+def test_collate_pads_to_longest():
+    """Shorter encodings are right-padded with the pad id and a zero mask"""
+    batch = collate_encodings([make_encoding(3, 0), make_encoding(5, 1)], pad_token_id=1)
+    assert batch["input_ids"].shape == (2, 5)
+    assert batch["input_ids"][0, 3:].tolist() == [1, 1]
+    assert batch["attention_mask"][0].tolist() == [1, 1, 1, 0, 0]
+    assert batch["bbox"].shape == (2, 5, 4)
+    assert batch["pixel_values"].shape == (2, 3, 8, 8)
+
+
+def test_concurrent_callers_share_a_batch_and_get_their_own_logits():
+    """Requests arriving together run as one forward pass and match unbatched output"""
+    model = TinyTokenClassifier()
+    encodings = [make_encoding(4 + i, i) for i in range(6)]
+    with torch.no_grad():
+        expected = [model(**e).logits for e in encodings]
+    model.calls.clear()
+
+    batcher = MicroBatcher("test", model, pad_token_id=1, max_batch_size=8, max_wait_ms=200)
+    results = [None] * len(encodings)
+    start = threading.Barrier(len(encodings))
+
+    def call(i):
+        start.wait()
+        results[i] = batcher.infer(encodings[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(encodings))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    for got, want in zip(results, expected):
+        assert got.shape == want.shape
+        assert torch.allclose(got, want, atol=1e-5)
+    stats = batcher.stats()
+    assert stats["items"] == len(encodings)
+    assert stats["batches"] < len(encodings)
+    assert max(model.calls) > 1
+
+
+def test_batch_size_one_runs_inline():
+    """max_batch_size=1 skips the batching thread entirely"""
+    model = TinyTokenClassifier()
+    batcher = MicroBatcher("inline", model, max_batch_size=1)
+    logits = batcher.infer(make_encoding(3, 0))
+    assert logits.shape == (1, 3, 4)
+    assert batcher._thread is None
+    assert batcher.stats()["batch_sizes"] == {1: 1}
+
+
+def test_multi_window_request_gets_all_its_rows():
+    """An encoding with several windows is kept together and returned with every row"""
+    model = TinyTokenClassifier()
+    windows = make_encoding(6, 3)
+    windows = {k: torch.cat([v, v], dim=0) for k, v in windows.items()}
+    batcher = MicroBatcher("windows", model, max_batch_size=8, max_wait_ms=1)
+    logits = batcher.infer(windows)
+    batcher.close()
+    assert logits.shape == (2, 6, 4)
+    assert batcher.stats()["items"] == 2
+
+
+def test_batches_never_exceed_max_rows():
+    """A multi-window request that does not fit is carried over to the next batch intact"""
+    model = TinyTokenClassifier()
+    batcher = MicroBatcher("bounded", model, max_batch_size=4, max_wait_ms=200)
+
+    def windows(n, seed):
+        enc = make_encoding(5, seed)
+        return {k: torch.cat([v] * n, dim=0) for k, v in enc.items()}
+
+    requests = [windows(3, 0), windows(3, 1), windows(1, 2)]
+    results = [None] * len(requests)
+
+    def call(i):
+        results[i] = batcher.infer(requests[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(requests))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert [r.shape[0] for r in results] == [3, 3, 1]
+    assert max(model.calls) <= 4
+    assert sum(model.calls) == 7
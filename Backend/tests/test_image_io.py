@@ -0,0 +1,185 @@
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.services import extraction_service
+from Janodi.services.image_io import (
+    as_bgr, as_rgb, decode_image, describe, prepare_for_ocr, reduction_factor,
+)
+from Janodi.services.ocr_service import OcrResult
+
+
+def sample_bgr():
+    img = np.zeros((20, 30, 3), dtype=np.uint8)
+    img[..., 0] = 200  # blue channel
+    img[5:10, 5:10] = (0, 0, 255)
+    return img
+
+
+def png_bytes(img):
+    ok, buf = cv2.imencode(".png", img)
+    assert ok
+    return buf.tobytes()
+
+
+def test_decode_image_round_trips_bytes_and_memoryview():
+    """Bytes and a memoryview of them decode to the same BGR array"""
+    img = sample_bgr()
+    data = png_bytes(img)
+    np.testing.assert_array_equal(decode_image(data), img)
+    np.testing.assert_array_equal(decode_image(memoryview(data)), img)
+
+
+def test_decode_image_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_image(b"not an image")
+
+
+def test_as_rgb_is_a_view_of_the_decoded_buffer():
+    """The LayoutLMv3 input shares memory with the array OCR reads"""
+    bgr = sample_bgr()
+    rgb = as_rgb(bgr)
+    assert np.shares_memory(rgb, bgr)
+    assert tuple(rgb[0, 0]) == (0, 0, 200)
+    assert as_bgr(bgr) is bgr
+
+
+def test_path_and_pil_inputs_match_the_array():
+    img = sample_bgr()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "page.png"
+        cv2.imwrite(str(path), img)
+        np.testing.assert_array_equal(as_bgr(path), img)
+        np.testing.assert_array_equal(as_rgb(str(path)), img[..., ::-1])
+        pil = Image.open(path)
+        np.testing.assert_array_equal(as_bgr(pil), img)
+        np.testing.assert_array_equal(as_rgb(pil), img[..., ::-1])
+        assert describe(path) == str(path)
+    assert describe(img) == "<image 30x20>"
+
+
+def test_process_document_decodes_once_without_temp_files(monkeypatch):
+    """OCR and the extractor get the same decoded array; nothing is written to disk"""
+    seen = {}
+
+    def fake_run_ocr(img):
+        seen["ocr"] = img
+        return OcrResult.from_readtext([], (img.shape[1], img.shape[0]))
+
+    def fake_extract(image, ocr=None):
+        seen["model"] = image
+        seen["ocr_result"] = ocr
+        return {"Title": ["Shop"], "TotalPrice": "1.00"}
+
+    def no_temp_files(*args, **kwargs):
+        raise AssertionError("process_document must not write a temp file")
+
+    from Janodi.model import receipts_model
+    monkeypatch.setattr(extraction_service, "run_ocr", fake_run_ocr)
+    monkeypatch.setattr(extraction_service, "classify_document",
+                        lambda text: {"document_type": "receipt", "expense_type": "food"})
+    monkeypatch.setattr(receipts_model, "extract_receipt_structured_data", fake_extract)
+    monkeypatch.setattr(tempfile, "NamedTemporaryFile", no_temp_files)
+
+    result = extraction_service.process_document(png_bytes(sample_bgr()), "r.png")
+
+    assert seen["model"] is seen["ocr"]
+    assert seen["ocr_result"] is not None
+    assert result["Title"] == "Shop"
+    assert result["DocumentType"] == "receipt"
+    assert result["ExpenseType"] == "food"
+
+
+def test_model_and_classifier_fallbacks_mark_the_result(monkeypatch):
+    """Results built from a failed model or classifier carry the marker the result cache skips"""
+    from Janodi.model import invoice_model
+    from Janodi.services.result_cache import FALLBACK_KEY
+
+    def unavailable(image, ocr=None):
+        return {"invoice_total": "", FALLBACK_KEY: "invoice model unavailable"}
+
+    def broken_classifier(text):
+        raise RuntimeError("classifier down")
+
+    monkeypatch.setattr(extraction_service, "run_ocr",
+                        lambda img, engine=None: OcrResult.from_readtext([], (img.shape[1], img.shape[0])))
+    monkeypatch.setattr(extraction_service, "classify_document",
+                        lambda text: {"document_type": "invoice", "expense_type": "other"})
+    monkeypatch.setattr(invoice_model, "extract_invoice_structured_data", unavailable)
+    result = extraction_service.process_document(png_bytes(sample_bgr()), "i.png")
+    assert result[FALLBACK_KEY] == "invoice model unavailable"
+    assert "invoice_total" in result  # the regex fallback still fills the invoice fields
+
+    monkeypatch.setattr(invoice_model, "extract_invoice_structured_data", lambda image, ocr=None: {"invoice_total": "9"})
+    assert FALLBACK_KEY not in extraction_service.process_document(png_bytes(sample_bgr()), "i.png")
+
+    monkeypatch.setattr(extraction_service, "classify_document", broken_classifier)
+    assert extraction_service.process_document(png_bytes(sample_bgr()), "i.png")[FALLBACK_KEY] == "classification error"
+
+
+def jpeg_bytes(img, exif_orientation=None):
+    pil = Image.fromarray(img[..., ::-1])
+    buf = io.BytesIO()
+    if exif_orientation:
+        exif = Image.Exif()
+        exif[274] = exif_orientation
+        pil.save(buf, "JPEG", exif=exif.tobytes())
+    else:
+        pil.save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def test_reduction_factor_keeps_at_least_the_target_side():
+    assert reduction_factor(2048, 1536, 2048) == 1
+    assert reduction_factor(4000, 3000, 2048) == 2
+    assert reduction_factor(8000, 6000, 2048) == 4
+    assert reduction_factor(16384, 12288, 2048) == 8
+    assert reduction_factor(100000, 100, 2048) == 8
+
+
+def test_large_jpeg_is_decoded_reduced_and_capped(monkeypatch):
+    import cv2
+    flags = []
+    real_imdecode = cv2.imdecode
+    monkeypatch.setattr(cv2, "imdecode", lambda buf, f: flags.append(f) or real_imdecode(buf, f))
+
+    img = np.zeros((3000, 4400, 3), dtype=np.uint8)
+    out = decode_image(jpeg_bytes(img), max_side=1000)
+    assert out.shape == (682, 1000, 3)
+    assert flags == [cv2.IMREAD_REDUCED_COLOR_4]
+    # Small images are left alone
+    assert decode_image(png_bytes(sample_bgr()), max_side=1000).shape == (20, 30, 3)
+
+
+def test_exif_orientation_is_applied():
+    """A landscape-stored photo tagged 'rotate 90' decodes upright, also at reduced size"""
+    stored = np.zeros((200, 400, 3), dtype=np.uint8)
+    data = jpeg_bytes(stored, exif_orientation=6)
+    assert decode_image(data, max_side=0).shape == (400, 200, 3)
+    assert decode_image(data, max_side=100).shape == (100, 50, 3)
+
+
+def test_prepare_for_ocr_options(monkeypatch):
+    from Janodi.services import image_io
+    img = np.random.default_rng(0).integers(0, 255, (50, 80, 3), dtype=np.uint8)
+    assert prepare_for_ocr(img) is img
+
+    monkeypatch.setattr(image_io, "OCR_MAX_SIDE", 40)
+    assert prepare_for_ocr(img).shape == (25, 40, 3)
+
+    monkeypatch.setattr(image_io, "OCR_GRAYSCALE", True)
+    assert prepare_for_ocr(img).shape == (25, 40)
+
+    monkeypatch.setattr(image_io, "OCR_CONTRAST", "clahe")
+    assert prepare_for_ocr(img).shape == (25, 40)
+    monkeypatch.setattr(image_io, "OCR_GRAYSCALE", False)
+    assert prepare_for_ocr(img).shape == (25, 40, 3)
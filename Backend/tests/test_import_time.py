@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.import_time import profile_import
+
+
+@pytest.mark.parametrize("module", [
+    "Janodi.routes.upload",
+    "Janodi.routes.jobs",
+    "Janodi.routes.metrics",
+    "Janodi.routes.health",
+    "Shanthisha.routes.cluster",
+    "utils.gemini",
+])
+def test_route_modules_do_not_import_heavy_dependencies(module):
+    """Importing a router must not load torch, transformers, EasyOCR, pandas, ... (they load on first use)"""
+    report = profile_import(module)
+    assert report["heavy"] == [], f"{module} eagerly imported {report['heavy']}"
+    print(f"✅ import {module}: {report['total_ms']:.0f} ms")
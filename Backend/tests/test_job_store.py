@@ -0,0 +1,83 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.services import job_store
+
+
+@pytest.fixture(autouse=True)
+def job_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_store, "EXTRACTION_JOB_DB", str(tmp_path / "jobs.db"))
+
+
+def test_files_are_claimed_in_submission_order():
+    """The queue hands out the oldest queued file first and never twice"""
+    job_id = job_store.create_job([("a.jpg", b"a"), ("b.jpg", b"b")])
+    first = job_store.claim_next_file()
+    second = job_store.claim_next_file()
+    assert first == (job_id, 0, "a.jpg", b"a")
+    assert second == (job_id, 1, "b.jpg", b"b")
+    assert job_store.claim_next_file() is None
+    assert job_store.get_job(job_id)["status"] == "running"
+
+
+def test_job_is_done_when_every_file_finished():
+    """A job is done once each file has a result or an error"""
+    job_id = job_store.create_job([("a.jpg", b"a"), ("b.jpg", b"b")])
+    job_store.claim_next_file()
+    job_store.claim_next_file()
+    job_store.complete_file(job_id, 0, {"DocumentType": "receipt"})
+    job_store.fail_file(job_id, 1, "boom")
+
+    job = job_store.get_job(job_id)
+    assert job["status"] == "done"
+    assert job["files"][0]["result"] == {"DocumentType": "receipt"}
+    assert job["files"][1]["error"] == "boom"
+
+
+def test_only_expired_leases_are_requeued(monkeypatch):
+    """A file a live worker holds is left alone; once its lease runs out it is claimed again"""
+    job_id = job_store.create_job([("a.jpg", b"a")])
+    assert job_store.claim_next_file("worker-1") == (job_id, 0, "a.jpg", b"a")
+
+    # A sibling process starting up must not take the file
+    assert job_store.requeue_expired() == (0, 0)
+    assert job_store.claim_next_file("worker-2") is None
+
+    # worker-1 died: its lease expires and another worker picks the file up
+    monkeypatch.setattr(job_store, "EXTRACTION_JOB_LEASE_S", -1)
+    assert job_store.renew_lease(job_id, 0, "worker-1")
+    assert job_store.claim_next_file("worker-2") == (job_id, 0, "a.jpg", b"a")
+
+    # The first worker can no longer overwrite the file
+    job_store.complete_file(job_id, 0, {"from": "worker-1"}, "worker-1")
+    job_store.complete_file(job_id, 0, {"from": "worker-2"}, "worker-2")
+    assert job_store.get_job(job_id)["files"][0]["result"] == {"from": "worker-2"}
+
+
+def test_file_fails_after_max_attempts(monkeypatch):
+    """A file whose worker keeps dying is marked failed instead of being requeued forever"""
+    monkeypatch.setattr(job_store, "EXTRACTION_JOB_LEASE_S", -1)
+    monkeypatch.setattr(job_store, "EXTRACTION_JOB_MAX_ATTEMPTS", 2)
+    job_id = job_store.create_job([("crash.jpg", b"a")])
+
+    assert job_store.claim_next_file("worker-1") is not None
+    assert job_store.claim_next_file("worker-2") is not None
+    assert job_store.requeue_expired() == (0, 1)
+
+    file = job_store.get_job(job_id)["files"][0]
+    assert file["status"] == "error"
+    assert "2 attempt(s)" in file["error"]
+    assert job_store.claim_next_file("worker-3") is None
+
+
+def test_released_file_keeps_its_attempt():
+    """A graceful shutdown hands the file back at once without counting an attempt"""
+    job_id = job_store.create_job([("a.jpg", b"a")])
+    job_store.claim_next_file()
+    job_store.release_file(job_id, 0)
+    assert job_store.claim_next_file("worker-2") == (job_id, 0, "a.jpg", b"a")
@@ -0,0 +1,116 @@
+import json
+import sys
+from pathlib import Path
+
+import torch
+from PIL import Image
+from transformers import (
+    LayoutLMv3Config,
+    LayoutLMv3ForTokenClassification,
+    LayoutLMv3ImageProcessor,
+    LayoutLMv3Processor,
+    LayoutLMv3TokenizerFast,
+)
+from transformers.models.gpt2.tokenization_gpt2 import bytes_to_unicode
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.model.layoutlm_encoding import bucket_length, encode_document, pad_encoding, word_predictions
+
+
+def tiny_model():
+    torch.manual_seed(0)
+    config = LayoutLMv3Config(
+        vocab_size=100, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=520, input_size=32, patch_size=16,
+        coordinate_size=6, shape_size=4, num_labels=5,
+    )
+    return LayoutLMv3ForTokenClassification(config).eval()
+
+
+def tiny_processor(tmp_path):
+    """Byte-level processor with no merges: every character is one token, so lengths are predictable"""
+    vocab = {"<s>": 0, "<pad>": 1, "</s>": 2, "<unk>": 3}
+    for c in bytes_to_unicode().values():
+        vocab.setdefault(c, len(vocab))
+    vocab["<mask>"] = len(vocab)
+    (tmp_path / "vocab.json").write_text(json.dumps(vocab))
+    (tmp_path / "merges.txt").write_text("#version: 0.2\n")
+    tokenizer = LayoutLMv3TokenizerFast(vocab_file=str(tmp_path / "vocab.json"), merges_file=str(tmp_path / "merges.txt"))
+    return LayoutLMv3Processor(image_processor=LayoutLMv3ImageProcessor(apply_ocr=False), tokenizer=tokenizer)
+
+
+class FakeWindows:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def word_ids(self, batch_index=0):
+        return self.rows[batch_index]
+
+
+def make_encoding(length):
+    g = torch.Generator().manual_seed(length)
+    x1 = torch.randint(0, 500, (1, length, 2), generator=g)
+    return {
+        "input_ids": torch.randint(3, 100, (1, length), generator=g),
+        "attention_mask": torch.ones(1, length, dtype=torch.long),
+        "bbox": torch.cat([x1, x1 + 10], dim=-1),
+        "pixel_values": torch.rand(1, 3, 32, 32, generator=g),
+    }
+
+
+def test_bucket_length_picks_smallest_fit():
+    """Token counts round up to the next bucket and never exceed 512"""
+    buckets = [128, 256, 384, 512]
+    assert bucket_length(60, buckets) == 128
+    assert bucket_length(128, buckets) == 128
+    assert bucket_length(129, buckets) == 256
+    assert bucket_length(600, buckets) == 512
+
+
+def test_padding_does_not_change_predictions():
+    """Predictions for real tokens are the same at the natural length, a bucket and 512"""
+    model = tiny_model()
+    base = make_encoding(37)
+    with torch.no_grad():
+        expected = model(**base).logits.argmax(-1)
+        for target in (128, 512):
+            padded = pad_encoding(dict(base), target, pad_token_id=1)
+            assert padded["input_ids"].shape == (1, target)
+            assert padded["attention_mask"][0, 37:].sum() == 0
+            got = model(**padded).logits[:, :37].argmax(-1)
+            assert torch.equal(got, expected)
+
+
+def test_long_document_is_split_into_windows(tmp_path):
+    """A page longer than 512 tokens becomes several stacked windows that together cover every word"""
+    processor = tiny_processor(tmp_path)
+    words = [f"word{i}" for i in range(200)]
+    boxes = [[i % 900, 10, i % 900 + 50, 20] for i in range(200)]
+    encoding = encode_document(processor, Image.new("RGB", (100, 100)), words, boxes)
+
+    rows = encoding["input_ids"].shape[0]
+    assert rows > 1
+    assert encoding["pixel_values"].shape[0] == rows
+    # Predict each token's own word index, then check every word gets its own index back
+    pred_ids = [[w if w is not None else -1 for w in encoding.word_ids(r)] for r in range(rows)]
+    assert word_predictions(encoding, pred_ids, len(words)) == list(range(len(words)))
+
+
+def test_short_document_stays_one_bucketed_row(tmp_path):
+    """A short page is a single row padded to the first bucket"""
+    processor = tiny_processor(tmp_path)
+    encoding = encode_document(processor, Image.new("RGB", (100, 100)), ["total", "12.50"], [[1, 1, 5, 5], [6, 1, 9, 5]])
+    assert encoding["input_ids"].shape == (1, 128)
+
+
+def test_overlap_prefers_window_with_more_context():
+    """A word seen in two windows takes the prediction where it sits furthest from an edge"""
+    # word 2 is the last real token of window 0 but central in window 1
+    windows = FakeWindows([
+        [None, 0, 1, 2, None],
+        [None, 1, 2, 3, 4, None],
+    ])
+    preds = [[0, 10, 11, 12, 0], [0, 21, 22, 23, 24, 0]]
+    assert word_predictions(windows, preds, 6) == [10, 11, 22, 23, 24, None]
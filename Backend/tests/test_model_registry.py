@@ -0,0 +1,96 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+import torch
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.model.registry import ModelRegistry
+
+
+def one_mb_model():
+    # 1024 * 256 float32 weights = 1 MiB (plus a 1 KiB bias)
+    return ("processor", torch.nn.Linear(1024, 256))
+
+
+@pytest.fixture
+def registry():
+    evicted = []
+    reg = ModelRegistry(budget_mb=2.5)
+    for name in ("receipt", "invoice", "utility_bill"):
+        reg.register(name, one_mb_model, on_evict=lambda value, name=name: evicted.append(name))
+    return reg, evicted
+
+
+def test_least_recently_used_idle_model_is_evicted(registry):
+    """Loading past the budget unloads the idle model that was used longest ago"""
+    reg, evicted = registry
+    reg.get("receipt")
+    reg.get("invoice")
+    reg.get("receipt")  # invoice is now least recently used
+    reg.get("utility_bill")
+
+    stats = reg.stats()
+    assert evicted == ["invoice"]
+    assert stats["models"]["receipt"]["loaded"]
+    assert not stats["models"]["invoice"]["loaded"]
+    assert stats["models"]["utility_bill"]["loaded"]
+    assert stats["resident_mb"] <= 2.5
+    assert stats["loads"] == 3 and stats["evictions"] == 1
+
+
+def test_in_flight_models_are_not_evicted(registry):
+    """Models between acquire and release stay loaded even when that exceeds the budget"""
+    reg, evicted = registry
+    receipt = reg.acquire("receipt")
+    reg.acquire("invoice")
+    reg.acquire("utility_bill")
+    assert evicted == []
+    assert reg.stats()["resident_mb"] > 2.5
+    assert reg.stats()["models"]["receipt"]["in_flight"] == 1
+
+    # Releasing brings memory back under budget by unloading an idle model
+    reg.release("utility_bill")
+    assert evicted == ["utility_bill"]
+    reg.release("invoice")
+    reg.release("receipt")
+    assert evicted == ["utility_bill"]
+    assert reg.acquire("receipt") is receipt
+    reg.release("receipt")
+
+
+def test_evicted_model_is_reloaded_on_next_use(registry):
+    """After eviction the loader runs again and the load counter goes up"""
+    reg, evicted = registry
+    first = reg.get("receipt")
+    assert reg.evict("receipt")
+    second = reg.get("receipt")
+    assert second is not first
+    assert reg.stats()["models"]["receipt"]["loads"] == 2
+    assert evicted == ["receipt"]
+
+
+def test_concurrent_acquires_load_once():
+    """Threads asking for the same cold model share one load"""
+    calls = []
+    gate = threading.Event()
+
+    def slow_loader():
+        calls.append(1)
+        gate.wait(5)
+        return one_mb_model()
+
+    reg = ModelRegistry(budget_mb=0)
+    reg.register("receipt", slow_loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(reg.get("receipt"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
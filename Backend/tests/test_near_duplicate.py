@@ -0,0 +1,111 @@
+import random
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.services.image_io import decode_thumbnail
+from Janodi.services.near_duplicate import NearDuplicateIndex, hamming, image_hashes, same_document
+
+RECEIPT = {"DocumentType": "receipt", "TotalPrice": "$9.99", "Date": "01/02/2024", "OrderId": ""}
+
+
+def receipt_photo(seed):
+    """A receipt-like page of random text lines on a darker background"""
+    rng = random.Random(seed)
+    page = np.full((1200, 700, 3), 235, np.uint8)
+    y = 60
+    for _ in range(rng.randint(15, 25)):
+        line = "".join(rng.choice("ABCDEFGHIJ 0123456789.$") for _ in range(rng.randint(8, 22)))
+        cv2.putText(page, line, (30 + rng.randint(0, 60), y), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (20, 20, 20), 2)
+        y += rng.randint(35, 55)
+    photo = np.full((1500, 1000, 3), (70, 90, 120), np.uint8)
+    ox, oy = rng.randint(50, 250), rng.randint(50, 250)
+    photo[oy:oy + 1200, ox:ox + 700] = page
+    return photo
+
+
+def jpeg(img, quality=90):
+    return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+def distances(a, b):
+    return hamming(a[0], b[0]), hamming(a[1], b[1])
+
+
+def test_recompressed_and_resized_copies_stay_close():
+    """Messaging-app recompression and downscaling barely move either hash"""
+    photo = receipt_photo(1)
+    original = image_hashes(jpeg(photo))
+    h, w = photo.shape[:2]
+    for copy in (jpeg(photo, 35), jpeg(cv2.resize(photo, (w * 3 // 5, h * 3 // 5)))):
+        assert max(distances(original, image_hashes(copy))) <= 2
+
+
+def test_different_receipts_are_far_apart():
+    hashes = [image_hashes(jpeg(receipt_photo(seed))) for seed in range(6)]
+    index = NearDuplicateIndex(max_distance=6, per_user=10, ttl_s=3600, max_users=10)
+    for i, h in enumerate(hashes):
+        assert index.find("u1", h, RECEIPT) is None
+        index.add("u1", h, RECEIPT, f"{i}.jpg")
+
+
+def test_hashes_of_the_quality_thumbnail_match_the_bytes():
+    """The upload route hashes the thumbnail it decoded for the quality gate"""
+    data = jpeg(receipt_photo(4))
+    assert max(distances(image_hashes(data), image_hashes(decode_thumbnail(data, 768)))) <= 2
+
+
+def test_undecodable_bytes_have_no_hash():
+    assert image_hashes(b"not an image") is None
+
+
+def test_index_flags_the_new_result_for_same_user_only():
+    index = NearDuplicateIndex(max_distance=6, per_user=10, ttl_s=3600, max_users=10)
+    photo = receipt_photo(2)
+    index.add("u1", image_hashes(jpeg(photo)), RECEIPT, "first.jpg")
+
+    reread = dict(RECEIPT, TotalPrice="9.99", Title="SHOP")
+    dup = index.find("u1", image_hashes(jpeg(photo, 40)), reread)
+    assert dup["Title"] == "SHOP"  # the fresh extraction, not the stored one
+    assert dup["ProbableDuplicate"] is True
+    assert dup["DuplicateOf"] == "first.jpg"
+    assert "ProbableDuplicate" not in reread
+
+    assert index.find("u2", image_hashes(jpeg(photo)), RECEIPT) is None
+    stats = index.stats()
+    assert stats["checks"] == 2
+    assert stats["duplicates"] == 1
+
+
+def test_look_alike_photo_of_another_document_is_not_flagged():
+    """Receipts from one template can hash identically; different totals or dates keep them apart"""
+    index = NearDuplicateIndex(max_distance=10, per_user=10, ttl_s=3600, max_users=10)
+    h = image_hashes(jpeg(receipt_photo(3)))
+    index.add("u1", h, RECEIPT, "monday.jpg")
+    assert index.find("u1", h, dict(RECEIPT, TotalPrice="12.40")) is None
+    assert index.find("u1", h, dict(RECEIPT, Date="02/02/2024")) is None
+    assert index.find("u1", h, dict(RECEIPT, TotalPrice="")) is None
+    assert index.stats()["content_mismatches"] == 3
+    assert index.find("u1", h, dict(RECEIPT, OrderId="A17"))["DuplicateOf"] == "monday.jpg"
+
+
+def test_same_document_compares_normalized_key_fields():
+    assert same_document(RECEIPT, dict(RECEIPT, TotalPrice="9.99 ", Date="01/02/2024"))
+    assert not same_document(RECEIPT, dict(RECEIPT, DocumentType="invoice"))
+    invoice = {"DocumentType": "invoice", "invoice_total": "1,200.00", "invoice_number": "INV-7"}
+    assert same_document(invoice, dict(invoice, invoice_total="1200.00", invoice_number="inv 7"))
+    assert not same_document(invoice, dict(invoice, invoice_number="INV-8"))
+
+
+def test_old_entries_and_inactive_users_expire():
+    index = NearDuplicateIndex(max_distance=6, per_user=2, ttl_s=0, max_users=1)
+    h = (0, 0)
+    index.add("u1", h, RECEIPT, "a.jpg")
+    assert index.find("u1", h, RECEIPT) is None  # past the TTL
+    index.add("u2", h, RECEIPT, "b.jpg")
+    assert index.stats()["users"] == 1
@@ -0,0 +1,138 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.services import ocr_service
+from Janodi.services.ocr_service import OcrResult, normalize_boxes, run_ocr
+
+
+RAW = [
+    ([[10, 10], [60, 10], [60, 30], [10, 30]], "TOTAL", 0.9),
+    ([[70, 12], [120, 12], [120, 32], [70, 32]], "12.50", 0.2),
+    ([[-5, 40], [250, 40], [250, 60], [-5, 60]], "Thank you", 0.8),
+]
+
+
+class FakeReader:
+    def __init__(self):
+        self.calls = 0
+
+    def readtext(self, img):
+        self.calls += 1
+        return RAW
+
+
+def test_from_readtext_keeps_all_detections():
+    """OcrResult keeps words, boxes and confidences in detection order"""
+    ocr = OcrResult.from_readtext(RAW, (200, 100))
+    assert ocr.words == ["TOTAL", "12.50", "Thank you"]
+    assert ocr.boxes.shape == (3, 4) and ocr.boxes.dtype == np.int32
+    assert ocr.boxes[0].tolist() == [10, 10, 60, 30]
+    assert np.allclose(ocr.confidences, [0.9, 0.2, 0.8])
+    assert ocr.image_size == (200, 100)
+    assert ocr.text == "TOTAL 12.50 Thank you"
+
+
+def test_rotated_polygon_gets_enclosing_box():
+    """Skewed float polygons become the integer box that encloses them"""
+    raw = [([[10.4, 12.0], [50.2, 8.7], [51.0, 20.5], [11.1, 24.2]], "skew", 0.9)]
+    ocr = OcrResult.from_readtext(raw, (200, 100))
+    assert ocr.boxes[0].tolist() == [10, 8, 51, 25]
+
+
+def test_empty_readtext():
+    ocr = OcrResult.from_readtext([], (200, 100))
+    words, boxes = ocr.select(0.3)
+    assert words == [] and boxes.shape == (0, 4)
+
+
+def test_entries_filters_and_clips():
+    """entries() drops low-confidence words and clips boxes to the image"""
+    ocr = OcrResult.from_readtext(RAW, (200, 100))
+    entries = ocr.entries(0.35)
+    assert [t for t, _ in entries] == ["TOTAL", "Thank you"]
+    assert entries[1][1] == [0, 40, 200, 60]
+
+
+def test_normalize_boxes_matches_per_word_formula():
+    """normalize_boxes gives int(1000 * v / size) clamped to 0..1000 for every coordinate"""
+    W, H = 333, 777
+    rng = np.random.default_rng(0)
+    boxes = rng.integers(0, 777, size=(50, 4))
+    expected = [
+        [min(1000, max(0, v)) for v in (int(1000 * x1 / W), int(1000 * y1 / H), int(1000 * x2 / W), int(1000 * y2 / H))]
+        for x1, y1, x2, y2 in boxes.tolist()
+    ]
+    assert normalize_boxes(boxes, (W, H)).tolist() == expected
+
+
+def test_run_ocr_uses_shared_reader(monkeypatch):
+    """run_ocr reads the image once through the process-wide reader"""
+    fake = FakeReader()
+    monkeypatch.setattr(ocr_service, "_reader", fake)
+    ocr = run_ocr(np.zeros((100, 200, 3), dtype=np.uint8))
+    assert fake.calls == 1
+    assert ocr.image_size == (200, 100)
+    assert ocr_service.get_reader() is fake
+
+
+TESSERACT_DATA = {
+    # page, block, paragraph, line and word rows, as pytesseract.image_to_data returns them
+    "level": [1, 2, 3, 4, 5, 5, 5, 4, 5],
+    "text": ["", "", "", "", "TOTAL", "12.50", " ", "", "Thanks"],
+    "left": [0, 10, 10, 10, 10, 70, 120, 10, 10],
+    "top": [0, 10, 10, 10, 10, 12, 12, 40, 40],
+    "width": [200, 150, 150, 150, 50, 50, 5, 80, 80],
+    "height": [100, 60, 60, 22, 20, 20, 20, 20, 20],
+    "conf": [-1, -1, -1, -1, 91.5, 40, -1, 88, 77],
+}
+
+
+def test_from_tesseract_keeps_words_with_boxes_and_scaled_confidence():
+    """Tesseract word rows become the same OcrResult the extractors read from EasyOCR"""
+    ocr = OcrResult.from_tesseract(TESSERACT_DATA, (200, 100))
+    assert ocr.words == ["TOTAL", "12.50", "Thanks"]
+    assert ocr.boxes.tolist() == [[10, 10, 60, 30], [70, 12, 120, 32], [10, 40, 90, 60]]
+    assert np.allclose(ocr.confidences, [0.915, 0.40, 0.77])
+    assert ocr.engine == "tesseract"
+    assert [t for t, _ in ocr.entries(0.5)] == ["TOTAL", "Thanks"]
+
+
+def test_run_ocr_dispatches_to_the_requested_engine(monkeypatch):
+    """run_ocr(img, engine) uses that backend; the default stays OCR_ENGINE"""
+    seen = []
+
+    class FakeTesseract(ocr_service.OcrEngine):
+        name = "tesseract"
+
+        def read(self, img):
+            seen.append(img.shape)
+            return OcrResult.from_tesseract(TESSERACT_DATA, (img.shape[1], img.shape[0]))
+
+    fake = FakeReader()
+    monkeypatch.setattr(ocr_service, "_reader", fake)
+    monkeypatch.setitem(ocr_service._engines, "tesseract", FakeTesseract())
+
+    img = np.zeros((100, 200, 3), dtype=np.uint8)
+    assert run_ocr(img, "tesseract").words == ["TOTAL", "12.50", "Thanks"]
+    assert run_ocr(img).engine == "easyocr"
+    assert seen == [(100, 200, 3)] and fake.calls == 1
+
+
+def test_engine_by_document_type(monkeypatch):
+    monkeypatch.setattr(ocr_service, "OCR_ENGINE", "easyocr")
+    monkeypatch.setattr(ocr_service, "OCR_ENGINE_BY_TYPE", "invoice=Tesseract, receipt=easyocr")
+    assert ocr_service.ocr_engine_for("invoice") == "tesseract"
+    assert ocr_service.ocr_engine_for("receipt") == "easyocr"
+    assert ocr_service.ocr_engine_for(None) == "easyocr"
+    assert ocr_service.ocr_engines_in_use() == ["easyocr", "tesseract"]
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError, match="Unknown OCR engine"):
+        ocr_service.get_engine("abbyy")
@@ -0,0 +1,175 @@
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+pytest.importorskip("pypdfium2")
+
+from Janodi.services import extraction_service, pdf_io
+from Janodi.services.extraction_service import merge_page_fields, process_document
+from Janodi.services.ocr_service import OcrResult
+
+
+def text_pdf(pages):
+    """Minimal PDF with a Helvetica text layer; ``pages`` holds (x, y, size, text) lines per 612x792 page."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objs.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>")
+    font = 3 + 2 * len(pages)
+    for i, lines in enumerate(pages):
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+                    f"/Resources << /Font << /F1 {font} 0 R >> >> >>")
+        stream = "".join(f"BT /F1 {size} Tf {x} {y} Td ({text}) Tj ET\n" for x, y, size, text in lines)
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}endstream")
+    objs.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    out, offsets = b"%PDF-1.4\n", []
+    for k, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{k} 0 obj\n{obj}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def scanned_pdf(n_pages):
+    """Image-only PDF, like a scanner produces"""
+    pages = [Image.new("RGB", (300, 400), (255, 255, 255)) for _ in range(n_pages)]
+    buf = io.BytesIO()
+    pages[0].save(buf, format="PDF", save_all=True, append_images=pages[1:], resolution=72)
+    return buf.getvalue()
+
+
+INVOICE_PAGE_1 = [(72, 700, 14, "INVOICE No 1234 ACME Ltd"), (72, 650, 12, "Widget A 10.00")]
+INVOICE_PAGE_2 = [(72, 700, 12, "Widget B 5.00 extra line"), (72, 650, 12, "Total 15.00")]
+
+
+def test_text_layer_gives_words_and_pixel_boxes():
+    page = next(pdf_io.iter_pages(text_pdf([INVOICE_PAGE_1]), dpi=144))
+    assert page.image.shape == (1584, 1224, 3)
+    assert page.ocr.words[:3] == ["INVOICE", "No", "1234"]
+    assert page.ocr.image_size == (1224, 1584)
+    x1, y1, x2, y2 = page.ocr.boxes[0]
+    # 72pt from the left at 2 px/pt; the baseline at y=700pt is 92pt from the top
+    assert 140 <= x1 <= 150 and x2 > x1
+    assert 2 * (792 - 712) <= y1 < y2 <= 2 * (792 - 698)
+
+
+def test_scanned_pages_need_ocr_and_stop_at_max_pages():
+    data = scanned_pdf(3)
+    assert pdf_io.is_pdf(data)
+    pages = list(pdf_io.iter_pages(data, dpi=72, max_pages=2))
+    assert [p.index for p in pages] == [0, 1]
+    assert all(p.ocr is None for p in pages)
+    assert pages[0].image.shape == (400, 300, 3)
+
+
+def test_merge_keeps_first_header_appends_items_and_takes_last_total():
+    merged = merge_page_fields([
+        {"invoice_number": "1234", "item_description": "Widget A", "invoice_total": ""},
+        {"invoice_number": "9999", "item_description": "Widget B", "invoice_total": "15.00"},
+    ])
+    assert merged == {"invoice_number": "1234", "item_description": "Widget A Widget B", "invoice_total": "15.00"}
+
+
+def test_merge_takes_amount_model_labels_from_the_last_page():
+    """model_label_* keys of amounts agree with the merged amount fields; other labels are joined"""
+    merged = merge_page_fields([
+        {"invoice_total": "10.00", "model_label_INVOICE_TOTAL": "10.00", "model_label_TOTAL": "10.00",
+         "model_label_ITEM_DESCRIPTION": "Widget A"},
+        {"invoice_total": "25.00", "model_label_INVOICE_TOTAL": "25.00", "model_label_TOTAL": "",
+         "model_label_ITEM_DESCRIPTION": "Widget B"},
+    ])
+    assert merged["model_label_INVOICE_TOTAL"] == merged["invoice_total"] == "25.00"
+    assert merged["model_label_TOTAL"] == "10.00"
+    assert merged["model_label_ITEM_DESCRIPTION"] == "Widget A Widget B"
+
+
+def test_process_document_streams_text_pdf_without_ocr(monkeypatch):
+    """A PDF with a text layer is classified on page 1, never OCRed, and merged into one record"""
+    events = []
+    real_iter_pages = pdf_io.iter_pages
+
+    def tracking_iter_pages(data):
+        for page in real_iter_pages(data):
+            events.append(("render", page.index))
+            yield page
+
+    def fake_extract(doc_type, img, ocr, filename):
+        events.append(("extract", filename))
+        if "Total" in ocr.words:
+            return {"invoice_number": "", "item_description": "Widget B", "invoice_total": "15.00"}
+        return {"invoice_number": "1234", "item_description": "Widget A", "invoice_total": ""}
+
+    def no_ocr(img):
+        raise AssertionError("text-layer pages must not be OCRed")
+
+    monkeypatch.setattr(extraction_service, "iter_pages", tracking_iter_pages)
+    monkeypatch.setattr(extraction_service, "run_ocr", no_ocr)
+    monkeypatch.setattr(extraction_service, "_extract_fields", fake_extract)
+    monkeypatch.setattr(extraction_service, "classify_document",
+                        lambda text: {"document_type": "invoice", "expense_type": "utilities"})
+
+    result = process_document(text_pdf([INVOICE_PAGE_1, INVOICE_PAGE_2]), "supplier.pdf")
+
+    assert result["invoice_number"] == "1234"
+    assert result["item_description"] == "Widget A Widget B"
+    assert result["invoice_total"] == "15.00"
+    assert result["DocumentType"] == "invoice"
+    assert result["ExpenseType"] == "utilities"
+    assert result["PageCount"] == 2
+    # Page 1 is extracted before page 2 is rendered
+    assert events == [("render", 0), ("extract", "supplier.pdf page 1"),
+                      ("render", 1), ("extract", "supplier.pdf page 2")]
+
+
+def test_scanned_pdf_pages_fall_back_to_ocr(monkeypatch):
+    ocr_calls = []
+
+    def fake_run_ocr(img, engine=None):
+        ocr_calls.append(img.shape)
+        return OcrResult(words=["RECEIPT", "TOTAL", "3.00"], boxes=np.zeros((3, 4), dtype=np.int32),
+                         confidences=np.ones(3, dtype=np.float32), image_size=(img.shape[1], img.shape[0]))
+
+    monkeypatch.setattr(extraction_service, "run_ocr", fake_run_ocr)
+    monkeypatch.setattr(extraction_service, "_extract_fields",
+                        lambda doc_type, img, ocr, filename: {"Title": "Shop", "TotalPrice": "3.00"})
+    monkeypatch.setattr(extraction_service, "classify_document",
+                        lambda text: {"document_type": "receipt", "expense_type": "food"})
+
+    result = process_document(scanned_pdf(2), "scan.pdf")
+    assert len(ocr_calls) == 2
+    assert result["Title"] == "Shop"
+    assert result["DocumentType"] == "receipt"
+
+
+def test_pages_are_reread_with_the_engine_configured_for_their_type(monkeypatch):
+    """Classification reads page 1 with OCR_ENGINE; invoice pages are extracted from the invoice engine"""
+    ocr_calls = []
+
+    def fake_run_ocr(img, engine=None):
+        engine = engine or "easyocr"
+        ocr_calls.append(engine)
+        return OcrResult(words=["INVOICE", engine], boxes=np.zeros((2, 4), dtype=np.int32),
+                         confidences=np.ones(2, dtype=np.float32), image_size=(img.shape[1], img.shape[0]),
+                         engine=engine)
+
+    extracted = []
+    monkeypatch.setattr(extraction_service, "run_ocr", fake_run_ocr)
+    monkeypatch.setattr(extraction_service, "ocr_engine_for",
+                        lambda doc_type=None: "tesseract" if doc_type == "invoice" else "easyocr")
+    monkeypatch.setattr(extraction_service, "_extract_fields",
+                        lambda doc_type, img, ocr, filename: extracted.append(ocr.engine) or {"invoice_total": "3.00"})
+    monkeypatch.setattr(extraction_service, "classify_document",
+                        lambda text: {"document_type": "invoice", "expense_type": "utilities"})
+
+    process_document(scanned_pdf(2), "scan.pdf")
+    assert ocr_calls == ["easyocr", "tesseract", "tesseract"]
+    assert extracted == ["tesseract", "tesseract"]
@@ -0,0 +1,28 @@
+import gc
+import sys
+from pathlib import Path
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.services import preload, warmup
+
+
+def test_preload_loads_weights_without_warming_and_freezes_gc(monkeypatch):
+    """preload_models only runs the loaders (no forward pass before fork) and skips failures"""
+    calls = []
+
+    def broken():
+        raise RuntimeError("no weights")
+
+    monkeypatch.setattr(warmup, "_MODELS", {
+        "receipt": (lambda: calls.append("load receipt"), lambda _: calls.append("warm receipt")),
+        "invoice": (broken, lambda _: calls.append("warm invoice")),
+    })
+    try:
+        timings = preload.preload_models(["receipt", "invoice"])
+        assert calls == ["load receipt"]
+        assert list(timings) == ["receipt"]
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
@@ -0,0 +1,84 @@
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.services.quality import QualityGate, assess_quality
+
+SAMPLES = Path(__file__).parent.parent / "test_data"
+
+
+def receipt_photo():
+    """A 12 MP phone-style photo of a printed page"""
+    page = np.full((3000, 2000, 3), 235, np.uint8)
+    for i, y in enumerate(range(200, 2800, 120)):
+        cv2.putText(page, f"ITEM {i:02d}  QTY 1  {i * 7 % 90}.99", (150, y), cv2.FONT_HERSHEY_SIMPLEX, 2.5, (25, 25, 25), 6)
+    photo = np.full((4000, 3000, 3), (70, 90, 120), np.uint8)
+    photo[500:3500, 500:2500] = page
+    return photo
+
+
+def jpeg(img):
+    return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def test_sharp_photo_and_samples_pass():
+    for data in (jpeg(receipt_photo()), (SAMPLES / "receipt_sample.jpg").read_bytes(),
+                 (SAMPLES / "invoice_sample.jpg").read_bytes()):
+        report = assess_quality(data)
+        assert report.ok, report
+        assert report.metrics["text_regions"] >= 5
+
+
+def test_blurry_photo_is_rejected():
+    report = assess_quality(jpeg(cv2.GaussianBlur(receipt_photo(), (0, 0), 25)))
+    assert report.reasons == ["blurry"]
+    assert "out of focus" in report.message
+
+
+def test_dark_and_overexposed_photos_are_rejected():
+    photo = receipt_photo()
+    assert assess_quality(jpeg((photo * 0.12).astype(np.uint8))).reasons == ["too_dark"]
+    assert assess_quality(jpeg(cv2.add(photo, np.full_like(photo, 220)))).reasons == ["overexposed"]
+
+
+def test_sparse_clean_page_is_not_overexposed():
+    """A digital invoice with a few lines of text is mostly white paper but passes"""
+    page = np.full((1100, 850, 3), 255, np.uint8)
+    for i in range(8):
+        cv2.putText(page, f"Line item {i}   {i * 3}.00", (60, 80 + 40 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
+    report = assess_quality(cv2.imencode(".png", page)[1].tobytes())
+    assert report.ok, report
+    assert report.metrics["clipped"] > 0.9
+
+
+def test_photo_without_text_is_rejected():
+    wall = np.full((3000, 4000, 3), (180, 190, 200), np.uint8)
+    assert assess_quality(jpeg(wall)).reasons == ["no_text"]
+
+
+def test_undecodable_bytes_pass_through():
+    report = assess_quality(b"not an image")
+    assert report.ok and report.metrics is None
+
+
+def test_checks_run_on_a_downscaled_thumbnail():
+    data = jpeg(receipt_photo())
+    assess_quality(data)
+    report = assess_quality(data)
+    assert max(report.metrics["thumbnail"]) <= 768
+
+
+def test_gate_counts_rejections_by_reason():
+    gate = QualityGate()
+    gate.check(jpeg(receipt_photo()))
+    gate.check(jpeg(np.zeros((800, 600, 3), np.uint8)))
+    stats = gate.stats()
+    assert stats["checks"] == 2
+    assert stats["rejected"] == 1
+    assert stats["rejection_rate"] == 0.5
+    assert stats["by_reason"]["too_dark"] == 1
@@ -0,0 +1,111 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+import torch
+from transformers import LayoutLMv3Config, LayoutLMv3ForTokenClassification
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.model import quantization
+from Janodi.model.quantization import field_agreement, gate_allows, maybe_quantize, record_gate
+
+
+def tiny_model():
+    torch.manual_seed(0)
+    config = LayoutLMv3Config(
+        vocab_size=100, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=520, input_size=32, patch_size=16,
+        coordinate_size=6, shape_size=4, num_labels=5,
+    )
+    model = LayoutLMv3ForTokenClassification(config).eval()
+    model.config._commit_hash = "rev1"
+    return model
+
+
+@pytest.fixture(autouse=True)
+def gate_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(quantization, "QUANTIZATION_GATE_FILE", str(tmp_path / "gate.json"))
+    monkeypatch.setattr(quantization, "_warned", set())
+
+
+def test_field_agreement_counts_matching_fields():
+    """Agreement is the share of (document, field) pairs with identical values; both-empty pairs are skipped"""
+    fp32 = [{"Date": "1/2/24", "TotalPrice": "12.50"}, {"Date": "", "TotalPrice": "9.00"}]
+    int8 = [{"Date": "1/2/24", "TotalPrice": "12.5"}, {"Date": "", "TotalPrice": "9.00"}]
+    assert field_agreement(fp32, int8) == 2 / 3
+
+
+def test_field_agreement_is_not_inflated_by_empty_fields():
+    """A quantized model that drops the only real values fails even when most fields are empty"""
+    empty = {f"field_{i}": "" for i in range(20)}
+    fp32 = [dict(empty, TotalPrice="12.50", Date="1/2/24", Tax="")]
+    int8 = [dict(empty, TotalPrice="", Date="1/2/24", Tax="0.10")]
+    assert field_agreement(fp32, int8) == 1 / 3
+
+
+def test_gate_refuses_model_below_threshold():
+    """A model whose agreement drops below the threshold is not approved"""
+    entry = record_gate("org/receipts", "rev1", "torch", agreement=0.9, images=20, threshold=0.98)
+    assert entry["approved"] is False
+    assert not gate_allows("org/receipts", "rev1", "torch")
+
+
+def test_gate_approval_is_tied_to_revision():
+    """Approval only holds for the evaluated revision of the weights"""
+    record_gate("org/receipts", "rev1", "torch", agreement=0.99, images=20, threshold=0.98)
+    assert gate_allows("org/receipts", "rev1", "torch")
+    assert not gate_allows("org/receipts", "rev2", "torch")
+
+
+def test_gate_approval_is_tied_to_backend():
+    """Approving torch dynamic INT8 does not approve ONNX Runtime INT8, and the reverse"""
+    record_gate("org/receipts", "rev1", "torch", agreement=0.99, images=20, threshold=0.98)
+    assert not gate_allows("org/receipts", "rev1", "onnx")
+
+    record_gate("org/receipts", "rev1", "onnx", agreement=0.5, images=20, threshold=0.98)
+    assert gate_allows("org/receipts", "rev1", "torch")
+    assert not gate_allows("org/receipts", "rev1", "onnx")
+
+
+def test_gate_entry_without_backend_approves_nothing():
+    """Entries written before approvals were per backend no longer enable INT8"""
+    with open(quantization.QUANTIZATION_GATE_FILE, "w") as f:
+        json.dump({"org/receipts": {"revision": "rev1", "approved": True}}, f)
+    assert not gate_allows("org/receipts", "rev1", "torch")
+    assert not gate_allows("org/receipts", "rev1", "onnx")
+
+
+def test_maybe_quantize_needs_flag_and_gate(monkeypatch):
+    """Linear layers become INT8 only when LAYOUTLM_QUANTIZE is set and the gate approved the model"""
+    monkeypatch.setattr(quantization, "LAYOUTLM_QUANTIZE", True)
+    model = maybe_quantize("org/tiny", tiny_model())
+    assert isinstance(model.classifier, torch.nn.Linear)
+
+    record_gate("org/tiny", "rev1", "onnx", agreement=1.0, images=5)
+    model = maybe_quantize("org/tiny", tiny_model())
+    assert isinstance(model.classifier, torch.nn.Linear)
+
+    record_gate("org/tiny", "rev1", "torch", agreement=1.0, images=5)
+    model = maybe_quantize("org/tiny", tiny_model())
+    assert isinstance(model.classifier, torch.ao.nn.quantized.dynamic.Linear)
+
+
+def test_int8_model_tracks_fp32_predictions():
+    """Dynamic INT8 keeps almost every token prediction of the fp32 model"""
+    fp32 = tiny_model()
+    int8 = quantization.quantize_dynamic_int8(fp32, inplace=False)
+    g = torch.Generator().manual_seed(1)
+    x1 = torch.randint(0, 500, (2, 64, 2), generator=g)
+    inputs = {
+        "input_ids": torch.randint(3, 100, (2, 64), generator=g),
+        "bbox": torch.cat([x1, x1 + 20], dim=-1),
+        "attention_mask": torch.ones(2, 64, dtype=torch.long),
+        "pixel_values": torch.rand(2, 3, 32, 32, generator=g),
+    }
+    with torch.no_grad():
+        a = fp32(**inputs).logits.argmax(-1)
+        b = int8(**inputs).logits.argmax(-1)
+    assert (a == b).float().mean() > 0.9
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.model.reading_order import reading_order
+from benchmarks.bench_reading_order import intact_lines, legacy_reading_order, synthetic_page
+
+
+@pytest.mark.parametrize("n,seed", [(1, 0), (37, 1), (400, 2), (2000, 3)])
+def test_matches_previous_order_on_clean_pages(n, seed):
+    """Separated lines with small jitter come out exactly as the old line scan ordered them"""
+    entries, H = synthetic_page(n, seed=seed)
+    assert reading_order(entries, H) == legacy_reading_order(entries, H)
+
+
+def test_skewed_lines_stay_whole():
+    """A line drifting down by more than the tolerance is still read as one line"""
+    entries, H = synthetic_page(200, seed=4, skew=0.05)
+    assert intact_lines(reading_order(entries, H)) == 20
+
+
+def test_equal_x_keeps_detection_order():
+    """Words at the same x on one line keep their OCR detection order"""
+    entries = [("b", [10, 10, 20, 20]), ("a", [10, 11, 20, 21]), ("c", [0, 10, 5, 20])]
+    assert [t for t, _ in reading_order(entries, 1000)] == ["c", "b", "a"]
+
+
+def test_empty_input():
+    assert reading_order([], 1000) == []
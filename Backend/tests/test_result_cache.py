@@ -0,0 +1,203 @@
+import asyncio
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.services.result_cache import FALLBACK_KEY, ResultCache, result_key
+
+
+RESULT = {"DocumentType": "receipt", "ExpenseType": "food", "TotalPrice": "12.50"}
+
+
+def test_key_depends_on_bytes_and_model_settings(monkeypatch):
+    """Same bytes give the same key until a setting that changes the output differs"""
+    key = result_key(b"photo")
+    assert key == result_key(b"photo")
+    assert key != result_key(b"photo2")
+    monkeypatch.setenv("LAYOUTLM_QUANTIZE", "1")
+    assert result_key(b"photo") != key
+
+
+@pytest.mark.parametrize("setting, value", [
+    ("PDF_RENDER_DPI", "300"),
+    ("PDF_TEXT_LAYER", "0"),
+    ("PDF_MIN_TEXT_WORDS", "20"),
+    ("PDF_MAX_PAGES", "1"),
+    ("OCR_MAX_SIDE", "1024"),
+    ("OCR_GRAYSCALE", "1"),
+    ("OCR_CONTRAST", "clahe"),
+])
+def test_key_depends_on_output_settings(setting, value, monkeypatch):
+    """Every setting that can change the extracted fields is part of the key"""
+    key = result_key(b"doc")
+    monkeypatch.setenv(setting, value)
+    assert result_key(b"doc") != key
+
+
+def test_key_changes_when_a_model_revision_is_downloaded(monkeypatch, tmp_path):
+    """Updating a model repo in place gives new keys without bumping RESULT_CACHE_VERSION"""
+    from Janodi.model.model_ids import RECEIPT_MODEL_ID
+    monkeypatch.setenv("HF_HUB_CACHE", str(tmp_path))
+    unresolved = result_key(b"photo")
+    ref = tmp_path / f"models--{RECEIPT_MODEL_ID.replace('/', '--')}" / "refs" / "main"
+    ref.parent.mkdir(parents=True)
+    ref.write_text("1111111")
+    first = result_key(b"photo")
+    ref.write_text("2222222")
+    assert len({unresolved, first, result_key(b"photo")}) == 3
+
+
+def test_memory_tier_is_lru_and_returns_copies():
+    cache = ResultCache(max_entries=2, directory="")
+    cache.put("a", RESULT)
+    cache.put("b", {"x": 1})
+    hit = cache.get("a")
+    hit["TotalPrice"] = "changed"
+    assert cache.get("a") == RESULT
+    cache.put("c", {"x": 3})  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["memory_evictions"] == 1
+    assert stats["entries"] == 2
+
+
+def test_disabled_cache_never_stores():
+    cache = ResultCache(max_entries=0, directory="")
+    cache.put("a", RESULT)
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 0
+
+
+def test_disk_tier_survives_a_new_process_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        ResultCache(max_entries=4, directory=tmp).put("ab" * 32, RESULT)
+        fresh = ResultCache(max_entries=4, directory=tmp)
+        assert fresh.get("ab" * 32) == RESULT
+        assert fresh.get("ab" * 32) == RESULT
+        stats = fresh.stats()
+        assert stats["disk_hits"] == 1
+        assert stats["memory_hits"] == 1
+
+
+def test_disk_tier_evicts_least_recently_used_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        payload = {"Item": "x" * 4000}
+        cache = ResultCache(max_entries=1, directory=tmp, disk_mb=10_000 / 2**20)
+        cache.put("aa" * 32, payload)
+        cache.put("bb" * 32, payload)
+        cache.put("cc" * 32, payload)
+        files = sorted(p.stem for p in Path(tmp).glob("*/*.json"))
+        assert files == ["bb" * 32, "cc" * 32]
+        assert cache.stats()["disk_evictions"] == 1
+        assert sum(p.stat().st_size for p in Path(tmp).glob("*/*.json")) <= 10_000
+
+
+def test_disk_eviction_follows_reads_without_rescanning(monkeypatch):
+    """A disk hit keeps a file; the next eviction removes the least recently read one"""
+    with tempfile.TemporaryDirectory() as tmp:
+        payload = {"Item": "x" * 4000}
+        cache = ResultCache(max_entries=1, directory=tmp, disk_mb=10_000 / 2**20)
+        cache.put("aa" * 32, payload)
+        cache.put("bb" * 32, payload)
+        cache.clear()
+        assert cache.get("aa" * 32) == payload  # from disk
+        monkeypatch.setattr(Path, "glob", lambda *a: pytest.fail("eviction re-scanned the directory"))
+        cache.put("cc" * 32, payload)
+        files = sorted(p.stem for p in Path(tmp).rglob("*.json"))
+        assert files == ["aa" * 32, "cc" * 32]
+        assert cache.stats()["disk_evictions"] == 1
+
+
+def test_get_or_compute_does_disk_io_off_the_event_loop(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(max_entries=4, directory=tmp)
+        threads = []
+        for name in ("_disk_get", "_disk_put"):
+            real = getattr(cache, name)
+            monkeypatch.setattr(cache, name, lambda *a, _real=real: threads.append(threading.current_thread()) or _real(*a))
+
+        async def compute():
+            return dict(RESULT)
+
+        assert asyncio.run(cache.get_or_compute("ab" * 32, compute)) == RESULT
+        cache.clear()
+        assert asyncio.run(cache.get_or_compute("ab" * 32, compute)) == RESULT
+        assert len(threads) == 3  # miss, write, disk hit
+        assert threading.main_thread() not in threads
+        assert cache.stats()["disk_hits"] == 1
+
+
+def test_concurrent_identical_uploads_run_once():
+    """A second upload of the same bytes waits for the first instead of re-running extraction"""
+    cache = ResultCache(max_entries=4, directory="")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return dict(RESULT)
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert results == [RESULT] * 3
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 2
+
+
+def test_waiters_take_over_when_the_owner_is_cancelled():
+    """Cancelling the request that started the extraction does not cancel identical uploads waiting on it"""
+    cache = ResultCache(max_entries=4, directory="")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return dict(RESULT)
+
+    async def run():
+        owner = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(run()) == [RESULT] * 2
+    assert len(calls) == 2  # the cancelled run and one takeover, not one per waiter
+    assert cache.get("k") == RESULT
+
+
+def test_failed_extraction_is_not_cached():
+    cache = ResultCache(max_entries=4, directory="")
+
+    async def fail():
+        raise ValueError("bad image")
+
+    with pytest.raises(ValueError):
+        asyncio.run(cache.get_or_compute("k", fail))
+    assert cache.get("k") is None
+
+
+def test_fallback_result_is_returned_but_not_cached():
+    """A result produced after a model or classifier failure is served once and recomputed next time"""
+    cache = ResultCache(max_entries=4, directory="")
+
+    async def degraded():
+        return {**RESULT, FALLBACK_KEY: "receipt model unavailable"}
+
+    assert asyncio.run(cache.get_or_compute("k", degraded)) == RESULT
+    assert cache.get("k") is None
+    assert cache.stats()["fallbacks_not_cached"] == 1
+    assert asyncio.run(ResultCache(max_entries=0).get_or_compute("k", degraded)) == RESULT
@@ -0,0 +1,35 @@
+import hashlib
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Janodi.services.shared_image import SharedImage, call_with_shared_image
+
+
+def digest(view, suffix):
+    return hashlib.sha256(view).hexdigest() + suffix
+
+
+def test_worker_reads_bytes_from_shared_memory():
+    """A spawned worker sees exactly the uploaded bytes through the shared block"""
+    payload = bytes(range(256)) * 1000
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        with SharedImage(payload) as handle:
+            result = pool.submit(call_with_shared_image, digest, handle, "-ok").result(timeout=60)
+    assert result == hashlib.sha256(payload).hexdigest() + "-ok"
+
+
+def test_shared_block_is_unlinked_after_use():
+    """The owner removes the shared block when the request is done"""
+    with SharedImage(b"abc") as handle:
+        assert call_with_shared_image(bytes, handle) == b"abc"
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=handle.name)
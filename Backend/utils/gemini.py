@@ -2,7 +2,6 @@
 Gemini AI utility for the expense chatbot.
 """
 import os
-import google.generativeai as genai
 import logging
 # Load environment variables from a .env file
 from dotenv import load_dotenv
@@ -13,6 +12,13 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+
+def _genai():
+    """google.generativeai, imported on first use so importing this module stays cheap"""
+    import google.generativeai as genai
+    return genai
+
+
 # Configure the Google Generative AI API
 def configure_genai():
     """Configure Google Generative AI with API key"""
@@ -21,7 +27,7 @@ def configure_genai():
         logger.warning("GEMINI_API_KEY environment variable not set. Using mock responses.")
         return False
     
-    genai.configure(api_key=api_key)
+    _genai().configure(api_key=api_key)
     return True
 
 def extract_question_details(question):
@@ -70,7 +76,7 @@ def extract_question_details(question):
           "is_general_question": true
         }}
         """
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
+        model = _genai().GenerativeModel("models/gemini-2.5-flash")
         response = model.generate_content(prompt)
         response_text = response.text
         print(f"Gemini extraction resulttttt: {response_text}")
@@ -173,7 +179,7 @@ def handle_casual_conversation(question):
         User input: "{question}"
         """
         
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
+        model = _genai().GenerativeModel("models/gemini-2.5-flash")
         response = model.generate_content(prompt)
         return response.text.strip()
     except Exception as e:
@@ -208,7 +214,7 @@ def ask_gemini(question, receipt_data):
         Provide a helpful, concise answer focusing only on the expense data provided.
         """
         
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
+        model = _genai().GenerativeModel("models/gemini-2.5-flash")
         response = model.generate_content(prompt)
         return response.text.strip()
             